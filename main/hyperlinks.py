@@ -0,0 +1,53 @@
+from rest_framework import serializers
+from rest_framework.reverse import reverse
+
+# Placeholder of the lookup value in the URL templates
+URL_LOOKUP_PLACEHOLDER = "__lookup__"
+
+
+def get_url_builder(request, view_name, lookup_url_kwarg="pk", format=None):
+    """Return a function giving the absolute URL of the detail view of an integer lookup
+    value, as `reverse` does.
+
+    The URL is reversed once per request and view, around a placeholder of the lookup
+    value, the URLs of the values being formatted from it."""
+    builders = getattr(request, "_url_builders", None)
+    if builders is None:
+        builders = request._url_builders = {}
+    key = (view_name, lookup_url_kwarg, format)
+    if key not in builders:
+        kwargs = {lookup_url_kwarg: URL_LOOKUP_PLACEHOLDER}
+        url = reverse(view_name, kwargs=kwargs, request=request, format=format)
+        prefix, suffix = url.split(URL_LOOKUP_PLACEHOLDER)
+        builders[key] = lambda value: f"{prefix}{value}{suffix}"
+    return builders[key]
+
+
+class CachedURLMixin:
+    """
+    Build the URLs of a hyperlinked field with the URL builder of the request.
+    """
+
+    def get_url(self, obj, view_name, request, format):
+        """Override get_url to format the integer lookup values into the URL of the view."""
+        if hasattr(obj, "pk") and obj.pk in (None, ""):
+            return None
+        lookup_value = getattr(obj, self.lookup_field)
+        # The other values are quoted and matched against the pattern by reverse
+        if request is None or type(lookup_value) is not int:
+            return super().get_url(obj, view_name, request, format)
+        return get_url_builder(request, view_name, self.lookup_url_kwarg, format)(lookup_value)
+
+
+class CachedHyperlinkedRelatedField(CachedURLMixin, serializers.HyperlinkedRelatedField):
+    """HyperlinkedRelatedField whose URLs are built with the URL builder of the request."""
+
+
+class CachedHyperlinkedIdentityField(CachedURLMixin, serializers.HyperlinkedIdentityField):
+    """HyperlinkedIdentityField whose URLs are built with the URL builder of the request."""
+
+
+class CachedHyperlinkedModelSerializer(serializers.HyperlinkedModelSerializer):
+    """HyperlinkedModelSerializer whose URLs are built with the URL builder of the request."""
+    serializer_related_field = CachedHyperlinkedRelatedField
+    serializer_url_field = CachedHyperlinkedIdentityField
@@ -0,0 +1,80 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """
+    Execute wrapper counting and timing the queries, keeping the slowest one.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_duration = 0.0
+        self.slowest_sql = ""
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            if duration >= self.slowest_duration:
+                self.slowest_duration = duration
+                self.slowest_sql = sql
+
+
+class QueryTimingMiddleware:
+    """
+    Measure the queries of a sample of the requests.
+
+    The number of queries, their total time and the slowest one are sent in the
+    Server-Timing header and logged. The queries of streamed responses running after
+    the response is returned are not measured.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.QUERY_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        stats = QueryStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        server_timing = (
+            f'db;desc="{stats.count} queries";dur={stats.duration * 1000:.2f}, '
+            f"total;dur={duration * 1000:.2f}"
+        )
+        if response.has_header("Server-Timing"):
+            server_timing = f"{response['Server-Timing']}, {server_timing}"
+        response["Server-Timing"] = server_timing
+
+        metrics = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 2),
+            "query_count": stats.count,
+            "query_duration_ms": round(stats.duration * 1000, 2),
+            "slowest_query_ms": round(stats.slowest_duration * 1000, 2),
+            "slowest_query": stats.slowest_sql[: settings.QUERY_TIMING_MAX_SQL_LENGTH],
+        }
+        logger.info(" ".join(f"{name}={json.dumps(value)}" for name, value in metrics.items()), extra=metrics)
+        return response
@@ -0,0 +1,106 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+# Reads of the current request which may be routed to a replica
+_replica_reads = ContextVar("replica_reads", default=None)
+
+
+class ReplicaReads:
+    """
+    Database the reads are routed to, None for the primary.
+    """
+
+    def __init__(self, alias=None):
+        self.alias = alias
+
+
+def get_replica():
+    """Return the alias of a replica picked at random, or None without replica."""
+    return random.choice(settings.DATABASE_REPLICAS) if settings.DATABASE_REPLICAS else None
+
+
+def get_read_replica():
+    """Return the alias of the replica the reads are routed to, None for the primary."""
+    reads = _replica_reads.get()
+    return reads.alias if reads is not None else None
+
+
+@contextmanager
+def replica_reads(alias=None):
+    """Route the reads to the database `alias` in the block, until a write is routed to
+    the primary so that the rows written are read back from it."""
+    reads = ReplicaReads(alias)
+    token = _replica_reads.set(reads)
+    try:
+        yield reads
+    finally:
+        _replica_reads.reset(token)
+
+
+def iter_replica_reads(iterable, alias):
+    """Iterate over an iterable reading from the database `alias`, e.g. the content of a
+    response streamed once the view returned."""
+    iterator = iter(iterable)
+    while True:
+        with replica_reads(alias):
+            # Each step runs in its own block, the iteration may resume in another context
+            item = next(iterator, replica_reads)
+        if item is replica_reads:
+            return
+        yield item
+
+
+class ReplicaRouter:
+    """
+    Route the reads within replica_reads to its replica, and everything else to the
+    primary, the `default` database. The replicas are not migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        return get_read_replica()
+
+    def db_for_write(self, model, **hints):
+        reads = _replica_reads.get()
+        if reads is not None:
+            reads.alias = None
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {"default", *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    Read from a replica during the safe-method requests of a viewset, once the user is
+    authenticated on the primary so that a session just opened is found.
+    """
+
+    # Actions reading from a replica, None for all of them
+    replica_actions = None
+
+    def dispatch(self, request, *args, **kwargs):
+        """Override dispatch to route the reads of the request, and of its streamed content."""
+        with replica_reads() as reads:
+            self.replica_reads = reads
+            response = super().dispatch(request, *args, **kwargs)
+        if response.streaming and reads.alias is not None:
+            response.streaming_content = iter_replica_reads(response.streaming_content, reads.alias)
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        """Override initial to read from a replica after the authentication and checks."""
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and (self.replica_actions is None or self.action in self.replica_actions):
+            self.replica_reads.alias = get_replica()
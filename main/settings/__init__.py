@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/2.0/ref/settings/
 from pathlib import Path
 
 from main.jsonenv import env
+from main.settings.cache import *
 from main.settings.core import *
 from main.settings.db import *
 from main.settings.logging import *
@@ -53,6 +54,8 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    # First to measure the queries of the other middlewares
+    "main.middleware.QueryTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
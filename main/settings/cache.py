@@ -0,0 +1,21 @@
+from main.jsonenv import env
+
+# A shared cache (e.g. django.core.cache.backends.redis.RedisCache) is needed for the
+# cached pages to be invalidated in every worker
+CACHES = {
+    "default": {
+        "BACKEND": env.get("cache_backend", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": env.get("cache_location", ""),
+    }
+}
+
+# Cache of the aggregated sales pages, and number of seconds they are kept
+SALES_CACHE = "default"
+SALES_CACHE_TIMEOUT = env.get("sales_cache_timeout", 300)
+# Number of seconds the pages read from a replica are kept, longer than the lag of the
+# replicas they may be behind the primary by
+SALES_REPLICA_CACHE_TIMEOUT = env.get("sales_replica_cache_timeout", 5)
+
+# Aggregate the sales in memory with NumPy, when it is installed, rather than read
+# their summaries
+SALES_ANALYTICS = env.get("sales_analytics", False)
@@ -1,9 +1,73 @@
 from main.jsonenv import env
 
+# Database engines which can be selected by the `db_engine` setting
+DB_ENGINES = {
+    "sqlite": "django.db.backends.sqlite3",
+    "postgresql": "django.db.backends.postgresql",
+}
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": DB_ENGINES[env.get("db_engine", "sqlite")],
         "NAME": env.get("db_name"),
     }
 }
+
+# Pragmas of the tuned SQLite profile, run on every new connection
+SQLITE_PRAGMAS = {
+    # Readers read the last commit while a writer appends to the write-ahead log, instead
+    # of waiting for it
+    "journal_mode": "WAL",
+    # Sync at the checkpoints of the log only: the last commits may be lost on power
+    # failure, without corrupting the database
+    "synchronous": "NORMAL",
+    # Bytes of the database file read through memory mapping
+    "mmap_size": 256 * 1024 * 1024,
+    # Pages cached by each connection, in KiB when negative
+    "cache_size": -64 * 1024,
+}
+
+if DATABASES["default"]["ENGINE"] == DB_ENGINES["sqlite"] and env.get("db_sqlite_tuned", False):
+    DATABASES["default"]["OPTIONS"] = {
+        "init_command": ";".join(f"PRAGMA {name} = {value}" for name, value in SQLITE_PRAGMAS.items()),
+        # Seconds a connection waits for the lock of another writer before failing with
+        # "database is locked"
+        "timeout": env.get("db_sqlite_timeout", 20),
+        # Take the write lock when the transaction begins, a deferred transaction which
+        # writes after reading fails at once rather than waiting for the lock
+        "transaction_mode": "IMMEDIATE",
+    }
+elif DATABASES["default"]["ENGINE"] == DB_ENGINES["postgresql"]:
+    # Requires psycopg (`pip install "psycopg[binary,pool]"`), the pool psycopg_pool
+    DATABASES["default"].update({
+        "HOST": env.get("db_host", ""),
+        "PORT": env.get("db_port", ""),
+        "USER": env.get("db_user", ""),
+        "PASSWORD": env.get("db_password", ""),
+        # Number of seconds a connection is kept between requests, 0 to close it after each
+        # request and None to keep it forever
+        "CONN_MAX_AGE": env.get("db_conn_max_age", 60),
+        # Check a kept connection still works before reusing it for a new request
+        "CONN_HEALTH_CHECKS": env.get("db_conn_health_checks", True),
+        "OPTIONS": {},
+    })
+    # Share a pool of connections between the threads of each process, e.g.
+    # {"min_size": 2, "max_size": 10}, in place of a persistent connection per thread
+    db_pool = env.get("db_pool", False)
+    if db_pool:
+        DATABASES["default"]["OPTIONS"]["pool"] = db_pool
+        # The connections are returned to the pool at the end of each request
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+
+# Read replicas of the primary, by the settings differing from it, e.g.
+# [{"host": "replica1.local"}] or [{"name": "replica.sqlite3"}]
+for index, replica in enumerate(env.get("db_replicas", []), 1):
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        **{name.upper(): value for name, value in replica.items()},
+        # The tests read the test database of the primary
+        "TEST": {"MIRROR": "default"},
+    }
+# Aliases of the replicas the reads of the reporting endpoints are routed to
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["main.routers.ReplicaRouter"]
@@ -30,5 +30,15 @@ LOGGING = {
             "handlers": ["console"],
             "level": "INFO",
         },
+        "main.middleware": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
+
+# Share of the requests whose queries are measured by QueryTimingMiddleware, from 0 to 1
+QUERY_TIMING_SAMPLE_RATE = env.get("query_timing_sample_rate", 1.0)
+# Length of the slowest query logged
+QUERY_TIMING_MAX_SQL_LENGTH = 500
@@ -0,0 +1,158 @@
+"""Test the tuned SQLite profile."""
+import datetime
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from decimal import Decimal
+from django.db import connection, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TransactionTestCase
+from users.models import User
+from sales.models import Sale
+from sales.tests.test_article import create_article
+from sales.tests.test_articlecategory import create_category
+
+
+def is_tuned_sqlite():
+    """Return whether the database is SQLite with the tuned profile."""
+    return connection.vendor == 'sqlite' and 'init_command' in connection.settings_dict['OPTIONS']
+
+
+@unittest.skipUnless(is_tuned_sqlite(), 'The database is not SQLite with the tuned profile.')
+class TunedSQLiteTests(TransactionTestCase):
+    """Test concurrent connections to a database file with the tuned SQLite profile.
+
+    The test database lives in memory, it is copied to a file for the connections."""
+
+    sale_count = 2000
+
+    def setUp(self):
+        """Set up."""
+        author = User.objects.create_user(email='test1@email.fr')
+        article = create_article('ART001', create_category('anewcategory'))
+        self.sales = [
+            Sale(date=datetime.date(2021, 1, 1), author=author, article=article,
+                 quantity=1, unit_selling_price=Decimal('12.00'))
+            for _ in range(self.sale_count)
+        ]
+        Sale.objects.bulk_create(self.sales[:100])
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'db.sqlite3')
+        connection.ensure_connection()
+        target = sqlite3.connect(self.path)
+        connection.connection.backup(target)
+        target.close()
+
+    def open_connection(self, alias):
+        """Open a connection to the database file as `alias` in the current thread.
+
+        The connection waits a second at most for the locks of the other connections."""
+        settings_dict = {
+            **connection.settings_dict,
+            'NAME': self.path,
+            'OPTIONS': {**connection.settings_dict['OPTIONS'], 'timeout': 1},
+        }
+        connections[alias] = DatabaseWrapper(settings_dict, alias)
+        return connections[alias]
+
+    def close_connection(self, alias):
+        """Close the connection opened as `alias` in the current thread."""
+        connections[alias].close()
+        del connections[alias]
+
+    def run_in_thread(self, target):
+        """Run a function in a thread with its own connection as 'writer' and return the
+        thread, and the list of the errors it raised."""
+        errors = []
+
+        def run():
+            self.open_connection('writer')
+            try:
+                target()
+            except Exception as error:
+                errors.append(error)
+            finally:
+                self.close_connection('writer')
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.addCleanup(thread.join)
+        return thread, errors
+
+    def bulk_insert(self):
+        """Insert the sales which are not in the database yet."""
+        Sale.objects.using('writer').bulk_create(
+            [Sale(**{field.attname: getattr(sale, field.attname) for field in Sale._meta.concrete_fields
+                     if not field.primary_key and not field.generated})
+             for sale in self.sales[100:]],
+        )
+
+    def test_pragmas(self):
+        """Test the pragmas are set on every new connection."""
+        reader = self.open_connection('reader')
+        self.addCleanup(self.close_connection, 'reader')
+        with reader.cursor() as cursor:
+            pragmas = {
+                name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                for name in ('journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'busy_timeout')
+            }
+        self.assertEqual(pragmas, {
+            'journal_mode': 'wal',
+            'synchronous': 1,
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,
+            'busy_timeout': 1000,
+        })
+
+    def test_read_during_bulk_insert(self):
+        """Test the sales are read without waiting for a bulk insert in progress, and the
+        insert commits while they are read."""
+        self.open_connection('reader')
+        self.addCleanup(self.close_connection, 'reader')
+        inserted = threading.Event()
+        committed = threading.Event()
+
+        def insert():
+            with transaction.atomic(using='writer'):
+                self.bulk_insert()
+                inserted.set()
+                # Commit once the reader started reading the sales
+                committed.wait(5)
+
+        thread, errors = self.run_in_thread(insert)
+        self.assertTrue(inserted.wait(5))
+        # The reader reads the last commit, without the sales being inserted
+        self.assertEqual(Sale.objects.using('reader').count(), 100)
+        sales = Sale.objects.using('reader').values_list('pk', flat=True).iterator(chunk_size=10)
+        self.assertIsNotNone(next(sales))
+        # The insert commits while the reader is reading
+        committed.set()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(errors, [])
+        self.assertEqual(1 + len(list(sales)), 100)
+        self.assertEqual(Sale.objects.using('reader').count(), self.sale_count)
+
+    def test_concurrent_writes(self):
+        """Test a write waits for the write in progress rather than failing."""
+        self.open_connection('reader')
+        self.addCleanup(self.close_connection, 'reader')
+        started = threading.Event()
+
+        def insert():
+            with transaction.atomic(using='writer'):
+                self.bulk_insert()
+                started.set()
+                threading.Event().wait(0.2)
+
+        thread, errors = self.run_in_thread(insert)
+        self.assertTrue(started.wait(5))
+        with transaction.atomic(using='reader'):
+            Sale.objects.using('reader').filter(pk=self.sales[0].pk).update(quantity=2)
+        thread.join(5)
+        self.assertEqual(errors, [])
+        self.assertEqual(Sale.objects.using('reader').filter(quantity=2).count(), 1)
@@ -0,0 +1,42 @@
+"""Test the URL builders of the hyperlinks."""
+from unittest import mock
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.reverse import reverse
+from rest_framework.test import APIRequestFactory
+from main import hyperlinks
+from main.hyperlinks import get_url_builder
+from sales.models import ArticleCategory
+from sales.serializers import ArticleCategorySerializer
+
+
+class URLBuilderTests(TestCase):
+    """Test get_url_builder and the cached hyperlinked fields."""
+
+    def setUp(self):
+        """Set up."""
+        self.request = Request(APIRequestFactory().get('/api/v1/sale', HTTP_HOST='example.com'))
+
+    def test_same_url(self):
+        """Test the URLs are the ones reversed, with and without format."""
+        for format in (None, 'json'):
+            self.assertEqual(get_url_builder(self.request, 'sale-detail', format=format)(42),
+                             reverse('sale-detail', kwargs={'pk': 42}, request=self.request, format=format))
+
+    def test_reversed_once(self):
+        """Test the URL of a view is reversed once per request."""
+        with mock.patch.object(hyperlinks, 'reverse', wraps=reverse) as reverse_mock:
+            urls = [get_url_builder(self.request, 'sale-detail')(pk) for pk in range(10)]
+            get_url_builder(self.request, 'article-detail')(1)
+        self.assertEqual(urls[3], 'http://example.com/api/v1/sale/3')
+        self.assertEqual(reverse_mock.call_count, 2)
+
+    def test_serializer(self):
+        """Test the serializers render the URLs reversed, reversing them once."""
+        categories = [ArticleCategory.objects.create(display_name=f'category{i}') for i in range(5)]
+        with mock.patch.object(hyperlinks, 'reverse', wraps=reverse) as reverse_mock:
+            data = ArticleCategorySerializer(categories, many=True, context={'request': self.request}).data
+        self.assertEqual([category['url'] for category in data],
+                         [reverse('articlecategory-detail', args=[category.pk], request=self.request)
+                          for category in categories])
+        self.assertEqual(reverse_mock.call_count, 1)
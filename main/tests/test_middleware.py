@@ -0,0 +1,30 @@
+"""Test middlewares."""
+from django.test import TestCase, override_settings
+from django.urls import reverse_lazy
+from users.models import User
+
+
+class QueryTimingMiddlewareTests(TestCase):
+    """Test QueryTimingMiddleware."""
+
+    def setUp(self):
+        """Set up."""
+        self.url = reverse_lazy('article-list')
+        self.client.force_login(user=User.objects.create_user(email='test1@email.fr'))
+
+    def test_server_timing(self):
+        """Test the queries of the request are counted in the Server-Timing header and logged."""
+        with self.assertLogs('main.middleware', level='INFO') as logs, self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertRegex(response['Server-Timing'], r'^db;desc="4 queries";dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertEqual(len(logs.records), 1)
+        record = logs.records[0]
+        self.assertEqual((record.path, record.status, record.query_count), ('/api/v1/article', 200, 4))
+        self.assertTrue(record.slowest_query.startswith('SELECT'))
+
+    @override_settings(QUERY_TIMING_SAMPLE_RATE=0)
+    def test_sampling(self):
+        """Test the requests out of the sample are not measured."""
+        with self.assertNoLogs('main.middleware'):
+            response = self.client.get(self.url)
+        self.assertNotIn('Server-Timing', response)
@@ -0,0 +1,113 @@
+"""Test the routing of the reads to the replicas."""
+import datetime
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections, router
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse_lazy
+from main.routers import replica_reads
+from users.models import User
+from sales.models import Sale
+from sales.tests.test_article import create_article
+from sales.tests.test_articlecategory import create_category
+from sales.tests.test_sale import create_sale
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TransactionTestCase):
+    """Test ReplicaRouter and ReplicaReadMixin.
+
+    The replica is a second connection to the test database, whose rows are committed by
+    TransactionTestCase to be read by both."""
+
+    # With the replica, added when the class is set up
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up the replica."""
+        connections.settings['replica'] = {
+            **connection.settings_dict,
+            'TEST': {**connection.settings_dict['TEST'], 'MIRROR': 'default'},
+        }
+        cls.addClassCleanup(connections.settings.pop, 'replica')
+        cls.addClassCleanup(connections.close_all)
+        super().setUpClass()
+
+    def setUp(self):
+        """Set up."""
+        cache.clear()
+        self.basic_user = User.objects.create_user(email='test1@email.fr')
+        self.anewarticle = create_article('ART001', create_category('anewcategory'))
+        for day in range(3):
+            create_sale(self.basic_user, datetime.date(2024, 3, 1 + day), self.anewarticle)
+        self.client.force_login(user=self.basic_user)
+
+    def get_queries(self, url, params=None):
+        """Request a URL, reading its streamed content, and return the response and the
+        SQL of its queries on the primary and on the replica."""
+        with CaptureQueriesContext(connection) as primary, CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(url, params)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, [query['sql'] for query in primary], [query['sql'] for query in replica]
+
+    def assertReadFromReplica(self, url, params=None):
+        """Check the sales of a URL are read from the replica, and the user from the primary."""
+        response, primary, replica = self.get_queries(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(replica)
+        self.assertTrue(all('"sales_' in sql for sql in replica), replica)
+        self.assertFalse(any('"sales_' in sql for sql in primary), primary)
+
+    def test_router(self):
+        """Test the reads are routed to the replica until a write."""
+        self.assertEqual(Sale.objects.all().db, 'default')
+        with replica_reads('replica'):
+            self.assertEqual(Sale.objects.all().db, 'replica')
+            self.assertEqual(router.db_for_write(Sale), 'default')
+            # The rows just written are read from the primary
+            self.assertEqual(Sale.objects.all().db, 'default')
+        self.assertFalse(router.allow_migrate('replica', 'sales'))
+        self.assertTrue(router.allow_migrate('default', 'sales'))
+
+    def test_aggregated_sales(self):
+        """Test the aggregated sales are read from the replica."""
+        self.assertReadFromReplica(reverse_lazy('saleaggregated-list'))
+
+    def test_cache_timeout(self):
+        """Test the pages read from the replica are cached shortly, as they may be behind the
+        primary, unlike the ones read from the primary."""
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            for url in (reverse_lazy('saleaggregated-list'), reverse_lazy('salecategoryaggregated-list'),
+                        reverse_lazy('saletop-list')):
+                self.assertReadFromReplica(url)
+            with override_settings(DATABASE_REPLICAS=[]):
+                self.get_queries(reverse_lazy('saleaggregated-list'), {'ordering': 'margin'})
+        self.assertEqual([call.args[2] for call in cache_set.call_args_list],
+                         [settings.SALES_REPLICA_CACHE_TIMEOUT] * 3 + [settings.SALES_CACHE_TIMEOUT])
+
+    def test_timeseries(self):
+        """Test the time series are read from the replica."""
+        self.assertReadFromReplica(reverse_lazy('saletimeseries-list'))
+
+    def test_export(self):
+        """Test the streamed exports are read from the replica."""
+        self.assertReadFromReplica(reverse_lazy('sale-export'))
+
+    def test_sales(self):
+        """Test the other actions of the sales read from the primary."""
+        response, primary, replica = self.get_queries(reverse_lazy('sale-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(primary)
+        self.assertEqual(replica, [])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replica(self):
+        """Test everything is read from the primary without replica."""
+        response, primary, replica = self.get_queries(reverse_lazy('saleaggregated-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(primary)
+        self.assertEqual(replica, [])
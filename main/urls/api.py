@@ -2,7 +2,9 @@ from django.urls import path, include
 
 from rest_framework import routers
 from users.views import UserViewSet
-from sales.views import ArticleViewSet, ArticleCategoryViewSet, SaleViewSet, AggregatedSaleViewSet
+from sales.views import (ArticleViewSet, ArticleCategoryViewSet, SaleViewSet, AggregatedSaleViewSet,
+                         AuthorSalesStatsViewSet, CategoryAggregatedSaleViewSet, SaleRankingViewSet,
+                         SaleTimeSeriesViewSet)
 
 router = routers.DefaultRouter(trailing_slash=False)
 router.register(r'user', UserViewSet, basename='user')
@@ -10,6 +12,10 @@ router.register(r'sale', SaleViewSet, basename='sale')
 router.register(r'article', ArticleViewSet, basename='article')
 router.register(r'articlecategory', ArticleCategoryViewSet, basename='articlecategory')
 router.register(r'sale_aggregated', AggregatedSaleViewSet, basename='saleaggregated')
+router.register(r'sale_category_aggregated', CategoryAggregatedSaleViewSet, basename='salecategoryaggregated')
+router.register(r'sale_top', SaleRankingViewSet, basename='saletop')
+router.register(r'sale_author_stats', AuthorSalesStatsViewSet, basename='saleauthorstats')
+router.register(r'sale_timeseries', SaleTimeSeriesViewSet, basename='saletimeseries')
 urlpatterns = [
     path(
         "v1/",
@@ -0,0 +1,235 @@
+import datetime
+import threading
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import Count, Max, Q
+
+from .models import Article, Sale
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Types of the columns of the sales, prices and costs being in integer cents
+SALE_COLUMNS = {
+    "id": "int64",
+    "article": "int64",
+    # Ordinal of the date, as date.toordinal
+    "date": "int32",
+    "quantity": "int64",
+    "price": "int64",
+    "cost": "int64",
+}
+# Measures of the groups of sales returned by SalesColumns.aggregate
+MEASURES = ["revenue", "cost", "quantity", "count", "last_date"]
+
+
+def to_cents(value):
+    """Return a price as an integer number of cents."""
+    return int(Decimal(value).scaleb(2))
+
+
+def from_cents(cents):
+    """Return a number of cents as a Decimal price."""
+    return Decimal(int(cents)).scaleb(-2)
+
+
+class SalesColumns:
+    """
+    Sales of a database held in memory as NumPy arrays, one per column, to aggregate
+    them vectorised.
+
+    The arrays are sorted by sale id. The prices and costs are integer cents, so that
+    the sums are exact. The sales created or updated since the last refresh are loaded
+    incrementally, from the high-water mark of their update; the deletions are detected
+    by the number of sales and make them all reload.
+    """
+
+    def __init__(self, using="default"):
+        if np is None:
+            raise ImportError("numpy is required by the sales analytics.")
+        self.using = using
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Forget the loaded sales."""
+        # Replaced as a whole, so that the queries read consistent columns during a refresh
+        self.columns = {name: np.empty(0, dtype) for name, dtype in SALE_COLUMNS.items()}
+        self.categories = np.empty(0, "int64")
+        self.updated_at = None
+        self.articles_updated_at = None
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    def load_sales(self, sales):
+        """Return the columns of the sales of a queryset."""
+        rows = list(sales.values_list("id", "article", "date", "quantity", "unit_selling_price", "unit_cost"))
+        return {
+            "id": np.fromiter((row[0] for row in rows), "int64", len(rows)),
+            "article": np.fromiter((row[1] for row in rows), "int64", len(rows)),
+            "date": np.fromiter((row[2].toordinal() for row in rows), "int32", len(rows)),
+            "quantity": np.fromiter((row[3] for row in rows), "int64", len(rows)),
+            "price": np.fromiter((to_cents(row[4]) for row in rows), "int64", len(rows)),
+            "cost": np.fromiter((to_cents(row[5]) for row in rows), "int64", len(rows)),
+        }
+
+    def load_categories(self):
+        """Return the category of each article, indexed by article id."""
+        articles = list(Article.objects.using(self.using).values_list("id", "category"))
+        categories = np.zeros(max((pk for pk, _ in articles), default=0) + 1, "int64")
+        for pk, category in articles:
+            categories[pk] = category
+        return categories
+
+    def merge(self, columns, changes):
+        """Return the columns with the changed sales replaced or added, sorted by id."""
+        positions = np.searchsorted(columns["id"], changes["id"])
+        found = positions < len(columns["id"])
+        found[found] = columns["id"][positions[found]] == changes["id"][found]
+        merged = {}
+        for name, column in columns.items():
+            column = column.copy()
+            column[positions[found]] = changes[name][found]
+            merged[name] = np.concatenate([column, changes[name][~found]])
+        order = np.argsort(merged["id"], kind="stable")
+        return {name: column[order] for name, column in merged.items()}
+
+    def refresh(self):
+        """Load the sales created or updated since the last refresh, and the sales of the
+        articles updated since (e.g. their cost)."""
+        with self.lock:
+            sales = Sale.objects.using(self.using)
+            stats = sales.aggregate(count=Count("pk"), updated_at=Max("updated_at"))
+            articles_updated_at = Article.objects.using(self.using).aggregate(
+                updated_at=Max("updated_at"))["updated_at"]
+            if (stats["count"] == len(self) and stats["updated_at"] == self.updated_at
+                    and articles_updated_at == self.articles_updated_at):
+                return
+            if self.updated_at is None or stats["count"] < len(self):
+                changes = sales.all()
+                columns = {name: np.empty(0, dtype) for name, dtype in SALE_COLUMNS.items()}
+            else:
+                # The sales updated within the same microsecond as the mark are read again
+                changes = sales.filter(updated_at__gte=self.updated_at)
+                if articles_updated_at is not None and self.articles_updated_at is not None:
+                    changes = sales.filter(
+                        Q(updated_at__gte=self.updated_at) | Q(article__updated_at__gte=self.articles_updated_at)
+                    )
+                columns = self.columns
+            if stats["count"]:
+                columns = self.merge(columns, self.load_sales(changes))
+            if len(columns["id"]) != stats["count"]:
+                # Sales were deleted
+                columns = self.load_sales(sales.order_by("id"))
+            if articles_updated_at != self.articles_updated_at:
+                self.categories = self.load_categories()
+            self.columns = columns
+            self.updated_at = stats["updated_at"]
+            self.articles_updated_at = articles_updated_at
+
+    def aggregate(self, by="article", start=None, end=None, category=None, article=None):
+        """Return the sales of a date range, category and article aggregated by article
+        or category, as arrays of the keys sorted and of the measures of each group:
+        revenue and cost in cents, quantity, count of sales and ordinal of the last sale."""
+        columns, categories = self.columns, self.categories
+        mask = np.ones(len(columns["id"]), bool)
+        if start is not None:
+            mask &= columns["date"] >= start.toordinal()
+        if end is not None:
+            mask &= columns["date"] <= end.toordinal()
+        if article is not None:
+            mask &= columns["article"] == article
+        if category is not None or by == "category":
+            sale_categories = categories[columns["article"]]
+        if category is not None:
+            mask &= sale_categories == category
+        keys = (columns["article"] if by == "article" else sale_categories)[mask]
+        if not len(keys):
+            return {"key": keys, **{name: np.empty(0, "int64") for name in MEASURES}}
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        # Index of the first sale of each group
+        starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+        quantity = columns["quantity"][mask][order]
+        return {
+            "key": keys[starts],
+            "revenue": np.add.reduceat(quantity * columns["price"][mask][order], starts),
+            "cost": np.add.reduceat(quantity * columns["cost"][mask][order], starts),
+            "quantity": np.add.reduceat(quantity, starts),
+            "count": np.diff(np.append(starts, len(keys))),
+            "last_date": np.maximum.reduceat(columns["date"][mask][order], starts),
+        }
+
+    def top(self, groups, n=None, measure="revenue"):
+        """Return the indexes of the `n` groups of aggregate with the greatest measure, in
+        decreasing order then by key, or of all of them."""
+        order = np.lexsort((groups["key"], -groups[measure]))
+        return order if n is None else order[:n]
+
+    def get_article_rows(self, fields, min_revenue=None, ordering="-sales_total_revenue", **filters):
+        """Return the rows of the sales aggregated by article, as the values of the
+        article summaries, with a minimum revenue and ordered by one of their fields then
+        by article."""
+        groups = self.aggregate("article", **filters)
+        categories = self.categories
+        margins = groups["revenue"] - groups["cost"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            margin_percentages = np.where(groups["revenue"] != 0, margins * 100 / groups["revenue"], np.nan)
+        measures = {
+            "article": groups["key"],
+            "sales_total_revenue": groups["revenue"],
+            "margin": margins,
+            # The null percentages are ordered as by the database, as the largest (e.g. PostgreSQL)
+            # or the lowest (e.g. SQLite) values
+            "margin_percentage": np.nan_to_num(
+                margin_percentages, nan=np.inf if connections[self.using].features.nulls_order_largest else -np.inf
+            ),
+            "sales_total_quantity": groups["quantity"],
+            "sales_count": groups["count"],
+            "last_sale_date": groups["last_date"],
+        }
+        values = measures[ordering.lstrip("-")]
+        order = np.lexsort((groups["key"], -values if ordering.startswith("-") else values))
+        if min_revenue is not None:
+            order = order[groups["revenue"][order] >= to_cents(min_revenue)]
+        rows = []
+        for index in order:
+            article = int(groups["key"][index])
+            values = {
+                "article": article,
+                "category": int(categories[article]),
+                "sales_total_revenue": from_cents(groups["revenue"][index]),
+                "margin": from_cents(margins[index]),
+                "margin_percentage": (None if np.isnan(margin_percentages[index])
+                                      else float(margin_percentages[index])),
+                "sales_total_quantity": int(groups["quantity"][index]),
+                "sales_count": int(groups["count"][index]),
+                "last_sale_date": datetime.date.fromordinal(int(groups["last_date"][index])),
+            }
+            rows.append({name: values[name] for name in fields})
+        return rows
+
+
+# Sales columns of each database, shared by the threads of the process
+_sales_columns = {}
+_sales_columns_lock = threading.Lock()
+
+
+def get_sales_columns(using="default"):
+    """Return the sales columns of a database, refreshed."""
+    with _sales_columns_lock:
+        if using not in _sales_columns:
+            _sales_columns[using] = SalesColumns(using)
+    columns = _sales_columns[using]
+    columns.refresh()
+    return columns
+
+
+def clear_sales_columns():
+    """Forget the sales columns of every database."""
+    with _sales_columns_lock:
+        _sales_columns.clear()
@@ -0,0 +1,115 @@
+import statistics
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.settings import api_settings
+
+from .cache import increment_sales_generation
+from .models import Article, Sale
+
+# Number of requests of each endpoint made before measuring
+WARMUP_REQUESTS = 2
+
+
+def get_endpoints():
+    """Return the name, method, path and data of the benchmarked requests."""
+    sale = Sale.objects.order_by("pk").first()
+    article = Article.objects.order_by("pk").first()
+    last_page = max(Sale.objects.count() - 1, 0) // api_settings.PAGE_SIZE + 1
+    endpoints = [
+        ("sale-list", "get", reverse("sale-list"), None),
+        ("sale-list-last-page", "get", reverse("sale-list") + f"?page={last_page}", None),
+        ("sale-list-cursor", "get", reverse("sale-list") + "?pagination=cursor", None),
+        ("sale-list-fast", "get", reverse("sale-list") + "?fast=true", None),
+        ("saleaggregated-list", "get", reverse("saleaggregated-list"), None),
+        ("salecategoryaggregated-list", "get", reverse("salecategoryaggregated-list"), None),
+        ("saletop-list", "get", reverse("saletop-list") + "?start=2021-06-01&end=2021-06-07", None),
+        ("article-list", "get", reverse("article-list"), None),
+        ("article-list-fast", "get", reverse("article-list") + "?fast=true", None),
+        ("admin-sale-changelist", "get", reverse("admin:sales_sale_changelist"), None),
+        ("admin-article-changelist", "get", reverse("admin:sales_article_changelist"), None),
+        ("admin-articlecategory-changelist", "get", reverse("admin:sales_articlecategory_changelist"), None),
+    ]
+    if sale is not None:
+        endpoints.append(("sale-detail", "get", reverse("sale-detail", args=[sale.pk]), None))
+    if article is not None and sale is not None:
+        endpoints.append(("sale-create", "post", reverse("sale-list"), {
+            "author": reverse("user-detail", args=[sale.author_id]),
+            "article": reverse("article-detail", args=[article.pk]),
+            "date": "2021-06-01",
+            "quantity": 1,
+            "unit_selling_price": "10.00",
+        }))
+    return endpoints
+
+
+def get_percentile(durations, percent):
+    """Return the percentile of sorted durations, interpolated between the closest ones."""
+    position = (len(durations) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(durations) - 1)
+    return durations[lower] + (durations[upper] - durations[lower]) * (position - lower)
+
+
+def benchmark_request(client, method, path, data=None, iterations=20):
+    """Return the latency, number of queries and peak memory of a request.
+
+    The queries and the memory are measured on a first request, apart from the timed
+    ones which they would slow down. The cached sales pages are made out of date before
+    each measured request, which would otherwise only measure a cache hit."""
+    send = getattr(client, method)
+    kwargs = {"data": data, "content_type": "application/json"} if data is not None else {}
+    for _ in range(WARMUP_REQUESTS):
+        send(path, **kwargs)
+
+    increment_sales_generation()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            response = send(path, **kwargs)
+            # Consume streamed responses, their queries run while they are sent
+            content = b"".join(response.streaming_content) if response.streaming else response.content
+        _, peak_memory = tracemalloc.get_traced_memory()
+        # The captured queries are read from the log of the connection, reset by the next requests
+        query_count = len(queries)
+    finally:
+        tracemalloc.stop()
+
+    durations = []
+    for _ in range(iterations):
+        increment_sales_generation()
+        started = time.perf_counter()
+        response = send(path, **kwargs)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        durations.append((time.perf_counter() - started) * 1000)
+    durations.sort()
+    return {
+        "method": method.upper(),
+        "path": path,
+        "status": response.status_code,
+        "response_bytes": len(content),
+        "queries": query_count,
+        "peak_memory_kib": round(peak_memory / 1024, 1),
+        "iterations": iterations,
+        "latency_ms": {
+            "min": round(durations[0], 3),
+            "mean": round(statistics.fmean(durations), 3),
+            "p50": round(get_percentile(durations, 50), 3),
+            "p95": round(get_percentile(durations, 95), 3),
+            "p99": round(get_percentile(durations, 99), 3),
+            "max": round(durations[-1], 3),
+        },
+    }
+
+
+def run_benchmarks(client, iterations=20, names=None):
+    """Benchmark the endpoints with the client and return their results by name."""
+    return {
+        name: benchmark_request(client, method, path, data, iterations)
+        for name, method, path, data in get_endpoints()
+        if not names or name in names
+    }
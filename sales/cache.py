@@ -0,0 +1,158 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Max, Subquery
+from django.db.models.functions import Greatest
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+from main.routers import get_read_replica
+
+# Key of the counter incremented when the sales change, part of the key of every page
+GENERATION_KEY = "sales:generation"
+# Seconds a worker computing a page keeps the others waiting, and between their checks
+LOCK_TIMEOUT = 30
+LOCK_POLL_INTERVAL = 0.05
+
+
+def get_sales_cache():
+    """Return the cache of the sales pages."""
+    return caches[settings.SALES_CACHE]
+
+
+def get_sales_generation():
+    """Return the current generation of the cached sales pages."""
+    cache = get_sales_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Start from the time rather than 1, not to read pages of an evicted generation
+        cache.add(GENERATION_KEY, time.time_ns() // 1000, timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def increment_sales_generation():
+    """Make the cached sales pages out of date."""
+    cache = get_sales_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        get_sales_generation()
+
+
+def invalidate_sales_cache(using=None):
+    """Make the cached sales pages out of date, now and when the current transaction is committed.
+
+    Pages computed by other workers before the commit would not see the changes."""
+    increment_sales_generation()
+    transaction.on_commit(increment_sales_generation, using=using)
+
+
+def get_page_url(request):
+    """Return the absolute URL of the page of a request, with its parameters sorted."""
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    return request.build_absolute_uri(request.path) + "?" + query
+
+
+def get_or_compute(key, compute, timeout):
+    """Return the value cached at the key, computing and caching it if missing for the
+    `timeout` seconds, or the ones returned by `timeout` once it is computed.
+
+    A single worker computes a missing value, the others waiting for it to be cached,
+    so that the expiration of a page does not make every worker recompute it."""
+    cache = get_sales_cache()
+    value = cache.get(key)
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while value is None and time.monotonic() < deadline:
+        if cache.add(f"{key}:lock", True, timeout=LOCK_TIMEOUT):
+            try:
+                value = compute()
+                cache.set(key, value, timeout() if callable(timeout) else timeout)
+            finally:
+                cache.delete(f"{key}:lock")
+            return value
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key)
+    # The worker computing it may have failed
+    return compute() if value is None else value
+
+
+class CachedListMixin:
+    """
+    Cache the data of the list pages of a viewset until the sales change.
+
+    The data does not depend on the user, the pages are keyed by their absolute URL.
+    A page read from a replica is only kept SALES_REPLICA_CACHE_TIMEOUT seconds: it may
+    have been read behind the last change, after the generation of its key was bumped.
+    """
+
+    def get_list_cache_key(self, request):
+        """Return the key of the page of the request."""
+        digest = hashlib.md5(get_page_url(request).encode(), usedforsecurity=False).hexdigest()
+        return f"sales:{get_sales_generation()}:{self.basename}:{digest}"
+
+    def get_list_cache_timeout(self):
+        """Return the number of seconds the page just computed is cached."""
+        if get_read_replica() is not None:
+            return settings.SALES_REPLICA_CACHE_TIMEOUT
+        return settings.SALES_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        """Override list to read the page from the cache."""
+        parent_list = super().list
+        data = get_or_compute(
+            self.get_list_cache_key(request),
+            lambda: parent_list(request, *args, **kwargs).data,
+            self.get_list_cache_timeout,
+        )
+        return Response(data)
+
+
+class ConditionalListMixin:
+    """
+    Answer the conditional requests of the list pages of a viewset with 304 Not Modified,
+    before fetching and serializing the page.
+
+    The ETag is computed from the number of rows of the filtered queryset and the last
+    update of its rows and of the rows of the related models rendered along, read by a
+    single query. The number of rows changes when rows are deleted, the last update does
+    not: no Last-Modified is sent, If-Modified-Since would answer 304 after a deletion.
+    """
+
+    # Models whose rows are rendered along with the rows of the viewset
+    conditional_related_models = ()
+
+    def get_list_etag(self, request, queryset):
+        """Return the ETag of the page of the request."""
+        last_modified = Max("updated_at")
+        for model in self.conditional_related_models:
+            last_modified = Greatest(
+                last_modified, Subquery(model.objects.order_by("-updated_at").values("updated_at")[:1])
+            )
+        validators = queryset.order_by().aggregate(count=Count("pk"), last_modified=last_modified)
+        # The browsable API renders the user along with the page
+        version = (
+            f"{validators['count']}:{validators['last_modified']}:{get_page_url(request)}:"
+            f"{request.accepted_renderer.media_type}:{request.user.pk}"
+        )
+        etag = f'"{hashlib.md5(version.encode(), usedforsecurity=False).hexdigest()}"'
+        return etag
+
+    def use_list_validators(self, request):
+        """Check if the page of the request is given an ETag, which costs a query over its rows."""
+        return True
+
+    def list(self, request, *args, **kwargs):
+        """Override list to answer 304 Not Modified when the page did not change."""
+        if not self.use_list_validators(request):
+            return super().list(request, *args, **kwargs)
+        etag = self.get_list_etag(request, self.filter_queryset(self.get_queryset()))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        response["ETag"] = etag
+        return response
@@ -0,0 +1,88 @@
+import csv
+import io
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Sale
+
+# Columns of the exported sales, as in SaleSerializer
+EXPORT_COLUMNS = [
+    "id",
+    "date",
+    "author",
+    "article_category",
+    "article_code",
+    "article_name",
+    "quantity",
+    "unit_selling_price",
+    "total_selling_price",
+]
+# Number of sales fetched per query
+EXPORT_CHUNK_SIZE = 2000
+
+
+def filter_sales(start=None, end=None, category=None):
+    """Return the sales to export, of a date range and an article category."""
+    sales = Sale.objects.all()
+    if start is not None:
+        sales = sales.filter(date__gte=start)
+    if end is not None:
+        sales = sales.filter(date__lte=end)
+    if category is not None:
+        sales = sales.filter(article__category=category)
+    return sales
+
+
+def iter_sale_chunks(sales, chunk_size=EXPORT_CHUNK_SIZE):
+    """Iterate over the rows of the sales to export by chunks.
+
+    Each chunk is fetched by a query starting after the last id of the previous one, so
+    that neither the database nor Python hold more than a chunk whatever the number of
+    sales, and without keeping a cursor open between chunks."""
+    sales = sales.order_by("pk").values_list(
+        "id",
+        "date",
+        "author__email",
+        "article__category__display_name",
+        "article__code",
+        "article__name",
+        "quantity",
+        "unit_selling_price",
+        "total_selling_price",
+    )
+    last_id = 0
+    while True:
+        chunk = list(sales.filter(pk__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1][0]
+
+
+def iter_csv(chunks):
+    """Iterate over the CSV lines of the chunks, a string per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(chunks):
+    """Iterate over the JSON lines of the chunks, a string per chunk."""
+    encoder = DjangoJSONEncoder()
+    for chunk in chunks:
+        yield "".join(encoder.encode(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in chunk)
+
+
+# Content type and writer of each export format
+EXPORT_FORMATS = {
+    "csv": ("text/csv", iter_csv),
+    "ndjson": ("application/x-ndjson", iter_ndjson),
+}
@@ -0,0 +1,164 @@
+import decimal
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import QuerySet
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from main.hyperlinks import get_url_builder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Render JSON with orjson when it is installed, to the same bytes as JSONRenderer.
+
+    Compact rendering only, the indented one and the values orjson would write
+    differently (e.g. floats in exponent notation) being rendered by JSONRenderer.
+    """
+
+    def default(self, obj):
+        """Convert the values orjson does not support natively, as the JSON encoder of DRF."""
+        if isinstance(obj, decimal.Decimal):
+            value = float(obj)
+            # json writes them in exponent notation, unlike orjson
+            if value and not 1e-4 <= abs(value) < 1e16:
+                raise TypeError("Float in exponent notation")
+            return value
+        return self.encoder_class().default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Override render to encode with orjson unless indented."""
+        if (orjson is None or data is None or not self.compact or self.ensure_ascii
+                or self.get_indent(accepted_media_type or "", renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # As JSONRenderer, escape the line separators which are invalid in JavaScript
+        return ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+
+
+def compile_row_renderer(serializer, request, field_sources=None, prefix=""):
+    """Return the columns of the rows to fetch with `values()` and a function rendering
+    such a row as the serializer renders the instance.
+
+    The hyperlinks are built by the URL builders of the request, the nested serializers
+    from the columns of their relation and the other fields are rendered by their
+    `to_representation`. `field_sources` gives the fields read from another source,
+    e.g. the serializer method fields, by name: either a column or a pair of columns
+    and a function of their values. The columns are prefixed with `prefix`."""
+    field_sources = field_sources or {}
+    pk_column = prefix + serializer.Meta.model._meta.pk.name
+    columns = {pk_column}
+    # Name, columns and function rendering the values of the columns of each field, and
+    # whether it renders the whole row
+    steps = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        nested = False
+        if name in field_sources:
+            source = field_sources[name]
+            field_columns, render = ((source,), None) if isinstance(source, str) else source
+            field_columns = tuple(prefix + column for column in field_columns)
+        elif isinstance(field, serializers.HyperlinkedRelatedField) and field.lookup_field == "pk":
+            # The identity field is the URL of the instance, the others of the foreign key
+            column = pk_column if field.source == "*" else prefix + field.source.replace(".", "__")
+            field_columns, render = (column,), get_url_builder(request, field.view_name, field.lookup_url_kwarg)
+        elif isinstance(field, serializers.Serializer):
+            # Rendered from the columns of the related instance, missing without foreign key
+            column = prefix + field.source.replace(".", "__")
+            nested_columns, render = compile_row_renderer(field, request, prefix=f"{column}__")
+            field_columns, nested = (column, *nested_columns), True
+        elif not isinstance(field, (serializers.SerializerMethodField, serializers.RelatedField,
+                                    serializers.ManyRelatedField, serializers.BaseSerializer)):
+            field_columns, render = (prefix + field.source.replace(".", "__"),), field.to_representation
+        else:
+            raise ImproperlyConfigured(f"The field {name} of {type(serializer).__name__} has no source.")
+        columns.update(field_columns)
+        steps.append((name, field_columns, render, nested))
+
+    def render_row(row):
+        data = {}
+        for name, field_columns, render, nested in steps:
+            if nested:
+                data[name] = None if row[field_columns[0]] is None else render(row)
+                continue
+            if len(field_columns) > 1:
+                data[name] = render(*[row[column] for column in field_columns])
+                continue
+            value = row[field_columns[0]]
+            # As the serializer, not rendering the missing values
+            data[name] = value if render is None or value is None else render(value)
+        return data
+
+    return sorted(columns), render_row
+
+
+class FastListMixin:
+    """
+    Render the list pages from the values of the rows rather than from the instances
+    and their serializer when `?fast=true` is given, to the same JSON.
+
+    The rows are fetched with `values()` and rendered by a function compiled once per
+    request from the serializer, then encoded by FastJSONRenderer.
+    """
+
+    fast_query_param = "fast"
+    # Sources of the fields the serializer does not read from columns, by name
+    field_sources = {}
+    fast_list = False
+
+    def use_fast_list(self, request):
+        """Check if the page of the request can be rendered from the values of the rows."""
+        return (request.query_params.get(self.fast_query_param) == "true"
+                and type(request.accepted_renderer) is JSONRenderer and not self.format_kwarg)
+
+    def get_row_renderer(self):
+        """Return the columns of the rows and the function rendering them."""
+        return compile_row_renderer(self.get_serializer(), self.request, self.field_sources)
+
+    def list(self, request, *args, **kwargs):
+        """Override list to render the page from the values of the rows if asked."""
+        self.fast_list = self.use_fast_list(request)
+        if self.fast_list:
+            self.fast_columns, self.fast_render_row = self.get_row_renderer()
+            request.accepted_renderer = FastJSONRenderer()
+        return super().list(request, *args, **kwargs)
+
+    def get_fast_rows(self, queryset):
+        """Return the values of the rows of the fast list."""
+        # The ordering fields are read by the cursor pagination, without being rendered
+        ordering = [order.lstrip("-") for order in queryset.query.order_by if isinstance(order, str) and order != "?"]
+        rows = queryset.values(*dict.fromkeys([*self.fast_columns, *ordering]))
+        # Counted without the joins of the values of the related rows
+        rows.count = queryset.count
+        return rows
+
+    def paginate_queryset(self, queryset):
+        """Override paginate_queryset to fetch the values of the rows of the fast list."""
+        if self.fast_list:
+            queryset = self.get_fast_rows(queryset)
+        return super().paginate_queryset(queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        """Override get_serializer to render the rows of the fast list."""
+        if self.fast_list and args:
+            rows = args[0]
+            if isinstance(rows, QuerySet):
+                # Not paginated
+                rows = self.get_fast_rows(rows)
+            return FastRows(rows, self.fast_render_row)
+        return super().get_serializer(*args, **kwargs)
+
+
+class FastRows:
+    """Rendered rows, standing for the list serializer of the fast list."""
+
+    def __init__(self, rows, render_row):
+        self.data = [render_row(row) for row in rows]
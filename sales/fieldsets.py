@@ -0,0 +1,78 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+from .fast import compile_row_renderer
+
+
+class SparseFieldsMixin:
+    """
+    Render only the fields given by `?fields=` and the related objects given by
+    `?expand=` in place of their hyperlink, e.g. `?fields=date,article&expand=article`.
+
+    Only the columns of the rendered fields are fetched and only the tables of the
+    related objects they render are joined.
+    """
+
+    fields_query_param = "fields"
+    expand_query_param = "expand"
+    # Serializers of the related objects which can be expanded, by field name
+    expandable_fields = {}
+    # Sources of the fields the serializer does not read from columns, by name
+    field_sources = {}
+
+    def get_query_names(self, param, choices):
+        """Return the names of a comma-separated query parameter, checking they are choices."""
+        value = self.request.query_params.get(param)
+        if not value:
+            return None
+        names = [name.strip() for name in value.split(",") if name.strip()]
+        unknown = [name for name in names if name not in choices]
+        if unknown:
+            raise ValidationError({param: [f"Unknown fields: {', '.join(unknown)}."]})
+        return names
+
+    def get_sparse_field_names(self):
+        """Return the names of the fields which can be rendered."""
+        return list(super().get_serializer().fields)
+
+    def get_sparse_fields(self):
+        """Return the names of the fields to render, or None to render them all."""
+        if self.request.method not in SAFE_METHODS:
+            return None
+        return self.get_query_names(self.fields_query_param, self.get_sparse_field_names())
+
+    def get_expanded_fields(self):
+        """Return the names of the related objects to render in place of their hyperlink."""
+        if self.request.method not in SAFE_METHODS:
+            return None
+        return self.get_query_names(self.expand_query_param, self.expandable_fields)
+
+    def get_serializer(self, *args, **kwargs):
+        """Override get_serializer to trim and expand its fields."""
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.get_sparse_fields()
+        expanded_fields = self.get_expanded_fields()
+        child = getattr(serializer, "child", serializer)
+        for name in expanded_fields or []:
+            child.fields[name] = self.expandable_fields[name](read_only=True)
+        if fields is not None:
+            for name in set(child.fields) - set(fields):
+                child.fields.pop(name)
+        return serializer
+
+    def get_queryset(self):
+        """Override get_queryset to fetch only the columns and join only the tables of the
+        fields to render."""
+        queryset = super().get_queryset()
+        if self.get_sparse_fields() is None and self.get_expanded_fields() is None:
+            return queryset
+        columns, _ = compile_row_renderer(self.get_serializer(), self.request, self.field_sources)
+        relations = set()
+        for column in columns:
+            path = column.split("__")[:-1]
+            relations.update("__".join(path[:length]) for length in range(1, len(path) + 1))
+        # The ordering fields are read by the cursor pagination
+        ordering = [order.lstrip("-") for order in queryset.query.order_by]
+        queryset = queryset.select_related(None).only(*columns, *relations, *ordering)
+        # Without relation, select_related would join all the foreign keys
+        return queryset.select_related(*relations) if relations else queryset
@@ -0,0 +1,236 @@
+import csv
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+
+from users.models import User
+
+from .models import Article, ArticleCategory, Sale, update_sales_rollups_cost
+
+# Columns of the imported files, the sales ones being a subset of the exported columns
+CATEGORY_COLUMNS = ["display_name"]
+ARTICLE_COLUMNS = ["code", "name", "category", "manufacturing_cost"]
+SALE_COLUMNS = ["date", "author", "article_code", "quantity", "unit_selling_price"]
+# Number of rows inserted per query
+IMPORT_CHUNK_SIZE = 5000
+# Number of invalid rows reported
+MAX_REPORTED_ERRORS = 20
+
+
+class ImportResult:
+    """Number of rows imported and errors of the invalid rows of an import."""
+
+    def __init__(self, imported=0, errors=None, skipped=0):
+        self.imported = imported
+        self.skipped = skipped
+        self.errors = errors or []
+
+    def add_error(self, location, message):
+        """Count an invalid row, keeping the first errors only."""
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"{location}: {message}")
+
+    def merge(self, other):
+        """Add the counts of another import to this one."""
+        self.imported += other.imported
+        self.skipped += other.skipped
+        self.errors = (self.errors + other.errors)[:MAX_REPORTED_ERRORS]
+        return self
+
+
+def get_missing_columns(path, columns):
+    """Return the columns missing from the header of a CSV file."""
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        header = next(csv.reader(file), [])
+    return [column for column in columns if column not in header]
+
+
+def iter_chunks(rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Iterate over lists of at most chunk_size rows."""
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def read_csv(path):
+    """Iterate over the locations and rows of a CSV file, as dicts."""
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield f"line {reader.line_num}", row
+
+
+def split_csv(path, parts):
+    """Split the rows of a CSV file in byte ranges of about the same size.
+
+    Each range starts at the beginning of a line, so a range can be read independently
+    from the others. The rows must not contain line breaks."""
+    with open(path, "rb") as file:
+        file.readline()
+        header_end = file.tell()
+        size = file.seek(0, 2)
+        bounds = [header_end]
+        for part in range(1, parts):
+            file.seek(max(header_end + (size - header_end) * part // parts - 1, header_end))
+            # Move to the start of the next line
+            file.readline()
+            if file.tell() > bounds[-1]:
+                bounds.append(file.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def read_csv_range(path, start, end):
+    """Iterate over the locations and rows of a byte range of a CSV file, as dicts.
+
+    The rows are located by byte offset, counting the lines before the range would mean
+    reading the whole file in each worker."""
+    with open(path, "rb") as file:
+        fieldnames = next(csv.reader([file.readline().decode("utf-8-sig")]))
+        file.seek(start)
+        while (offset := file.tell()) < end:
+            text = file.readline().decode("utf-8")
+            if text.strip():
+                yield f"byte {offset}", dict(zip(fieldnames, next(csv.reader([text]))))
+
+
+def get_category_map():
+    """Return the ids of the categories by display name."""
+    category_map = {}
+    for pk, display_name in ArticleCategory.objects.order_by("-pk").values_list("pk", "display_name"):
+        category_map[display_name] = pk
+    return category_map
+
+
+def create_missing_categories(names, category_map):
+    """Create the categories of the names not in the map and add them to it."""
+    missing = [ArticleCategory(display_name=name) for name in dict.fromkeys(names) if name not in category_map]
+    for category in ArticleCategory.objects.bulk_create(missing):
+        category_map[category.display_name] = category.pk
+    return len(missing)
+
+
+def import_categories(rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Create the categories of the rows which do not exist, matched by display name."""
+    result = ImportResult()
+    category_map = get_category_map()
+    for chunk in iter_chunks(rows, chunk_size):
+        names = []
+        for location, row in chunk:
+            if not row.get("display_name"):
+                result.add_error(location, "display_name is required")
+                continue
+            names.append(row["display_name"])
+        result.imported += create_missing_categories(names, category_map)
+    return result
+
+
+def import_articles(rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Create or update the articles of the rows, matched by code.
+
+    The categories are matched by display name and created when missing. The cost of
+    the sales of the updated articles and of their rollups is recomputed when it changed,
+    and the summaries of the categories the articles moved from or to."""
+    result = ImportResult()
+    category_map = get_category_map()
+    fields = {name: Article._meta.get_field(name) for name in ("code", "name", "manufacturing_cost")}
+    for chunk in iter_chunks(rows, chunk_size):
+        create_missing_categories([row["category"] for _, row in chunk if row.get("category")], category_map)
+        articles = {}
+        for location, row in chunk:
+            try:
+                values = {name: field.clean(row.get(name), None) for name, field in fields.items()}
+                values["category_id"] = category_map[row.get("category")]
+            except ValidationError as exc:
+                result.add_error(location, "; ".join(exc.messages))
+                continue
+            except KeyError:
+                result.add_error(location, "category is required")
+                continue
+            # The last row of a code wins
+            articles[values["code"]] = Article(**values)
+        with transaction.atomic():
+            existing = {
+                code: (pk, category_id, cost)
+                for code, pk, category_id, cost in Article.objects.filter(code__in=list(articles)).values_list(
+                    "code", "pk", "category", "manufacturing_cost"
+                )
+            }
+            Article.objects.bulk_create(
+                articles.values(),
+                update_conflicts=True,
+                unique_fields=["code"],
+                update_fields=["name", "category", "manufacturing_cost", "updated_at"],
+            )
+            # Only the existing articles have sales, whose rollups change with their cost or category
+            article_pks, categories = [], set()
+            for code, (pk, category_id, cost) in existing.items():
+                article = articles[code]
+                if article.manufacturing_cost != cost:
+                    article_pks.append(pk)
+                if article.category_id != category_id:
+                    categories.update((category_id, article.category_id))
+            update_sales_rollups_cost(router.db_for_write(Article), article_pks, categories)
+        result.imported += len(articles)
+    return result
+
+
+def get_author_map(emails):
+    """Return the ids of the users by email, creating the missing ones without password."""
+    emails = {email.lower() for email in emails}
+    author_map = dict(User.objects.filter(email__in=emails).values_list("email", "pk"))
+    missing = emails - author_map.keys()
+    if missing:
+        password = make_password(None)
+        # Concurrent imports may create the same users
+        User.objects.bulk_create(
+            [User(email=email, password=password) for email in sorted(missing)], ignore_conflicts=True
+        )
+        author_map.update(User.objects.filter(email__in=missing).values_list("email", "pk"))
+    return author_map
+
+
+def import_sales(rows, chunk_size=IMPORT_CHUNK_SIZE, update_rollups=True):
+    """Create the sales of the rows, whose articles are referenced by code and authors by email.
+
+    The authors are created when missing. The sales of each chunk are inserted in bulk
+    and added to the rollups along, unless update_rollups is False."""
+    result = ImportResult()
+    # Only the cost, copied on the sales, and the category, whose summary is refreshed, are needed
+    article_map = {
+        article.code: article for article in Article.objects.only("code", "manufacturing_cost", "category_id")
+    }
+    fields = {name: Sale._meta.get_field(name) for name in ("date", "quantity", "unit_selling_price")}
+    for chunk in iter_chunks(rows, chunk_size):
+        author_map = get_author_map({row["author"] for _, row in chunk if row.get("author")})
+        sales = []
+        for location, row in chunk:
+            try:
+                values = {name: field.clean(row.get(name), None) for name, field in fields.items()}
+            except ValidationError as exc:
+                result.add_error(location, "; ".join(exc.messages))
+                continue
+            article = article_map.get(row.get("article_code"))
+            author_id = author_map.get((row.get("author") or "").lower())
+            if article is None:
+                result.add_error(location, f"unknown article code {row.get('article_code')!r}")
+            elif author_id is None:
+                result.add_error(location, "author is required")
+            else:
+                sales.append(Sale(article=article, author_id=author_id, **values))
+        Sale.objects.bulk_create(sales, update_rollups=update_rollups)
+        result.imported += len(sales)
+    return result
+
+
+def import_sales_range(path, start, end, chunk_size=IMPORT_CHUNK_SIZE, update_rollups=True):
+    """Import the sales of a byte range of a CSV file, in a worker process."""
+    django.setup()
+    try:
+        return import_sales(read_csv_range(path, start, end), chunk_size, update_rollups)
+    finally:
+        connections.close_all()
@@ -0,0 +1,73 @@
+import json
+import platform
+import time
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from sales.benchmarks import get_endpoints, run_benchmarks
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the latency, number of queries and peak memory of the API and admin "
+        "endpoints on a generated dataset, in a test database, and write the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50, help="Number of users of the dataset.")
+        parser.add_argument("--articles", type=int, default=1000, help="Number of articles of the dataset.")
+        parser.add_argument("--sales", type=int, default=100000, help="Number of sales of the dataset.")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the dataset.")
+        parser.add_argument("--iterations", type=int, default=20, help="Number of timed requests per endpoint.")
+        parser.add_argument("--endpoint", action="append", dest="endpoints", help="Only benchmark this endpoint.")
+        parser.add_argument("--output", help="File written, the standard output by default.")
+        parser.add_argument("--keepdb", action="store_true", help="Keep the test database between runs.")
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be positive.")
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options["keepdb"])
+        try:
+            results = self.benchmark(options)
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        report = json.dumps(results, indent=2)
+        if not options["output"]:
+            self.stdout.write(report)
+            return
+        with open(options["output"], "w") as output:
+            output.write(report + "\n")
+
+    def benchmark(self, options):
+        """Seed the test database and return the benchmark results with their context."""
+        dataset = {name: options[name] for name in ("users", "articles", "sales", "seed")}
+        started = time.perf_counter()
+        call_command("populate_db", stdout=self.stderr, **dataset)
+        seeding_duration = time.perf_counter() - started
+
+        names = options["endpoints"]
+        unknown = set(names or []) - {name for name, *_ in get_endpoints()}
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}.")
+
+        client = Client()
+        client.force_login(User.objects.create_superuser(email="benchmark@example.com"))
+        return {
+            "dataset": dataset,
+            "environment": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": f"{connection.vendor} {'.'.join(map(str, connection.get_database_version()))}",
+            },
+            "seeding_seconds": round(seeding_duration, 3),
+            "results": run_benchmarks(client, options["iterations"], names),
+        }
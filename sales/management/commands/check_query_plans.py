@@ -0,0 +1,62 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from sales.queryplans import check_query_plans, get_checked_endpoints
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Explain the queries of the API endpoints on a generated dataset, in a test database, "
+        "and fail if any of them scans a large table without index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50, help="Number of users of the dataset.")
+        parser.add_argument("--articles", type=int, default=1000, help="Number of articles of the dataset.")
+        parser.add_argument("--sales", type=int, default=100000, help="Number of sales of the dataset.")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the dataset.")
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=1000,
+            help="Number of rows from which a table must not be scanned without index.",
+        )
+        parser.add_argument("--endpoint", action="append", dest="endpoints", help="Only check this endpoint.")
+        parser.add_argument("--keepdb", action="store_true", help="Keep the test database between runs.")
+
+    def handle(self, *args, **options):
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options["keepdb"])
+        try:
+            full_scans = self.check_plans(options)
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        if full_scans:
+            raise CommandError("\n\n".join(
+                f"{name} scans {table}:\n{sql}\n" + "\n".join(f"  {line}" for line in plan)
+                for name, table, sql, plan in full_scans
+            ))
+        self.stdout.write(self.style.SUCCESS("No query scans a large table without index."))
+
+    def check_plans(self, options):
+        """Seed the test database and return the full scans of the queries of the endpoints."""
+        dataset = {name: options[name] for name in ("users", "articles", "sales", "seed")}
+        call_command("populate_db", stdout=self.stderr, **dataset)
+        # Let the planner know the sizes of the tables and the selectivity of the indexes
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        names = options["endpoints"]
+        unknown = set(names or []) - {name for name, _ in get_checked_endpoints()}
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}.")
+
+        client = Client()
+        client.force_login(User.objects.create_superuser(email="query-plans@example.com"))
+        return check_query_plans(client, names, options["min_rows"])
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sales.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, filter_sales, iter_sale_chunks
+from sales.serializers import SaleExportQuerySerializer
+
+
+class Command(BaseCommand):
+    help = "Export the sales as CSV or JSON lines, by chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+        parser.add_argument("--start", help="First day of the sales exported (YYYY-MM-DD).")
+        parser.add_argument("--end", help="Last day of the sales exported (YYYY-MM-DD).")
+        parser.add_argument("--category", type=int, help="Id of the category of the articles exported.")
+        parser.add_argument("--output", help="File written, the standard output by default.")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Number of sales per query.")
+
+    def handle(self, *args, **options):
+        query = SaleExportQuerySerializer(
+            data={
+                name: options[name] for name in ("start", "end", "category") if options[name] is not None
+            }
+        )
+        if not query.is_valid():
+            raise CommandError(query.errors)
+        params = query.validated_data
+        sales = filter_sales(params.get("start"), params.get("end"), params.get("category"))
+        _, iter_format = EXPORT_FORMATS[options["format"]]
+        chunks = iter_format(iter_sale_chunks(sales, options["chunk_size"]))
+        if not options["output"]:
+            for lines in chunks:
+                self.stdout.write(lines, ending="")
+            return
+        with open(options["output"], "w", newline="") as output:
+            for lines in chunks:
+                output.write(lines)
@@ -0,0 +1,118 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+
+from sales.models import Sale, get_sales_rollups
+
+from sales.imports import (
+    ARTICLE_COLUMNS,
+    CATEGORY_COLUMNS,
+    IMPORT_CHUNK_SIZE,
+    SALE_COLUMNS,
+    ImportResult,
+    get_missing_columns,
+    import_articles,
+    import_categories,
+    import_sales,
+    import_sales_range,
+    read_csv,
+    split_csv,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import categories, articles and sales from CSV files, by chunks. Categories are "
+        "matched by display name, articles by code and authors by email, the missing "
+        "ones being created. The sales are always added."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--categories", help=f"CSV file of categories ({', '.join(CATEGORY_COLUMNS)}).")
+        parser.add_argument("--articles", help=f"CSV file of articles ({', '.join(ARTICLE_COLUMNS)}).")
+        parser.add_argument("--sales", help=f"CSV file of sales ({', '.join(SALE_COLUMNS)}).")
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="Number of rows per insert.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes importing the sales, whose rows must not contain line breaks.",
+        )
+        parser.add_argument(
+            "--rebuild-rollups",
+            action="store_true",
+            help="Rebuild the sales summaries and buckets once at the end instead of updating them "
+            "along, faster for large imports but they are out of date until then.",
+        )
+
+    def handle(self, *args, **options):
+        files = [
+            ("categories", CATEGORY_COLUMNS, import_categories),
+            ("articles", ARTICLE_COLUMNS, import_articles),
+            ("sales", SALE_COLUMNS, import_sales),
+        ]
+        files = [(name, columns, importer) for name, columns, importer in files if options[name]]
+        if not files:
+            raise CommandError("Give at least one of --categories, --articles and --sales.")
+        for name, columns, _ in files:
+            try:
+                missing = get_missing_columns(options[name], columns)
+            except OSError as exc:
+                raise CommandError(exc)
+            if missing:
+                raise CommandError(f"The {name} file misses the columns {', '.join(missing)}.")
+
+        workers = self.get_workers(options["workers"])
+        update_rollups = not options["rebuild_rollups"]
+        # The sales reference the articles which reference the categories
+        for name, _, importer in files:
+            started = time.perf_counter()
+            if name != "sales":
+                result = importer(read_csv(options[name]), options["chunk_size"])
+            elif workers > 1:
+                result = self.import_sales_in_parallel(options["sales"], workers, options["chunk_size"], update_rollups)
+            else:
+                result = importer(read_csv(options[name]), options["chunk_size"], update_rollups)
+            self.report(name, result, time.perf_counter() - started)
+
+        if options["rebuild_rollups"]:
+            started = time.perf_counter()
+            for rollup in get_sales_rollups(derived=True):
+                rollup.objects.rebuild()
+            self.stdout.write(f"Rebuilt the sales summaries and buckets in {time.perf_counter() - started:.2f}s.")
+
+    def get_workers(self, workers):
+        """Return the number of processes the database lets import the sales concurrently."""
+        connection = connections[router.db_for_write(Sale)]
+        transaction_mode = connection.settings_dict.get("OPTIONS", {}).get("transaction_mode") or ""
+        # Deferred transactions of SQLite fail to upgrade to write transactions concurrently
+        if workers > 1 and connection.vendor == "sqlite" and transaction_mode.upper() != "IMMEDIATE":
+            self.stderr.write("SQLite transactions are not immediate, importing the sales in a single process.")
+            return 1
+        return workers
+
+    def import_sales_in_parallel(self, path, workers, chunk_size, update_rollups):
+        """Import the sales of byte ranges of the file in a pool of processes."""
+        ranges = split_csv(path, workers)
+        # The connections must not be shared with the workers
+        connections.close_all()
+        result = ImportResult()
+        with ProcessPoolExecutor(max_workers=len(ranges) or 1) as executor:
+            futures = [
+                executor.submit(import_sales_range, path, start, end, chunk_size, update_rollups)
+                for start, end in ranges
+            ]
+            for future in futures:
+                result.merge(future.result())
+        return result
+
+    def report(self, name, result, duration):
+        """Write the number of rows imported and the errors of an import."""
+        rate = (result.imported + result.skipped) / duration if duration else 0
+        self.stdout.write(
+            f"Imported {result.imported} {name} ({result.skipped} skipped) in {duration:.2f}s, {rate:.0f} rows/s."
+        )
+        for error in result.errors:
+            self.stderr.write(error)
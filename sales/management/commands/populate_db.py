@@ -1,50 +1,152 @@
-from datetime import date
+import random
+import string
+import time
+from datetime import date, timedelta
 from decimal import Decimal
-from random import choice
 
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.utils import timezone
 from faker import Faker
 
-from sales.models import Article, ArticleCategory, Sale
+from sales.models import Article, ArticleCategory, Sale, get_sales_rollups
 from users.models import User
 
-fake = Faker()
+# Period of the generated sales
+FIRST_SALE_DATE = date(2021, 1, 1)
+LAST_SALE_DATE = date(2021, 12, 31)
+# Selling price of the sales, in percent of the manufacturing cost of their article
+MARGIN_RATES = range(120, 151)
+QUANTITIES = range(1, 100)
 
 
 class Command(BaseCommand):
-    help = "Populate the database with dummy data."
+    help = (
+        "Populate the database with dummy data. The same seed generates the same data, "
+        "existing users and articles with the same email or code are reused."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10, help="Number of users.")
+        parser.add_argument("--categories", type=int, default=10, help="Number of article categories.")
+        parser.add_argument("--articles", type=int, default=100, help="Number of articles.")
+        parser.add_argument("--sales", type=int, default=1000, help="Number of sales.")
+        parser.add_argument("--seed", type=int, help="Seed of the random generators, for reproducible data.")
+        parser.add_argument("--batch-size", type=int, default=10000, help="Number of rows inserted per query.")
 
     @transaction.atomic
     def handle(self, *args, **options):
-        users = [User.objects.create_user(email=fake.ascii_email()) for _ in range(10)]
+        started = time.perf_counter()
+        rng = random.Random(options["seed"])
+        fake = Faker()
+        fake.seed_instance(options["seed"])
+        batch_size = options["batch_size"]
+
+        user_ids = self.create_users(fake, options["users"], batch_size)
         categories = ArticleCategory.objects.bulk_create(
-            [ArticleCategory(display_name=fake.word()) for _ in range(10)]
+            [ArticleCategory(display_name=fake.word()) for _ in range(options["categories"])],
+            batch_size=batch_size,
+        )
+        articles = self.create_articles(fake, rng, categories, options["articles"], batch_size)
+        if options["sales"] and not (user_ids and articles):
+            raise CommandError("Sales need at least one user and one article.")
+        self.create_sales(rng, user_ids, articles, options["sales"], batch_size)
+        # The sales are inserted without updating the rollups along
+        for rollup in get_sales_rollups(derived=True):
+            rollup.objects.rebuild()
+        self.stdout.write(
+            f"Created {len(user_ids)} users, {len(categories)} categories, {len(articles)} articles and "
+            f"{options['sales']} sales in {time.perf_counter() - started:.2f}s."
+        )
+
+    def create_users(self, fake, count, batch_size):
+        """Create users without password and return their ids."""
+        # Hash the unusable password once instead of once per user
+        password = make_password(None)
+        emails = [f"{fake.user_name()}{index}@{fake.free_email_domain()}".lower() for index in range(count)]
+        User.objects.bulk_create(
+            [User(email=email, password=password) for email in emails],
+            batch_size=batch_size,
+            ignore_conflicts=True,
         )
-        articles = Article.objects.bulk_create(
+        # In the order generated for the same seed to draw the same authors
+        users = User.objects.in_bulk(emails, field_name="email")
+        return [users[email].pk for email in emails]
+
+    def create_articles(self, fake, rng, categories, count, batch_size):
+        """Create articles with unique codes and return them."""
+        # Codes of 3 letters and 3 digits, drawn without replacement
+        codes = []
+        for number in rng.sample(range(26**3 * 900), count):
+            number, digits = divmod(number, 900)
+            letters = ""
+            for _ in range(3):
+                number, letter = divmod(number, 26)
+                letters += string.ascii_uppercase[letter]
+            codes.append(f"{letters}{digits + 100}")
+        Article.objects.bulk_create(
             [
                 Article(
-                    code=fake.pystr(3, 3).upper() + str(fake.pyint(100, 999)),
-                    category=choice(categories),
+                    code=code,
+                    category=rng.choice(categories),
                     name=fake.word(),
-                    manufacturing_cost=fake.pydecimal(
-                        left_digits=3, right_digits=2, positive=True
-                    ),
+                    manufacturing_cost=Decimal(rng.randint(1, 99999)).scaleb(-2),
                 )
-                for _ in range(100)
+                for code in codes
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        articles = Article.objects.in_bulk(codes, field_name="code")
+        return [articles[code] for code in codes]
+
+    def create_sales(self, rng, user_ids, articles, count, batch_size):
+        """Create random sales of the articles by batches of raw inserts.
+
+        The values of the columns are prepared once for each article and day, then
+        drawn per batch, so that no model instance is built per sale."""
+        using = router.db_for_write(Sale)
+        connection = connections[using]
+        fields = [
+            Sale._meta.get_field(name)
+            for name in ("date", "author", "article", "quantity", "unit_selling_price", "unit_cost", "updated_at")
+        ]
+        date_field, author_field, article_field, _, price_field, cost_field, updated_at_field = fields
+        updated_at = updated_at_field.get_db_prep_save(timezone.now(), connection)
+        days = [
+            date_field.get_db_prep_save(FIRST_SALE_DATE + timedelta(days=day), connection)
+            for day in range((LAST_SALE_DATE - FIRST_SALE_DATE).days + 1)
+        ]
+        prices = [
+            [
+                price_field.get_db_prep_save((article.manufacturing_cost * rate).scaleb(-2), connection)
+                for rate in MARGIN_RATES
             ]
+            for article in articles
+        ]
+        costs = [cost_field.get_db_prep_save(article.manufacturing_cost, connection) for article in articles]
+        author_ids = [author_field.get_db_prep_save(pk, connection) for pk in user_ids]
+        article_ids = [article_field.get_db_prep_save(article.pk, connection) for article in articles]
+        qn = connection.ops.quote_name
+        sql = (
+            f"INSERT INTO {qn(Sale._meta.db_table)} ({', '.join(qn(field.column) for field in fields)}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))})"
         )
-        sales = []
-        for _ in range(1000):
-            article = choice(articles)
-            sales.append(
-                Sale(
-                    date=fake.date_between_dates(date(2021, 1, 1), date(2021, 12, 31)),
-                    author=choice(users),
-                    article=article,
-                    quantity=fake.pyint(1, 99),
-                    unit_selling_price=Decimal(fake.pyint(120, 150) / 100)
-                    * article.manufacturing_cost,
+        with connection.cursor() as cursor:
+            for start in range(0, count, batch_size):
+                size = min(batch_size, count - start)
+                cursor.executemany(
+                    sql,
+                    [
+                        (day, author_id, article_ids[index], quantity, prices[index][rate_index], costs[index],
+                         updated_at)
+                        for day, author_id, index, quantity, rate_index in zip(
+                            rng.choices(days, k=size),
+                            rng.choices(author_ids, k=size),
+                            rng.choices(range(len(articles)), k=size),
+                            rng.choices(QUANTITIES, k=size),
+                            rng.choices(range(len(MARGIN_RATES)), k=size),
+                        )
+                    ],
                 )
-            )
-        Sale.objects.bulk_create(sales)
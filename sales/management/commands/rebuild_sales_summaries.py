@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sales.models import get_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the sales summaries and buckets from the sales and verify them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only verify the summaries match the sales, without rebuilding them.",
+        )
+
+    def handle(self, *args, **options):
+        errors = []
+        for rollup in get_sales_rollups(derived=True):
+            name = rollup._meta.verbose_name_plural
+            if not options["check"]:
+                rollup.objects.rebuild()
+                self.stdout.write(f"Rebuilt {rollup.objects.count()} {name}.")
+            mismatches = rollup.objects.get_mismatches()
+            if mismatches:
+                errors.append(
+                    f"{len(mismatches)} {name} do not match the sales: "
+                    + ", ".join(str(key) for key in sorted(mismatches)[:20])
+                )
+        if errors:
+            raise CommandError("\n".join(errors))
+        self.stdout.write(self.style.SUCCESS("The sales summaries match the sales."))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['date', 'id'], name='sales_sale_date_id_idx'),
+        ),
+    ]
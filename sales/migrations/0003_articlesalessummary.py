@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Sum
+
+
+def build_summaries(apps, schema_editor):
+    """Build the summaries of the existing sales."""
+    Sale = apps.get_model('sales', 'Sale')
+    ArticleSalesSummary = apps.get_model('sales', 'ArticleSalesSummary')
+    total_field = models.DecimalField(max_digits=20, decimal_places=2)
+    rows = Sale.objects.values('article').annotate(
+        sales_total_revenue=Sum(F('quantity') * F('unit_selling_price'), output_field=total_field),
+        sales_total_cost=Sum(F('quantity') * F('article__manufacturing_cost'), output_field=total_field),
+        sales_total_quantity=Sum('quantity'),
+        sales_count=Count('id'),
+        last_sale_date=Max('date'),
+    ).order_by()
+    ArticleSalesSummary.objects.bulk_create(
+        [ArticleSalesSummary(article_id=row.pop('article'), **row) for row in rows.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0002_sale_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleSalesSummary',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales_summary', serialize=False, to='sales.article', verbose_name='Article')),
+                ('sales_total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Sales total revenue')),
+                ('sales_total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Sales total cost')),
+                ('sales_total_quantity', models.PositiveBigIntegerField(default=0, verbose_name='Sales total quantity')),
+                ('sales_count', models.PositiveBigIntegerField(default=0, verbose_name='Sales count')),
+                ('last_sale_date', models.DateField(verbose_name='Last sale date')),
+            ],
+            options={
+                'verbose_name': 'Article Sales Summary',
+                'verbose_name_plural': 'Article Sales Summaries',
+                'indexes': [models.Index(fields=['-sales_total_revenue', 'article'], name='sales_summary_revenue_idx')],
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
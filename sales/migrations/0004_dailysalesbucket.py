@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def build_buckets(apps, schema_editor):
+    """Build the daily buckets of the existing sales."""
+    Sale = apps.get_model('sales', 'Sale')
+    DailySalesBucket = apps.get_model('sales', 'DailySalesBucket')
+    total_field = models.DecimalField(max_digits=20, decimal_places=2)
+    rows = Sale.objects.values('date', 'article').annotate(
+        sales_total_revenue=Sum(F('quantity') * F('unit_selling_price'), output_field=total_field),
+        sales_total_cost=Sum(F('quantity') * F('article__manufacturing_cost'), output_field=total_field),
+        sales_total_quantity=Sum('quantity'),
+        sales_count=Count('id'),
+    ).order_by()
+    DailySalesBucket.objects.bulk_create(
+        [DailySalesBucket(article_id=row.pop('article'), **row) for row in rows.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0003_articlesalessummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sales_total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Sales total revenue')),
+                ('sales_total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Sales total cost')),
+                ('sales_total_quantity', models.PositiveBigIntegerField(default=0, verbose_name='Sales total quantity')),
+                ('sales_count', models.PositiveBigIntegerField(default=0, verbose_name='Sales count')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales_buckets', to='sales.article', verbose_name='Article')),
+            ],
+            options={
+                'verbose_name': 'Daily Sales Bucket',
+                'verbose_name_plural': 'Daily Sales Buckets',
+                'constraints': [models.UniqueConstraint(fields=('date', 'article'), name='sales_daily_bucket_unique')],
+            },
+        ),
+        migrations.RunPython(build_buckets, migrations.RunPython.noop),
+    ]
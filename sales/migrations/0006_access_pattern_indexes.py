@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+import sales.operations
+
+
+class Migration(migrations.Migration):
+    # The indexes of the large tables are built concurrently on PostgreSQL, out of a transaction
+    atomic = False
+
+    dependencies = [
+        ('sales', '0005_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        sales.operations.AddIndexConcurrently(
+            model_name='article',
+            index=models.Index(fields=['updated_at'], name='sales_article_updated_idx'),
+        ),
+        sales.operations.AddIndexConcurrently(
+            model_name='articlecategory',
+            index=models.Index(fields=['display_name'], name='sales_category_name_idx'),
+        ),
+        sales.operations.AddIndexConcurrently(
+            model_name='articlecategory',
+            index=models.Index(fields=['updated_at'], name='sales_category_updated_idx'),
+        ),
+        sales.operations.AddIndexConcurrently(
+            model_name='sale',
+            index=models.Index(fields=['article', 'date'], name='sales_sale_article_date_idx'),
+        ),
+        sales.operations.AddIndexConcurrently(
+            model_name='sale',
+            index=models.Index(fields=['author', 'date'], name='sales_sale_author_date_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:50
+
+import django.db.models.expressions
+from django.conf import settings
+from django.db import migrations, models, transaction
+from django.db.models import Max, OuterRef, Subquery
+
+import sales.operations
+
+# Number of sales whose cost is copied per transaction
+BACKFILL_BATCH_SIZE = 10000
+
+
+def copy_unit_costs(apps, schema_editor):
+    """Copy the manufacturing cost of their article to the existing sales, by batches of ids."""
+    Article = apps.get_model('sales', 'Article')
+    Sale = apps.get_model('sales', 'Sale')
+    using = schema_editor.connection.alias
+    cost = Subquery(Article.objects.filter(pk=OuterRef('article')).values('manufacturing_cost'))
+    last_id = Sale.objects.using(using).aggregate(last_id=Max('id'))['last_id'] or 0
+    for start in range(0, last_id, BACKFILL_BATCH_SIZE):
+        with transaction.atomic(using=using):
+            Sale.objects.using(using).filter(id__gt=start, id__lte=start + BACKFILL_BATCH_SIZE).update(unit_cost=cost)
+
+
+class Migration(migrations.Migration):
+    # The sales are backfilled by batches and the index of the totals is built concurrently
+    # on PostgreSQL, out of a transaction
+    atomic = False
+
+    dependencies = [
+        ('sales', '0006_access_pattern_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='unit_cost',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=11, verbose_name='Unit cost'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_unit_costs, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='sale',
+            name='total_selling_price',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('quantity'), '*', models.F('unit_selling_price')), output_field=models.DecimalField(decimal_places=2, max_digits=20, verbose_name='Total selling price')),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='margin',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('quantity'), '*', django.db.models.expressions.CombinedExpression(models.F('unit_selling_price'), '-', models.F('unit_cost'))), output_field=models.DecimalField(decimal_places=2, max_digits=20, verbose_name='Margin')),
+        ),
+        sales.operations.AddIndexConcurrently(
+            model_name='sale',
+            index=models.Index(fields=['total_selling_price'], name='sales_sale_total_idx'),
+        ),
+    ]
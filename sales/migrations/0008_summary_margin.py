@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:58
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+import sales.operations
+
+
+class Migration(migrations.Migration):
+    # The indexes of the orderings are built concurrently on PostgreSQL, out of a transaction
+    atomic = False
+
+    dependencies = [
+        ('sales', '0007_sale_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articlesalessummary',
+            name='margin',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('sales_total_revenue'), '-', models.F('sales_total_cost')), output_field=models.DecimalField(decimal_places=2, max_digits=20, verbose_name='Margin')),
+        ),
+        migrations.AddField(
+            model_name='articlesalessummary',
+            name='margin_percentage',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast(models.F('sales_total_revenue'), models.FloatField()), '-', django.db.models.functions.comparison.Cast(models.F('sales_total_cost'), models.FloatField())), '*', models.Value(100.0)), '/', django.db.models.functions.comparison.NullIf(django.db.models.functions.comparison.Cast(models.F('sales_total_revenue'), models.FloatField()), models.Value(0.0))), output_field=models.FloatField(null=True, verbose_name='Margin percentage')),
+        ),
+        sales.operations.AddIndexConcurrently(
+            model_name='articlesalessummary',
+            index=models.Index(fields=['-margin', 'article'], name='sales_summary_margin_idx'),
+        ),
+        sales.operations.AddIndexConcurrently(
+            model_name='articlesalessummary',
+            index=models.Index(fields=['-margin_percentage', 'article'], name='sales_summary_margin_pct_idx'),
+        ),
+        sales.operations.AddIndexConcurrently(
+            model_name='articlesalessummary',
+            index=models.Index(fields=['-sales_total_quantity', 'article'], name='sales_summary_quantity_idx'),
+        ),
+        sales.operations.AddIndexConcurrently(
+            model_name='articlesalessummary',
+            index=models.Index(fields=['-sales_count', 'article'], name='sales_summary_count_idx'),
+        ),
+        sales.operations.AddIndexConcurrently(
+            model_name='articlesalessummary',
+            index=models.Index(fields=['-last_sale_date', 'article'], name='sales_summary_last_sale_idx'),
+        ),
+    ]
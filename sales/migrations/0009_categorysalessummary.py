@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:03
+
+import django.db.models.deletion
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Sum
+
+
+def build_summaries(apps, schema_editor):
+    """Build the summaries of the categories from the summaries of their articles."""
+    ArticleSalesSummary = apps.get_model('sales', 'ArticleSalesSummary')
+    CategorySalesSummary = apps.get_model('sales', 'CategorySalesSummary')
+    rows = ArticleSalesSummary.objects.values(category=F('article__category')).annotate(
+        sales_total_revenue=Sum('sales_total_revenue'),
+        sales_total_cost=Sum('sales_total_cost'),
+        sales_total_quantity=Sum('sales_total_quantity'),
+        sales_count=Sum('sales_count'),
+        last_sale_date=Max('last_sale_date'),
+        article_count=Count('article'),
+    ).order_by()
+    CategorySalesSummary.objects.bulk_create(
+        [CategorySalesSummary(category_id=row.pop('category'), **row) for row in rows.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0008_summary_margin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategorySalesSummary',
+            fields=[
+                ('sales_total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Sales total revenue')),
+                ('sales_total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Sales total cost')),
+                ('sales_total_quantity', models.PositiveBigIntegerField(default=0, verbose_name='Sales total quantity')),
+                ('sales_count', models.PositiveBigIntegerField(default=0, verbose_name='Sales count')),
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales_summary', serialize=False, to='sales.articlecategory', verbose_name='Category')),
+                ('last_sale_date', models.DateField(verbose_name='Last sale date')),
+                ('article_count', models.PositiveBigIntegerField(default=0, verbose_name='Article count')),
+                ('margin', models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('sales_total_revenue'), '-', models.F('sales_total_cost')), output_field=models.DecimalField(decimal_places=2, max_digits=20, verbose_name='Margin'))),
+                ('margin_percentage', models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast(models.F('sales_total_revenue'), models.FloatField()), '-', django.db.models.functions.comparison.Cast(models.F('sales_total_cost'), models.FloatField())), '*', models.Value(100.0)), '/', django.db.models.functions.comparison.NullIf(django.db.models.functions.comparison.Cast(models.F('sales_total_revenue'), models.FloatField()), models.Value(0.0))), output_field=models.FloatField(null=True, verbose_name='Margin percentage'))),
+            ],
+            options={
+                'verbose_name': 'Category Sales Summary',
+                'verbose_name_plural': 'Category Sales Summaries',
+                'indexes': [models.Index(fields=['-sales_total_revenue', 'category'], name='sales_cat_summary_revenue_idx')],
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
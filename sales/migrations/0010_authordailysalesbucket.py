@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def build_buckets(apps, schema_editor):
+    """Build the daily buckets of the authors of the existing sales."""
+    Sale = apps.get_model('sales', 'Sale')
+    AuthorDailySalesBucket = apps.get_model('sales', 'AuthorDailySalesBucket')
+    total_field = models.DecimalField(max_digits=20, decimal_places=2)
+    rows = Sale.objects.values('date', 'author').annotate(
+        sales_total_revenue=Sum('total_selling_price', output_field=total_field),
+        sales_total_cost=Sum(F('quantity') * F('unit_cost'), output_field=total_field),
+        sales_total_quantity=Sum('quantity'),
+        sales_count=Count('id'),
+    ).order_by()
+    AuthorDailySalesBucket.objects.bulk_create(
+        [AuthorDailySalesBucket(author_id=row.pop('author'), **row) for row in rows.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0009_categorysalessummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorDailySalesBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sales_total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Sales total revenue')),
+                ('sales_total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Sales total cost')),
+                ('sales_total_quantity', models.PositiveBigIntegerField(default=0, verbose_name='Sales total quantity')),
+                ('sales_count', models.PositiveBigIntegerField(default=0, verbose_name='Sales count')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales_buckets', to=settings.AUTH_USER_MODEL, verbose_name='Author')),
+            ],
+            options={
+                'verbose_name': 'Author Daily Sales Bucket',
+                'verbose_name_plural': 'Author Daily Sales Buckets',
+                'constraints': [models.UniqueConstraint(fields=('date', 'author'), name='sales_author_bucket_unique')],
+            },
+        ),
+        migrations.RunPython(build_buckets, migrations.RunPython.noop),
+    ]
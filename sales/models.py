@@ -1,4 +1,15 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import connections, models, router, transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Greatest, NullIf
+from django.utils import timezone
+
+from .signals import sales_changed
+
+
+# Output field of the sums of prices, wider than the prices
+TOTAL_FIELD = models.DecimalField(max_digits=20, decimal_places=2)
 
 
 class ArticleCategory(models.Model):
@@ -9,15 +20,63 @@ class ArticleCategory(models.Model):
     class Meta:
         verbose_name = "Article Category"
         verbose_name_plural = "Article Categories"
+        indexes = [
+            # Ordering of the categories list
+            models.Index(fields=["display_name"], name="sales_category_name_idx"),
+            # Validators of the conditional requests
+            models.Index(fields=["updated_at"], name="sales_category_updated_idx"),
+        ]
 
     objects = models.Manager()
 
     display_name = models.CharField("Display name", max_length=255)
+    updated_at = models.DateTimeField("Updated at", auto_now=True)
 
     def __str__(self):
         return f"{self.display_name}"
 
 
+class ArticleQuerySet(models.QuerySet):
+    """
+    QuerySet of articles keeping the sales rollups up to date on bulk operations.
+    """
+
+    def update(self, **kwargs):
+        """Override update to update the cost of the sales of the articles and of their rollups,
+        and the summaries of the categories they are moved between, and mark them as updated."""
+        kwargs.setdefault("updated_at", timezone.now())
+        names = {self.model._meta.get_field(name).name for name in kwargs}
+        with transaction.atomic(using=self.db, savepoint=False):
+            articles = None
+            if names & {"category", "manufacturing_cost"}:
+                articles = dict(self.values_list("pk", "category"))
+            rows = super().update(**kwargs)
+            if "manufacturing_cost" in names:
+                update_sales_rollups_cost(self.db, list(articles))
+            if "category" in names:
+                categories = {*articles.values(), *Article.objects.using(self.db).filter(
+                    pk__in=list(articles)).values_list("category", flat=True).distinct()}
+                refresh_category_sales_summaries(self.db, categories)
+                sales_changed.send(sender=Article, using=self.db)
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        """Override delete to refresh the rollups of the sales of the articles, deleted along
+        without going through SaleQuerySet, and the summaries of their categories."""
+        with transaction.atomic(using=self.db, savepoint=False):
+            keys = Sale.objects.using(self.db).filter(article__in=self.values("pk")).get_rollup_keys()
+            categories = list(self.order_by().values_list("category", flat=True).distinct())
+            deleted = super().delete()
+            refresh_sales_rollups(self.db, keys)
+            refresh_category_sales_summaries(self.db, categories)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class Article(models.Model):
     """
     An article is an item that can be sold.
@@ -26,8 +85,12 @@ class Article(models.Model):
     class Meta:
         verbose_name = "Article"
         verbose_name_plural = "Articles"
+        indexes = [
+            # Validators of the conditional requests
+            models.Index(fields=["updated_at"], name="sales_article_updated_idx"),
+        ]
 
-    objects = models.Manager()
+    objects = ArticleQuerySet.as_manager()
 
     code = models.CharField("Code", max_length=6, unique=True)
     category = models.ForeignKey(
@@ -40,11 +103,141 @@ class Article(models.Model):
     manufacturing_cost = models.DecimalField(
         "Manufacturing Cost", max_digits=11, decimal_places=2
     )
+    updated_at = models.DateTimeField("Updated at", auto_now=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Override from_db to remember the category and the cost the article was loaded with."""
+        instance = super().from_db(db, field_names, values)
+        if "category_id" in field_names and "manufacturing_cost" in field_names:
+            instance._loaded_values = (instance.category_id, instance.manufacturing_cost)
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Override save to update the cost of the sales of the article and of their rollups,
+        and the summaries of its categories, when its cost or its category changed."""
+        using = kwargs.get("using") or router.db_for_write(Article, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            # An instance not loaded from the database may also save an existing article
+            loaded = getattr(self, "_loaded_values", None)
+            if loaded is None and self.pk is not None:
+                loaded = Article.objects.using(using).filter(pk=self.pk).values_list(
+                    "category", "manufacturing_cost").first()
+            super().save(*args, **kwargs)
+            values = (self.category_id, self._meta.get_field("manufacturing_cost").to_python(self.manufacturing_cost))
+            # A new article has no sale
+            if loaded is not None:
+                update_sales_rollups_cost(
+                    using,
+                    [self.pk] if values[1] != loaded[1] else [],
+                    {loaded[0], values[0]} if values[0] != loaded[0] else (),
+                )
+        self._loaded_values = values
+
+    def delete(self, *args, **kwargs):
+        """Override delete to refresh the rollups of the sales of the article, deleted along,
+        and the summary of its category."""
+        using = kwargs.get("using") or router.db_for_write(Article, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            keys = Sale.objects.using(using).filter(article=self).get_rollup_keys()
+            deleted = super().delete(*args, **kwargs)
+            refresh_sales_rollups(using, keys)
+            refresh_category_sales_summaries(using, [self.category_id])
+        return deleted
 
     def __str__(self):
         return f"{self.code} - {self.name}"
 
 
+class SaleQuerySet(models.QuerySet):
+    """
+    QuerySet of sales keeping the sales rollups up to date on bulk operations.
+    """
+
+    def bulk_create(self, objs, *args, update_rollups=True, **kwargs):
+        """Override bulk_create to copy the cost of their article to the sales and add them
+        to the rollups.
+
+        Bulk loads may skip the rollups with update_rollups=False, they must then be rebuilt."""
+        objs = list(objs)
+        set_unit_costs(self.db, objs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            if update_rollups:
+                add_to_sales_rollups(self.db, objs)
+            sales_changed.send(sender=Sale, using=self.db)
+        return objs
+
+    bulk_create.alters_data = True
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        """Override bulk_update to refresh the rollups of the sales and mark them as updated."""
+        objs = list(objs)
+        # auto_now is not applied by bulk_update
+        updated_at = timezone.now()
+        for obj in objs:
+            obj.updated_at = updated_at
+        fields = [*fields, "updated_at"]
+        if any(self.model._meta.get_field(name).name == "article" for name in fields):
+            set_unit_costs(self.db, objs)
+            fields.append("unit_cost")
+        with transaction.atomic(using=self.db, savepoint=False):
+            keys = self.filter(pk__in=[obj.pk for obj in objs]).get_rollup_keys()
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+            keys.extend(obj.get_rollup_key() for obj in objs)
+            refresh_sales_rollups(self.db, keys)
+            sales_changed.send(sender=Sale, using=self.db)
+        return rows
+
+    bulk_update.alters_data = True
+
+    def update(self, **kwargs):
+        """Override update to refresh the rollups of the sales and mark them as updated."""
+        kwargs.setdefault("updated_at", timezone.now())
+        with transaction.atomic(using=self.db, savepoint=False):
+            keys = self.get_rollup_keys()
+            # The updated sales may not match the queryset anymore when their keys change
+            pks = None
+            if any(self.model._meta.get_field(name).name in get_rollup_key_fields() for name in kwargs):
+                pks = list(self.values_list("pk", flat=True))
+            rows = super().update(**kwargs)
+            if pks is not None:
+                updated = self.model.objects.using(self.db).filter(pk__in=pks)
+                if any(self.model._meta.get_field(name).name == "article" for name in kwargs):
+                    updated.update_unit_costs()
+                keys.extend(updated.get_rollup_keys())
+            refresh_sales_rollups(self.db, keys)
+            sales_changed.send(sender=Sale, using=self.db)
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        """Override delete to refresh the rollups of the sales."""
+        with transaction.atomic(using=self.db, savepoint=False):
+            keys = self.get_rollup_keys()
+            deleted = super().delete()
+            refresh_sales_rollups(self.db, keys)
+            sales_changed.send(sender=Sale, using=self.db)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def get_rollup_keys(self):
+        """Return the distinct keys of the rollups the sales of the queryset are aggregated in."""
+        return list(self.order_by().values(*get_rollup_key_fields()).distinct())
+
+    def update_unit_costs(self):
+        """Copy the manufacturing cost of their article to the sales of the queryset.
+
+        The rollups are not updated, nor the sales marked as updated."""
+        cost = Subquery(Article.objects.filter(pk=OuterRef("article")).values("manufacturing_cost"))
+        return super().update(unit_cost=cost)
+
+    update_unit_costs.alters_data = True
+
+
 class Sale(models.Model):
     """
     A sale of an article.
@@ -53,8 +246,17 @@ class Sale(models.Model):
     class Meta:
         verbose_name = "Sale"
         verbose_name_plural = "Sales"
+        indexes = [
+            # Stable ordering of the sales list and its cursor pagination
+            models.Index(fields=["date", "id"], name="sales_sale_date_id_idx"),
+            # Sales of an article or of an author by date
+            models.Index(fields=["article", "date"], name="sales_sale_article_date_idx"),
+            models.Index(fields=["author", "date"], name="sales_sale_author_date_idx"),
+            # Sales ordered, filtered or summed by total
+            models.Index(fields=["total_selling_price"], name="sales_sale_total_idx"),
+        ]
 
-    objects = models.Manager()
+    objects = SaleQuerySet.as_manager()
 
     date = models.DateField("Date")
     author = models.ForeignKey(
@@ -70,10 +272,596 @@ class Sale(models.Model):
     unit_selling_price = models.DecimalField(
         "Unit selling price", max_digits=11, decimal_places=2
     )
+    # Manufacturing cost of the article, copied when the sale is saved and when the cost
+    # of the article changes so that the totals of the sales are read without joining it
+    unit_cost = models.DecimalField("Unit cost", max_digits=11, decimal_places=2, editable=False)
+    # Computed by the database when the row is written
+    total_selling_price = models.GeneratedField(
+        expression=F("quantity") * F("unit_selling_price"),
+        output_field=models.DecimalField("Total selling price", max_digits=20, decimal_places=2),
+        db_persist=True,
+    )
+    margin = models.GeneratedField(
+        expression=F("quantity") * (F("unit_selling_price") - F("unit_cost")),
+        output_field=models.DecimalField("Margin", max_digits=20, decimal_places=2),
+        db_persist=True,
+    )
+    # Indexed for the validators of the conditional requests of the sales list
+    updated_at = models.DateTimeField("Updated at", auto_now=True, db_index=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Override from_db to remember the rollups the sale was loaded in."""
+        instance = super().from_db(db, field_names, values)
+        if all(
+            cls._meta.get_field(name).attname in field_names for name in get_rollup_key_fields()
+        ):
+            instance._loaded_rollup_key = instance.get_rollup_key()
+        return instance
+
+    def get_rollup_key(self):
+        """Return the key of the rollups the sale is aggregated in."""
+        return {name: getattr(self, self._meta.get_field(name).attname) for name in get_rollup_key_fields()}
+
+    def save(self, *args, **kwargs):
+        """Override save to copy the cost of the article and keep the sales rollups up to date."""
+        using = kwargs.get("using") or router.db_for_write(Sale, instance=self)
+        self.unit_cost = self._meta.get_field("unit_cost").to_python(self.article.manufacturing_cost)
+        with transaction.atomic(using=using, savepoint=False):
+            if self._state.adding:
+                super().save(*args, **kwargs)
+                add_to_sales_rollups(using, [self])
+            else:
+                keys = [getattr(self, "_loaded_rollup_key", None)]
+                if keys[0] is None:
+                    keys = Sale.objects.using(using).filter(pk=self.pk).get_rollup_keys()
+                super().save(*args, **kwargs)
+                # The generated fields are only returned by inserts, computed as by the database
+                price = self._meta.get_field("unit_selling_price").to_python(self.unit_selling_price)
+                self.total_selling_price = self.quantity * price
+                self.margin = self.quantity * (price - self.unit_cost)
+                keys.append(self.get_rollup_key())
+                refresh_sales_rollups(using, keys)
+            self._loaded_rollup_key = self.get_rollup_key()
+            sales_changed.send(sender=Sale, using=using)
+
+    def delete(self, *args, **kwargs):
+        """Override delete to refresh the sales rollups."""
+        using = kwargs.get("using") or router.db_for_write(Sale, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            deleted = super().delete(*args, **kwargs)
+            refresh_sales_rollups(using, [self.get_rollup_key()])
+            sales_changed.send(sender=Sale, using=using)
+        return deleted
 
     def get_total_selling_price(self):
         """Retuns the total selling price."""
-        return self.quantity * self.unit_selling_price
+        return self.total_selling_price
 
     def __str__(self):
         return f"{self.date} - {self.quantity} {self.article.name}"
+
+
+def get_margin_percentage(revenue, cost):
+    """Return the expression of the margin in percentage of the revenue, null without revenue.
+
+    Computed in floating point, the decimals being divided as integers by SQLite."""
+    revenue = Cast(revenue, models.FloatField())
+    return (revenue - Cast(cost, models.FloatField())) * Value(100.0) / NullIf(revenue, Value(0.0))
+
+
+class SalesRollupQuerySet(models.QuerySet):
+    """
+    QuerySet maintaining a sales rollup from the sales.
+    """
+
+    # Number of keys refreshed per query, below the query parameters limit of SQLite
+    refresh_batch_size = 500
+
+    def aggregate_sales(self, sales):
+        """Return the rollup of the given sales queryset as a values queryset by key."""
+        return sales.order_by().values(*self.model.KEY_FIELDS).annotate(**self.model.get_sales_aggregates())
+
+    def get_rows(self, rows):
+        """Return rollup instances from rows of aggregate_sales."""
+        return [
+            self.model(**{self.model._meta.get_field(name).attname: value for name, value in row.items()})
+            for row in rows
+        ]
+
+    def get_key_filter(self, keys):
+        """Return the filter of the rollup rows with the given keys."""
+        if len(self.model.KEY_FIELDS) == 1:
+            return Q(**{f"{self.model.KEY_FIELDS[0]}__in": [key[0] for key in keys]})
+        key_filter = Q(pk__in=[])
+        for key in keys:
+            key_filter |= Q(**dict(zip(self.model.KEY_FIELDS, key)))
+        return key_filter
+
+    def add_sales(self, sales):
+        """Add newly created sales to the rollup.
+
+        The measures are incremented in the database by a single upsert, so that concurrent
+        additions to a same row of the rollup do not overwrite each other."""
+        deltas = {}
+        for sale in sales:
+            key = tuple(getattr(sale, Sale._meta.get_field(name).attname) for name in self.model.KEY_FIELDS)
+            measures = self.model.get_sale_measures(sale)
+            delta = deltas.get(key)
+            if delta is None:
+                deltas[key] = measures
+                continue
+            for name, value in measures.items():
+                delta[name] = max(delta[name], value) if name in self.model.MAX_FIELDS else delta[name] + value
+        if not deltas:
+            return
+        # Sorted by key, as by refresh, so that concurrent additions lock the rows in the same order
+        # rather than deadlock
+        rows = [
+            self.model(**dict(zip(self.model.get_key_attnames(), key)), **delta)
+            for key, delta in sorted(deltas.items())
+        ]
+        if connections[self.db].vendor in ("sqlite", "postgresql"):
+            self._upsert_increments(rows)
+            return
+        # Other databases: make sure every row exists before incrementing it
+        self.bulk_create(
+            [self.model(**{name: getattr(row, name) for name in self.model.get_key_attnames()},
+                        **{name: getattr(row, name) for name in self.model.MAX_FIELDS})
+             for row in rows],
+            ignore_conflicts=True,
+        )
+        for row in rows:
+            self.filter(**{name: getattr(row, name) for name in self.model.get_key_attnames()}).update(**{
+                name: Greatest(name, Value(getattr(row, name))) if name in self.model.MAX_FIELDS
+                else F(name) + getattr(row, name)
+                for name in self.model.MEASURE_FIELDS
+            })
+
+    def _upsert_increments(self, rows):
+        """Insert the rows, incrementing the measures of the ones already existing."""
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        fields = [self.model._meta.get_field(name) for name in self.model.get_key_attnames()]
+        fields += [self.model._meta.get_field(name) for name in self.model.MEASURE_FIELDS]
+        greatest = "MAX" if connection.vendor == "sqlite" else "GREATEST"
+        assignments = ", ".join(
+            f"{qn(field.column)} = {greatest}({table}.{qn(field.column)}, EXCLUDED.{qn(field.column)})"
+            if field.name in self.model.MAX_FIELDS
+            else f"{qn(field.column)} = {table}.{qn(field.column)} + EXCLUDED.{qn(field.column)}"
+            for field in fields[len(self.model.KEY_FIELDS):]
+        )
+        placeholders = "(" + ", ".join(["%s"] * len(fields)) + ")"
+        batch_size = max(connection.ops.bulk_batch_size(fields, rows), 1)
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                cursor.execute(
+                    f"INSERT INTO {table} ({', '.join(qn(field.column) for field in fields)}) "
+                    f"VALUES {', '.join([placeholders] * len(batch))} "
+                    f"ON CONFLICT ({', '.join(qn(field.column) for field in fields[:len(self.model.KEY_FIELDS)])}) "
+                    f"DO UPDATE SET {assignments}",
+                    [
+                        field.get_db_prep_save(getattr(row, field.attname), connection)
+                        for row in batch
+                        for field in fields
+                    ],
+                )
+
+    def refresh(self, keys):
+        """Recompute the rollup rows with the given keys from their sales."""
+        keys = sorted({tuple(key[name] for name in self.model.KEY_FIELDS) for key in keys if key is not None})
+        for start in range(0, len(keys), self.refresh_batch_size):
+            batch = keys[start:start + self.refresh_batch_size]
+            key_filter = self.get_key_filter(batch)
+            if connections[self.db].features.has_select_for_update:
+                # Lock the rows so that concurrent additions wait for the refresh, or are seen by it
+                list(self.select_for_update().filter(key_filter).values_list("pk", flat=True))
+            # The key fields of the rollup are fields of its sales as well
+            rows = self.get_rows(self.aggregate_sales(self.model.get_sales(self.db).filter(key_filter)))
+            # The keys without any sale left have no row
+            if len(rows) < len(batch):
+                found_keys = [row.get_key() for row in rows]
+                self.filter(key_filter).exclude(self.get_key_filter(found_keys)).delete()
+            self.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=list(self.model.KEY_FIELDS),
+                update_fields=self.model.MEASURE_FIELDS,
+            )
+
+    def rebuild(self):
+        """Rebuild the whole rollup from scratch.
+
+        The rows are aggregated and inserted by the database in a single statement, without
+        going through Python."""
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        with transaction.atomic(using=self.db):
+            self.all().delete()
+            rows = self.aggregate_sales(self.model.get_sales(self.db))
+            # The columns are selected in the order of the key fields then of the aggregates
+            columns = [
+                qn(self.model._meta.get_field(name).column)
+                for name in (*rows.query.values_select, *rows.query.annotation_select)
+            ]
+            sql, params = rows.query.get_compiler(self.db).as_sql()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {qn(self.model._meta.db_table)} ({', '.join(columns)}) {sql}", params
+                )
+            sales_changed.send(sender=self.model, using=self.db)
+
+    def get_mismatches(self):
+        """Return the keys of the rollup rows which do not match their sales."""
+        expected = {}
+        for row in self.get_rows(self.aggregate_sales(self.model.get_sales(self.db)).iterator()):
+            expected[row.get_key()] = row.get_measures()
+        mismatches = set()
+        for row in self.all().iterator():
+            if expected.pop(row.get_key(), None) != row.get_measures():
+                mismatches.add(row.get_key())
+        # Keys with sales but no row
+        mismatches.update(expected)
+        return mismatches
+
+
+class SalesRollup(models.Model):
+    """
+    Abstract model of the sales aggregated by a key, kept up to date when the sales change.
+    """
+
+    class Meta:
+        abstract = True
+
+    # Fields of Sale the rollup is grouped by
+    KEY_FIELDS = ()
+    MEASURE_FIELDS = [
+        "sales_total_revenue",
+        "sales_total_cost",
+        "sales_total_quantity",
+        "sales_count",
+    ]
+    # Measures which are the maximum and not the sum of the ones of the sales
+    MAX_FIELDS = set()
+
+    objects = SalesRollupQuerySet.as_manager()
+
+    sales_total_revenue = models.DecimalField(
+        "Sales total revenue", max_digits=20, decimal_places=2, default=0
+    )
+    sales_total_cost = models.DecimalField(
+        "Sales total cost", max_digits=20, decimal_places=2, default=0
+    )
+    sales_total_quantity = models.PositiveBigIntegerField("Sales total quantity", default=0)
+    sales_count = models.PositiveBigIntegerField("Sales count", default=0)
+
+    @classmethod
+    def get_key_attnames(cls):
+        """Return the names of the columns of the key."""
+        return [cls._meta.get_field(name).attname for name in cls.KEY_FIELDS]
+
+    @classmethod
+    def get_sales(cls, using):
+        """Return the rows the rollup aggregates, the sales."""
+        return Sale.objects.using(using).all()
+
+    @classmethod
+    def get_sales_aggregates(cls):
+        """Return the aggregates computing the measures from the sales."""
+        return {
+            # Read from the sales only, without joining their article
+            "sales_total_revenue": Sum("total_selling_price", output_field=TOTAL_FIELD),
+            "sales_total_cost": Sum(F("quantity") * F("unit_cost"), output_field=TOTAL_FIELD),
+            "sales_total_quantity": Sum("quantity"),
+            "sales_count": Count("id"),
+        }
+
+    @classmethod
+    def get_sale_measures(cls, sale):
+        """Return the measures of a single sale."""
+        price = Sale._meta.get_field("unit_selling_price").to_python(sale.unit_selling_price)
+        cost = Sale._meta.get_field("unit_cost").to_python(sale.unit_cost)
+        return {
+            "sales_total_revenue": sale.quantity * price,
+            "sales_total_cost": sale.quantity * cost,
+            "sales_total_quantity": sale.quantity,
+            "sales_count": 1,
+        }
+
+    def get_key(self):
+        """Return the key of the row."""
+        return tuple(getattr(self, name) for name in self.get_key_attnames())
+
+    def get_measures(self):
+        """Return the measures of the row, rounded as they are stored."""
+        measures = {}
+        for field_name in self.MEASURE_FIELDS:
+            field = self._meta.get_field(field_name)
+            value = getattr(self, field_name)
+            if isinstance(field, models.DecimalField):
+                value = field.to_python(value).quantize(Decimal(1).scaleb(-field.decimal_places))
+            measures[field_name] = value
+        return measures
+
+
+class ArticleSalesSummary(SalesRollup):
+    """
+    Totals of the sales of an article.
+    """
+
+    class Meta:
+        verbose_name = "Article Sales Summary"
+        verbose_name_plural = "Article Sales Summaries"
+        indexes = [
+            # Aggregated sales ordered by revenue, or by another of their measures
+            models.Index(fields=["-sales_total_revenue", "article"], name="sales_summary_revenue_idx"),
+            models.Index(fields=["-margin", "article"], name="sales_summary_margin_idx"),
+            models.Index(fields=["-margin_percentage", "article"], name="sales_summary_margin_pct_idx"),
+            models.Index(fields=["-sales_total_quantity", "article"], name="sales_summary_quantity_idx"),
+            models.Index(fields=["-sales_count", "article"], name="sales_summary_count_idx"),
+            models.Index(fields=["-last_sale_date", "article"], name="sales_summary_last_sale_idx"),
+        ]
+
+    KEY_FIELDS = ("article",)
+    MEASURE_FIELDS = SalesRollup.MEASURE_FIELDS + ["last_sale_date"]
+    MAX_FIELDS = {"last_sale_date"}
+
+    article = models.OneToOneField(
+        Article,
+        verbose_name="Article",
+        related_name="sales_summary",
+        primary_key=True,
+        on_delete=models.CASCADE,
+    )
+    last_sale_date = models.DateField("Last sale date")
+    # Computed by the database when the row is written, to be filtered and ordered on
+    margin = models.GeneratedField(
+        expression=F("sales_total_revenue") - F("sales_total_cost"),
+        output_field=models.DecimalField("Margin", max_digits=20, decimal_places=2),
+        db_persist=True,
+    )
+    margin_percentage = models.GeneratedField(
+        expression=get_margin_percentage(F("sales_total_revenue"), F("sales_total_cost")),
+        output_field=models.FloatField("Margin percentage", null=True),
+        db_persist=True,
+    )
+
+    @classmethod
+    def get_sales_aggregates(cls):
+        return {**super().get_sales_aggregates(), "last_sale_date": Max("date")}
+
+    @classmethod
+    def get_sale_measures(cls, sale):
+        return {**super().get_sale_measures(sale), "last_sale_date": sale.date}
+
+    def __str__(self):
+        return f"{self.article_id} - {self.sales_total_revenue}"
+
+
+class DailySalesBucket(SalesRollup):
+    """
+    Totals of the sales of an article on a day.
+    """
+
+    class Meta:
+        verbose_name = "Daily Sales Bucket"
+        verbose_name_plural = "Daily Sales Buckets"
+        constraints = [
+            # Also the index of the time series filtered by date range
+            models.UniqueConstraint(fields=["date", "article"], name="sales_daily_bucket_unique"),
+        ]
+
+    KEY_FIELDS = ("date", "article")
+
+    date = models.DateField("Date")
+    article = models.ForeignKey(
+        Article,
+        verbose_name="Article",
+        related_name="daily_sales_buckets",
+        on_delete=models.CASCADE,
+    )
+
+    def __str__(self):
+        return f"{self.date} - {self.article_id} - {self.sales_total_revenue}"
+
+
+class AuthorDailySalesBucket(SalesRollup):
+    """
+    Totals of the sales of an author on a day.
+    """
+
+    class Meta:
+        verbose_name = "Author Daily Sales Bucket"
+        verbose_name_plural = "Author Daily Sales Buckets"
+        constraints = [
+            # Also the index of the rankings filtered by date range
+            models.UniqueConstraint(fields=["date", "author"], name="sales_author_bucket_unique"),
+        ]
+
+    KEY_FIELDS = ("date", "author")
+
+    date = models.DateField("Date")
+    author = models.ForeignKey(
+        "users.User",
+        verbose_name="Author",
+        related_name="daily_sales_buckets",
+        on_delete=models.CASCADE,
+    )
+
+    def __str__(self):
+        return f"{self.date} - {self.author_id} - {self.sales_total_revenue}"
+
+
+class CategorySalesSummary(SalesRollup):
+    """
+    Totals of the sales of an article category, aggregated from the summaries of its articles.
+    """
+
+    class Meta:
+        verbose_name = "Category Sales Summary"
+        verbose_name_plural = "Category Sales Summaries"
+        indexes = [
+            # Aggregated sales ordered by revenue
+            models.Index(fields=["-sales_total_revenue", "category"], name="sales_cat_summary_revenue_idx"),
+        ]
+
+    KEY_FIELDS = ("category",)
+    MEASURE_FIELDS = SalesRollup.MEASURE_FIELDS + ["last_sale_date", "article_count"]
+    MAX_FIELDS = {"last_sale_date"}
+
+    category = models.OneToOneField(
+        ArticleCategory,
+        verbose_name="Category",
+        related_name="sales_summary",
+        primary_key=True,
+        on_delete=models.CASCADE,
+    )
+    last_sale_date = models.DateField("Last sale date")
+    article_count = models.PositiveBigIntegerField("Article count", default=0)
+    # Computed by the database when the row is written
+    margin = models.GeneratedField(
+        expression=F("sales_total_revenue") - F("sales_total_cost"),
+        output_field=models.DecimalField("Margin", max_digits=20, decimal_places=2),
+        db_persist=True,
+    )
+    margin_percentage = models.GeneratedField(
+        expression=get_margin_percentage(F("sales_total_revenue"), F("sales_total_cost")),
+        output_field=models.FloatField("Margin percentage", null=True),
+        db_persist=True,
+    )
+
+    @classmethod
+    def get_sales(cls, using):
+        """Return the summaries of the articles, with their category."""
+        return ArticleSalesSummary.objects.using(using).annotate(category=F("article__category"))
+
+    @classmethod
+    def get_sales_aggregates(cls):
+        return {
+            "sales_total_revenue": Sum("sales_total_revenue"),
+            "sales_total_cost": Sum("sales_total_cost"),
+            "sales_total_quantity": Sum("sales_total_quantity"),
+            "sales_count": Sum("sales_count"),
+            "last_sale_date": Max("last_sale_date"),
+            "article_count": Count("article"),
+        }
+
+    def __str__(self):
+        return f"{self.category_id} - {self.sales_total_revenue}"
+
+
+def get_sales_rollups(derived=False):
+    """Return the models aggregating the sales, kept up to date when the sales change.
+
+    The rollups derived from the others, by article category, come last with `derived`."""
+    return [ArticleSalesSummary, DailySalesBucket, AuthorDailySalesBucket,
+            *([CategorySalesSummary] if derived else [])]
+
+
+def get_rollup_key_fields():
+    """Return the fields of Sale the rollups are grouped by."""
+    return sorted({name for rollup in get_sales_rollups() for name in rollup.KEY_FIELDS})
+
+
+def set_unit_costs(using, sales):
+    """Copy the manufacturing cost of their article to the sales, reading the articles not
+    loaded along by a single query."""
+    costs = {sale.article_id: sale.article.manufacturing_cost for sale in sales if Sale.article.is_cached(sale)}
+    missing_costs = {sale.article_id for sale in sales} - costs.keys()
+    if missing_costs:
+        costs.update(
+            Article.objects.using(using).filter(pk__in=missing_costs).values_list("pk", "manufacturing_cost")
+        )
+    for sale in sales:
+        sale.unit_cost = costs.get(sale.article_id)
+
+
+def get_sale_categories(using, sales):
+    """Return the categories of the articles of the sales, reading the articles not loaded
+    along by a single query."""
+    categories = {sale.article.category_id for sale in sales if Sale.article.is_cached(sale)}
+    missing = {sale.article_id for sale in sales if not Sale.article.is_cached(sale)}
+    if missing:
+        categories.update(
+            Article.objects.using(using).filter(pk__in=missing).values_list("category", flat=True).distinct()
+        )
+    return categories
+
+
+def refresh_category_sales_summaries(using, categories):
+    """Recompute the summaries of the given categories from the summaries of their articles."""
+    CategorySalesSummary.objects.using(using).refresh([{"category": category} for category in categories])
+
+
+def add_to_sales_rollups(using, sales):
+    """Add newly created sales to the rollups."""
+    if not sales:
+        return
+    for rollup in get_sales_rollups():
+        rollup.objects.using(using).add_sales(sales)
+    refresh_category_sales_summaries(using, get_sale_categories(using, sales))
+
+
+def refresh_sales_rollups(using, keys):
+    """Recompute the rows of the rollups the sales with the given keys are aggregated in."""
+    for rollup in get_sales_rollups():
+        rollup.objects.using(using).refresh(keys)
+    articles = {key["article"] for key in keys if key is not None}
+    if articles:
+        refresh_category_sales_summaries(
+            using, Article.objects.using(using).filter(pk__in=articles).values_list("category", flat=True).distinct()
+        )
+
+
+def update_sales_rollups_cost(using, article_pks, categories=()):
+    """Recompute the cost of the sales of the given articles and of their rollups from
+    their manufacturing cost, only for the sales whose cost changed.
+
+    The summaries of the categories of the articles whose cost changed are refreshed,
+    along with the given categories, e.g. the ones the articles moved from or to."""
+    cost = Subquery(Article.objects.using(using).filter(pk=OuterRef("article")).values("manufacturing_cost"))
+    sales = Sale.objects.using(using).filter(article__in=article_pks).exclude(unit_cost=cost)
+    # Read before the update, which makes the sales leave the queryset
+    keys = sales.get_rollup_keys()
+    categories = set(categories)
+    if keys:
+        sales.update_unit_costs()
+        articles = {key["article"] for key in keys}
+        for rollup in get_sales_rollups():
+            if "article" in rollup.KEY_FIELDS:
+                rollup.objects.using(using).filter(article__in=articles).update(
+                    sales_total_cost=F("sales_total_quantity") * cost
+                )
+            else:
+                rollup.objects.using(using).refresh(keys)
+        categories.update(
+            Article.objects.using(using).filter(pk__in=articles).values_list("category", flat=True).distinct()
+        )
+    if categories:
+        refresh_category_sales_summaries(using, categories)
+    if keys or categories:
+        sales_changed.send(sender=Article, using=using)
+
+
+def get_author_sales_stats(start=None, end=None):
+    """Return the annotations of the number of sales, revenue and margin of users over a date
+    range, summed from their daily buckets by a subquery per annotation."""
+    buckets = AuthorDailySalesBucket.objects.filter(author=OuterRef("pk"))
+    if start is not None:
+        buckets = buckets.filter(date__gte=start)
+    if end is not None:
+        buckets = buckets.filter(date__lte=end)
+    buckets = buckets.order_by().values("author")
+
+    def get_total(aggregate, output_field):
+        # Without sale in the date range, the total is 0
+        total = Subquery(buckets.annotate(total=aggregate).values("total"), output_field=output_field)
+        return Coalesce(total, Value(0), output_field=output_field)
+
+    return {
+        "sales_count": get_total(Sum("sales_count"), models.PositiveBigIntegerField()),
+        "sales_total_revenue": get_total(Sum("sales_total_revenue"), TOTAL_FIELD),
+        "margin": get_total(Sum("sales_total_revenue") - Sum("sales_total_cost"), TOTAL_FIELD),
+    }
@@ -0,0 +1,33 @@
+from django.db.migrations import AddIndex
+
+
+class AddIndexConcurrently(AddIndex):
+    """
+    Add an index without locking the writes of the table while it is built on
+    PostgreSQL, like the operation of django.contrib.postgres, and as AddIndex on the
+    other databases.
+
+    The migration must not be atomic on PostgreSQL.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.add_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.add_index(model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.remove_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, self.index)
+
+    def describe(self):
+        description = super().describe()
+        return f"Concurrently {description[0].lower()}{description[1:]}"
@@ -0,0 +1,149 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination, _reverse_ordering
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Cursor pagination on a composite and unique ordering.
+
+    DRF's cursor only keeps the value of the first ordering field and skips the rows
+    sharing it with an offset, which degrades when many rows have the same value (e.g.
+    all the sales of a day). The cursor position here holds the value of every ordering
+    field, so that any page is fetched with a single index range scan and no offset."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Override paginate_queryset to filter on the whole position of the cursor."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        current_position = self.cursor.position if self.cursor is not None else None
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.get_position_filter(queryset.model, current_position, reverse))
+
+        # Fetch an extra item to know if there is a following page
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.next_position = current_position
+            self.has_previous = following_position is not None
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.next_position = following_position
+            self.has_previous = current_position is not None
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_position_filter(self, model, position, reverse):
+        """Return the filter selecting the rows after the given position.
+
+        For an ordering (a, b) it is `a <= x AND (a < x OR (a = x AND b < y))`, the
+        leading bound on the first field letting the database use the index on (a, b)."""
+        try:
+            values = json.loads(position)
+            assert isinstance(values, list) and len(values) == len(self.ordering)
+            values = [model._meta.get_field(order.lstrip('-')).to_python(value)
+                      for order, value in zip(self.ordering, values)]
+        except (AssertionError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        position_filter = Q()
+        equal_lookups = {}
+        for order, value in zip(self.ordering, values):
+            attr = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+            position_filter |= Q(**equal_lookups, **{f'{attr}__{lookup}': value})
+            equal_lookups[attr] = value
+        first_attr = self.ordering[0].lstrip('-')
+        first_lookup = 'lte' if self.ordering[0].startswith('-') != reverse else 'gte'
+        return Q(**{f'{first_attr}__{first_lookup}': values[0]}) & position_filter
+
+    def _get_position_from_instance(self, instance, ordering):
+        """Override _get_position_from_instance to encode every ordering field."""
+        values = []
+        for order in ordering:
+            field_name = order.lstrip('-')
+            if isinstance(instance, dict):
+                values.append(instance[field_name])
+            else:
+                values.append(getattr(instance, field_name))
+        return json.dumps([str(value) for value in values])
+
+
+class SaleCursorPagination(KeysetCursorPagination):
+    """Cursor pagination of the sales, most recent first."""
+
+    # Must match the composite index on Sale
+    ordering = ('-date', '-id')
+
+
+class SalePagination(BasePagination):
+    """Pagination of the sales, by page number unless a cursor is requested.
+
+    The cursor mode is selected with `?pagination=cursor`, the following pages are
+    then requested with the `cursor` parameter of the `next`/`previous` links. It does
+    not count the sales and costs the same whatever the depth of the page."""
+
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+
+    def __init__(self):
+        self.page_number_paginator = PageNumberPagination()
+        self.cursor_paginator = SaleCursorPagination()
+        self.paginator = self.page_number_paginator
+
+    def use_cursor(self, request):
+        """Check if the request asks for the cursor pagination."""
+        return (request.query_params.get(self.mode_query_param) == self.cursor_mode
+                or self.cursor_paginator.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Paginate the queryset with the paginator requested."""
+        if self.use_cursor(request):
+            self.paginator = self.cursor_paginator
+        else:
+            self.paginator = self.page_number_paginator
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number_paginator.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
+
+    def get_schema_operation_parameters(self, view):
+        return (self.page_number_paginator.get_schema_operation_parameters(view)
+                + self.cursor_paginator.get_schema_operation_parameters(view))
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, 'display_page_controls', False)
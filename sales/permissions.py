@@ -31,5 +31,6 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         # If request is read only, allow it
         if request.method in permissions.SAFE_METHODS:
             return True
-        # Else check that the user is the author of the sale
-        return obj.author == request.user
+        # Else check that the user is the author of the sale, comparing ids
+        # so that the author is not fetched from the database
+        return obj.author_id == request.user.pk
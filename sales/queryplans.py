@@ -0,0 +1,106 @@
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .benchmarks import get_endpoints
+from .models import Article
+
+# Plan lines of the full scans of a table, by database vendor: SQLite scans a table
+# without index as `SCAN table` and PostgreSQL as `Seq Scan on table`
+FULL_SCAN_PATTERNS = {
+    "sqlite": re.compile(r"^SCAN (?P<table>\w+)$"),
+    "postgresql": re.compile(r"Seq Scan on (?P<table>\w+)"),
+}
+
+
+def get_checked_endpoints():
+    """Return the name and path of the API endpoints whose queries are checked.
+
+    The requests of the benchmark, besides the admin pages and the writes, and the
+    filtered ones."""
+    article = Article.objects.order_by("pk").first()
+    endpoints = [
+        (name, path) for name, method, path, _ in get_endpoints()
+        if method == "get" and not name.startswith("admin-")
+    ]
+    endpoints += [
+        ("articlecategory-list", reverse("articlecategory-list")),
+        ("sale-list-sparse", reverse("sale-list") + "?fields=date,total_selling_price"),
+        ("sale-export-range", reverse("sale-export") + "?start=2021-01-01&end=2021-01-31"),
+        ("saletimeseries-list-range", reverse("saletimeseries-list") + "?start=2021-01-01&end=2021-03-31"),
+        ("saletimeseries-list-month", reverse("saletimeseries-list")
+         + "?granularity=month&group_by=category&start=2021-01-01&end=2021-06-30"),
+        ("saleaggregated-list-range", reverse("saleaggregated-list") + "?start=2021-01-01&end=2021-01-31"),
+        ("saleaggregated-list-min-revenue", reverse("saleaggregated-list") + "?min_revenue=100000"),
+        ("saleaggregated-list-ordering", reverse("saleaggregated-list") + "?ordering=-margin_percentage"),
+        ("salecategoryaggregated-list-range", reverse("salecategoryaggregated-list")
+         + "?start=2021-01-01&end=2021-01-31"),
+        ("saletop-list-category", reverse("saletop-list") + "?dimension=category&start=2021-01-01&end=2021-01-31"),
+        ("saletop-list-author", reverse("saletop-list") + "?dimension=author&measure=margin"
+                                                          "&start=2021-01-01&end=2021-01-31"),
+        ("saleauthorstats-list", reverse("saleauthorstats-list")),
+        ("saleauthorstats-list-range", reverse("saleauthorstats-list") + "?start=2021-01-01&end=2021-01-31"),
+    ]
+    if article is not None:
+        endpoints += [
+            ("sale-export-category", reverse("sale-export") + f"?category={article.category_id}"
+                                                              "&start=2021-01-01&end=2021-01-31"),
+            ("saletimeseries-list-article", reverse("saletimeseries-list") + f"?article={article.pk}"),
+            ("saleaggregated-list-category", reverse("saleaggregated-list") + f"?category={article.category_id}"),
+        ]
+    return endpoints
+
+
+def explain(sql):
+    """Return the lines of the plan of a query."""
+    prefix = "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql)
+        # The detail is the last column of the plans of SQLite
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def get_full_scans(plan, vendor, tables):
+    """Return the tables scanned without index by a plan, among the given ones rather
+    than the subqueries."""
+    pattern = FULL_SCAN_PATTERNS[vendor]
+    return [match["table"] for match in map(pattern.search, plan) if match and match["table"] in tables]
+
+
+def get_row_count(table):
+    """Return the number of rows of a table."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+        return cursor.fetchone()[0]
+
+
+def check_query_plans(client, names=None, min_rows=1000):
+    """Request the endpoints with the client and return the full scans of the tables of
+    at least `min_rows` rows by their queries, as (endpoint, table, SQL, plan).
+
+    Scanning a small table is often cheaper than using its indexes."""
+    full_scans = []
+    row_counts = {}
+    tables = set(connection.introspection.table_names())
+    for name, path in get_checked_endpoints():
+        if names and name not in names:
+            continue
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path)
+            if response.streaming:
+                # Consume streamed responses, their queries run while they are sent
+                b"".join(response.streaming_content)
+        # The captured queries are read from the log of the connection, reset by the next queries
+        statements = [query["sql"] for query in queries.captured_queries]
+        for sql in statements:
+            if not sql.lstrip().upper().startswith("SELECT"):
+                continue
+            plan = explain(sql)
+            for table in get_full_scans(plan, connection.vendor, tables):
+                if table not in row_counts:
+                    row_counts[table] = get_row_count(table)
+                if row_counts[table] >= min_rows:
+                    full_scans.append((name, table, sql, plan))
+    return full_scans
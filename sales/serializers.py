@@ -1,31 +1,38 @@
-from django.urls import reverse_lazy
+import datetime
+from urllib.parse import urlencode
+
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+from main.hyperlinks import CachedHyperlinkedModelSerializer, CachedHyperlinkedRelatedField, get_url_builder
 from users.models import User
 from .models import Article, ArticleCategory, Sale
 
 
-class ArticleCategorySerializer(serializers.HyperlinkedModelSerializer):
+class ArticleCategorySerializer(CachedHyperlinkedModelSerializer):
     """Serialize of ArticleCategory model."""
     class Meta:
         model = ArticleCategory
         fields = '__all__'
 
 
-class ArticleSerializer(serializers.HyperlinkedModelSerializer):
+class ArticleSerializer(CachedHyperlinkedModelSerializer):
     """Serialize of Article model."""
     class Meta:
         model = Article
         fields = '__all__'
 
 
-class SaleSerializer(serializers.HyperlinkedModelSerializer):
+class SaleSerializer(CachedHyperlinkedModelSerializer):
     """Serialize of Sale model."""
     article_code = serializers.SerializerMethodField()
     article_name = serializers.SerializerMethodField()
     article_category = serializers.SerializerMethodField()
     total_selling_price = serializers.SerializerMethodField()
-    author = serializers.HyperlinkedRelatedField(queryset=User.objects.all(), view_name='user-detail')
-    article = serializers.HyperlinkedRelatedField(queryset=Article.objects.all(), view_name='article-detail')
+    author = CachedHyperlinkedRelatedField(queryset=User.objects.all(), view_name='user-detail')
+    # The category is rendered right after create/update, fetch it along with the article
+    article = CachedHyperlinkedRelatedField(queryset=Article.objects.select_related('category'),
+                                            view_name='article-detail')
 
     class Meta:
         model = Sale
@@ -54,6 +61,15 @@ class SaleSerializer(serializers.HyperlinkedModelSerializer):
         return obj.get_total_selling_price()
 
 
+class SaleBulkItemSerializer(serializers.ModelSerializer):
+    """Serialize of a sale of a bulk creation, referencing its article by code."""
+    article_code = serializers.CharField(max_length=6)
+
+    class Meta:
+        model = Sale
+        fields = ['date', 'article_code', 'quantity', 'unit_selling_price']
+
+
 class AggregatedSaleSerializer(serializers.ModelSerializer):
     """Serialize of Sale aggregated."""
 
@@ -67,13 +83,227 @@ class AggregatedSaleSerializer(serializers.ModelSerializer):
             - category url : link to the article category
             - sales_total_revenue : total revenue from sales
             - margin : sales_total_revenue - manufacturing_cost
+            - margin_percentage : margin in percentage of sales_total_revenue, null without revenue
+            - sales_total_quantity : number of articles sold
+            - sales_count : number of sales
+            - last_sale_date
+        Only the fields given in the context, or else selected in the aggregated sale, are rendered."""
+        request = self.context['request']
+        fields = self.context.get('fields') or instance
+        data = {}
+        if "article" in fields:
+            data["article"] = get_url_builder(request, "article-detail")(instance['article'])
+        if "category" in fields:
+            data["category"] = get_url_builder(request, "articlecategory-detail")(instance['category'])
+        # round to 2 decimals as it's most of the time the currency decimal place
+        if "sales_total_revenue" in fields:
+            data["sales_total_revenue"] = round(instance["sales_total_revenue"], 2)
+        if "margin" in fields:
+            data["margin"] = round(instance["margin"], 2)
+        if "margin_percentage" in fields:
+            margin_percentage = instance["margin_percentage"]
+            data["margin_percentage"] = None if margin_percentage is None else round(margin_percentage, 2)
+        if "sales_total_quantity" in fields:
+            data["sales_total_quantity"] = instance["sales_total_quantity"]
+        if "sales_count" in fields:
+            data["sales_count"] = instance["sales_count"]
+        if "last_sale_date" in fields:
+            data["last_sale_date"] = instance['last_sale_date']
+        return data
+
+
+class DateRangeQuerySerializer(serializers.Serializer):
+    """Serialize of the query parameters of a date range."""
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if 'start' in attrs and 'end' in attrs and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'end': 'The end of the period must be after its start.'})
+        return attrs
+
+
+class SaleExportQuerySerializer(DateRangeQuerySerializer):
+    """Serialize of the query parameters of the sales export."""
+    export_format = serializers.ChoiceField(choices=['csv', 'ndjson'], default='csv')
+    category = serializers.PrimaryKeyRelatedField(queryset=ArticleCategory.objects.all(), required=False)
+
+
+class AggregatedSaleQuerySerializer(DateRangeQuerySerializer):
+    """Serialize of the query parameters of the aggregated sales."""
+    # Fields the aggregated sales may be ordered by, in decreasing order with a leading '-'
+    ordering_fields = ['article', 'sales_total_revenue', 'margin', 'margin_percentage',
+                       'sales_total_quantity', 'sales_count', 'last_sale_date']
+
+    category = serializers.PrimaryKeyRelatedField(queryset=ArticleCategory.objects.all(), required=False)
+    min_revenue = serializers.DecimalField(max_digits=20, decimal_places=2, required=False)
+    ordering = serializers.ChoiceField(
+        choices=[prefix + name for name in ordering_fields for prefix in ('', '-')],
+        default='-sales_total_revenue',
+    )
+
+
+class CategoryAggregatedSaleQuerySerializer(DateRangeQuerySerializer):
+    """Serialize of the query parameters of the aggregated sales by category."""
+    # Fields the aggregated sales may be ordered by, in decreasing order with a leading '-'
+    ordering_fields = ['category', 'sales_total_revenue', 'margin', 'margin_percentage',
+                       'sales_total_quantity', 'sales_count', 'last_sale_date', 'article_count']
+
+    min_revenue = serializers.DecimalField(max_digits=20, decimal_places=2, required=False)
+    ordering = serializers.ChoiceField(
+        choices=[prefix + name for name in ordering_fields for prefix in ('', '-')],
+        default='-sales_total_revenue',
+    )
+
+
+class CategoryAggregatedSaleSerializer(serializers.Serializer):
+    """Serialize of Sale aggregated by article category."""
+
+    def get_articles_url(self, category):
+        """Return the URL of the aggregated sales by article of a category."""
+        # Reversed once for the rows of the list
+        if not hasattr(self, '_articles_url'):
+            self._articles_url = reverse('saleaggregated-list', request=self.context['request'])
+        return f"{self._articles_url}?{urlencode({'category': category, **self.context.get('drill_down_params', {})})}"
+
+    def to_representation(self, instance):
+        """Override representation to give the aggregated sales of a category:
+            - category url : link to the article category
+            - sales_total_revenue : total revenue from sales
+            - margin : sales_total_revenue - manufacturing_cost
+            - margin_percentage : margin in percentage of sales_total_revenue, null without revenue
+            - sales_total_quantity : number of articles sold
+            - sales_count : number of sales
+            - last_sale_date
+            - article_count : number of articles sold
+            - articles : link to the aggregated sales of the articles of the category"""
+        request = self.context['request']
+        margin_percentage = instance["margin_percentage"]
+        return {
+                "category": get_url_builder(request, "articlecategory-detail")(instance['category']),
+                "sales_total_revenue": round(instance["sales_total_revenue"], 2),
+                "margin": round(instance["margin"], 2),
+                "margin_percentage": None if margin_percentage is None else round(margin_percentage, 2),
+                "sales_total_quantity": instance["sales_total_quantity"],
+                "sales_count": instance["sales_count"],
+                "last_sale_date": instance["last_sale_date"],
+                "article_count": instance["article_count"],
+                "articles": self.get_articles_url(instance['category']),
+            }
+
+
+class SalesRankingQuerySerializer(DateRangeQuerySerializer):
+    """Serialize of the query parameters of the top sales, over the last week by default."""
+    # Days of the default date range, ending today
+    default_days = 7
+
+    dimension = serializers.ChoiceField(choices=['article', 'category', 'author'], default='article')
+    measure = serializers.ChoiceField(choices=['sales_total_revenue', 'margin', 'sales_total_quantity',
+                                               'sales_count'], default='sales_total_revenue')
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate(self, attrs):
+        attrs.setdefault('end', timezone.localdate())
+        attrs.setdefault('start', attrs['end'] - datetime.timedelta(days=self.default_days - 1))
+        return super().validate(attrs)
+
+
+class SalesRankingSerializer(serializers.Serializer):
+    """Serialize of Sale aggregated by article, category or author over a date range."""
+    view_names = {
+        'article': 'article-detail',
+        'category': 'articlecategory-detail',
+        'author': 'user-detail',
+    }
+
+    def to_representation(self, instance):
+        """Override representation to give the aggregated sales of an article, category or author:
+            - article, category or author url : link to the article, the article category or the user
+            - sales_total_revenue : total revenue from sales
+            - margin : sales_total_revenue - manufacturing_cost
+            - margin_percentage : margin in percentage of sales_total_revenue, null without revenue
+            - sales_total_quantity : number of articles sold
+            - sales_count : number of sales"""
+        request = self.context['request']
+        dimension = self.context['dimension']
+        margin_percentage = instance["margin_percentage"]
+        return {
+                dimension: get_url_builder(request, self.view_names[dimension])(instance[dimension]),
+                "sales_total_revenue": round(instance["sales_total_revenue"], 2),
+                "margin": round(instance["margin"], 2),
+                "margin_percentage": None if margin_percentage is None else round(margin_percentage, 2),
+                "sales_total_quantity": instance["sales_total_quantity"],
+                "sales_count": instance["sales_count"],
+            }
+
+
+class AuthorSalesStatsQuerySerializer(DateRangeQuerySerializer):
+    """Serialize of the query parameters of the sales statistics by author."""
+    # Fields the statistics may be ordered by, in decreasing order with a leading '-'
+    ordering_fields = ['author', 'sales_total_revenue', 'margin', 'margin_percentage',
+                       'sales_total_quantity', 'sales_count', 'last_sale_date']
+
+    author = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), required=False)
+    ordering = serializers.ChoiceField(
+        choices=[prefix + name for name in ordering_fields for prefix in ('', '-')],
+        default='-sales_total_revenue',
+    )
+
+
+class AuthorSalesStatsSerializer(serializers.Serializer):
+    """Serialize of Sale aggregated by author."""
+
+    def to_representation(self, instance):
+        """Override representation to give the sales statistics of an author:
+            - author url : link to the user
+            - sales_total_revenue : total revenue from sales
+            - margin : sales_total_revenue - manufacturing_cost
+            - margin_percentage : margin in percentage of sales_total_revenue, null without revenue
+            - sales_total_quantity : number of articles sold
+            - sales_count : number of sales
             - last_sale_date"""
+        request = self.context['request']
+        margin_percentage = instance["margin_percentage"]
+        return {
+                "author": get_url_builder(request, "user-detail")(instance['author']),
+                "sales_total_revenue": round(instance["sales_total_revenue"], 2),
+                "margin": round(instance["margin"], 2),
+                "margin_percentage": None if margin_percentage is None else round(margin_percentage, 2),
+                "sales_total_quantity": instance["sales_total_quantity"],
+                "sales_count": instance["sales_count"],
+                "last_sale_date": instance["last_sale_date"],
+            }
+
+
+class SalesTimeSeriesQuerySerializer(DateRangeQuerySerializer):
+    """Serialize of the query parameters of the sales time series."""
+    granularity = serializers.ChoiceField(choices=['day', 'week', 'month'], default='day')
+    group_by = serializers.ChoiceField(choices=['article', 'category'], default='article')
+    article = serializers.PrimaryKeyRelatedField(queryset=Article.objects.all(), required=False)
+    category = serializers.PrimaryKeyRelatedField(queryset=ArticleCategory.objects.all(), required=False)
+
+
+class SalesTimeSeriesSerializer(serializers.Serializer):
+    """Serialize of Sale aggregated by period and article or category."""
+
+    def to_representation(self, instance):
+        """Override representation to give the aggregated sales of a period:
+            - period : first day of the period
+            - article or category url : link to the article or the article category
+            - sales_total_revenue : total revenue from sales
+            - margin : sales_total_revenue - manufacturing_cost
+            - sales_total_quantity : number of articles sold
+            - sales_count : number of sales"""
+        request = self.context['request']
+        if 'article' in instance:
+            dimension = {"article": get_url_builder(request, "article-detail")(instance['article'])}
+        else:
+            dimension = {"category": get_url_builder(request, "articlecategory-detail")(instance['category'])}
         return {
-                "article": self.context['request'].build_absolute_uri(reverse_lazy("article-detail", args=[instance['article']])),
-                # "category": instance['category'],
-                "category": self.context['request'].build_absolute_uri(reverse_lazy("articlecategory-detail", args=[instance['category']])),
-                # round to 2 decimals as it's most of the time the currency decimal place
+                "period": instance['period'],
+                **dimension,
                 "sales_total_revenue": round(instance["sales_total_revenue"], 2),
                 "margin": round(instance["margin"], 2),
-                "last_sale_date": instance['last_sale_date'],
+                "sales_total_quantity": instance["sales_total_quantity"],
+                "sales_count": instance["sales_count"],
             }
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .cache import invalidate_sales_cache
+
+# Sent with the database alias as `using` when sales are created, updated or deleted,
+# one by one or in bulk. Unlike post_save and post_delete, it is sent by the bulk
+# operations and does not prevent the sales from being deleted without fetching them.
+sales_changed = Signal()
+
+
+@receiver(sales_changed)
+@receiver(post_save, sender="sales.Article")
+@receiver(post_delete, sender="sales.Article")
+def invalidate_aggregated_sales(sender, using=None, **kwargs):
+    """Invalidate the cached pages of aggregated sales when the sales or the articles change."""
+    invalidate_sales_cache(using)
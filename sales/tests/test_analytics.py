@@ -0,0 +1,160 @@
+"""Test the sales aggregated in memory."""
+import datetime
+import unittest
+from unittest import mock
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, F, Max, Sum
+from django.test import TestCase, override_settings
+from django.urls import reverse_lazy
+from users.models import User
+from sales import analytics
+from sales.models import ArticleSalesSummary, Sale
+from .test_article import create_article
+from .test_articlecategory import create_category
+from .test_sale import create_sale
+
+TODAY = datetime.date(2024, 3, 26)
+
+
+@unittest.skipIf(analytics.np is None, 'numpy is not installed.')
+class SalesColumnsTests(TestCase):
+    """Test SalesColumns aggregates the sales as the database does."""
+
+    def setUp(self):
+        """Set up."""
+        analytics.clear_sales_columns()
+        self.addCleanup(analytics.clear_sales_columns)
+        cache.clear()
+        self.basic_user = User.objects.create_user(email='test1@email.fr')
+        self.categories = [create_category('anewcategory1'), create_category('anewcategory2')]
+        self.articles = [create_article(f'ART00{i}', self.categories[i % 2]) for i in range(4)]
+        Sale.objects.bulk_create([
+            Sale(date=TODAY - datetime.timedelta(days=i % 7), author=self.basic_user,
+                 article=self.articles[i % 3], quantity=i % 5 + 1,
+                 unit_selling_price=Decimal('10.50') + Decimal(i) / 100)
+            for i in range(50)
+        ])
+        self.client.force_login(user=self.basic_user)
+
+    def get_sql_groups(self, by='article', start=None, end=None, category=None, article=None):
+        """Return the sales aggregated by the database, by key."""
+        sales = Sale.objects.all()
+        if start is not None:
+            sales = sales.filter(date__gte=start)
+        if end is not None:
+            sales = sales.filter(date__lte=end)
+        if category is not None:
+            sales = sales.filter(article__category=category)
+        if article is not None:
+            sales = sales.filter(article=article)
+        key = 'article' if by == 'article' else 'article__category'
+        return {
+            row[key]: {
+                'revenue': row['revenue'],
+                'cost': row['cost'],
+                'quantity': row['quantity'],
+                'count': row['count'],
+                'last_date': row['last_date'],
+            }
+            for row in sales.values(key).annotate(
+                revenue=Sum('total_selling_price'),
+                cost=Sum(F('quantity') * F('unit_cost')),
+                quantity=Sum('quantity'),
+                count=Count('pk'),
+                last_date=Max('date'),
+            )
+        }
+
+    def get_groups(self, **filters):
+        """Return the sales aggregated in memory, by key."""
+        groups = analytics.get_sales_columns().aggregate(**filters)
+        return {
+            int(key): {
+                'revenue': analytics.from_cents(groups['revenue'][index]),
+                'cost': analytics.from_cents(groups['cost'][index]),
+                'quantity': int(groups['quantity'][index]),
+                'count': int(groups['count'][index]),
+                'last_date': datetime.date.fromordinal(int(groups['last_date'][index])),
+            }
+            for index, key in enumerate(groups['key'])
+        }
+
+    def assertSameGroups(self, **filters):
+        """Check the sales are aggregated in memory as by the database."""
+        self.assertEqual(self.get_groups(**filters), self.get_sql_groups(**filters))
+
+    def test_aggregate(self):
+        """Test the groups of sales, filtered or not."""
+        self.assertSameGroups()
+        self.assertSameGroups(by='category')
+        self.assertSameGroups(start=TODAY - datetime.timedelta(days=3), end=TODAY - datetime.timedelta(days=1))
+        self.assertSameGroups(category=self.categories[0].pk)
+        self.assertSameGroups(by='category', article=self.articles[1].pk)
+        self.assertEqual(self.get_groups(start=TODAY + datetime.timedelta(days=1)), {})
+
+    def test_refresh(self):
+        """Test the sales created, updated and deleted since the last refresh are loaded."""
+        self.assertSameGroups()
+        create_sale(self.basic_user, TODAY, self.articles[3])
+        Sale.objects.filter(article=self.articles[0]).update(quantity=3)
+        sale = Sale.objects.filter(article=self.articles[1]).first()
+        sale.unit_selling_price = Decimal('1.01')
+        sale.save()
+        self.assertSameGroups()
+        # The costs of the sales are copied from their article
+        self.articles[2].manufacturing_cost = Decimal('7.77')
+        self.articles[2].save()
+        self.assertSameGroups()
+        Sale.objects.filter(article=self.articles[1], date=TODAY).delete()
+        self.assertSameGroups()
+        self.assertEqual(len(analytics.get_sales_columns()), Sale.objects.count())
+        self.articles[3].category = self.categories[0]
+        self.articles[3].save()
+        self.assertSameGroups(by='category')
+
+    def test_top(self):
+        """Test the groups with the greatest revenue."""
+        columns = analytics.get_sales_columns()
+        groups = columns.aggregate()
+        top = columns.top(groups, 2)
+        revenues = Sale.objects.values('article').annotate(revenue=Sum('total_selling_price')).order_by('-revenue')
+        self.assertEqual([int(groups['key'][index]) for index in top], [row['article'] for row in revenues[:2]])
+
+    def test_aggregated_sales(self):
+        """Test the aggregated sales read from memory are the ones read from the summaries."""
+        url = reverse_lazy('saleaggregated-list')
+        analytics.get_sales_columns()
+        for params in ({}, {'fast': 'true'}, {'fields': 'article,margin'},
+                       {'fields': 'category,last_sale_date', 'fast': 'true'},
+                       {'start': TODAY - datetime.timedelta(days=3), 'ordering': '-margin_percentage'},
+                       {'min_revenue': '200', 'ordering': 'sales_count'},
+                       {'end': TODAY - datetime.timedelta(days=1), 'ordering': '-last_sale_date'}):
+            with self.subTest(params=params):
+                cache.clear()
+                response = self.client.get(url, params)
+                cache.clear()
+                # The session, the user, and the checks the sales are up to date
+                with override_settings(SALES_ANALYTICS=True), self.assertNumQueries(4):
+                    analytics_response = self.client.get(url, params)
+                self.assertEqual(analytics_response.status_code, 200)
+                self.assertEqual(analytics_response.content, response.content)
+
+    def test_null_margin_percentage(self):
+        """Test the articles sold for nothing, without margin percentage, are ordered as by the
+        database, whether it orders the nulls as the largest values or the lowest."""
+        Sale.objects.create(date=TODAY, author=self.basic_user, article=self.articles[3], quantity=1,
+                            unit_selling_price=Decimal('0'))
+        columns = analytics.get_sales_columns()
+        for ordering in ('margin_percentage', '-margin_percentage'):
+            with self.subTest(ordering=ordering):
+                rows = columns.get_article_rows(['article', 'margin_percentage'], ordering=ordering)
+                self.assertEqual([row['article'] for row in rows], list(
+                    ArticleSalesSummary.objects.order_by(ordering, 'article').values_list('article', flat=True)))
+        features = connection.features
+        with mock.patch.object(type(features), 'nulls_order_largest', True):
+            rows = columns.get_article_rows(['article'], ordering='-margin_percentage')
+            self.assertEqual(rows[0]['article'], self.articles[3].pk)
+            rows = columns.get_article_rows(['article'], ordering='margin_percentage')
+            self.assertEqual(rows[-1]['article'], self.articles[3].pk)
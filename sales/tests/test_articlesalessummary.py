@@ -0,0 +1,235 @@
+"""Test article sales summary."""
+import datetime
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from django.test import TestCase
+from django.urls import reverse_lazy
+from rest_framework import status
+from users.models import User
+from sales.models import Article, ArticleSalesSummary, Sale, get_sales_rollups
+from .test_article import create_article
+from .test_articlecategory import create_category
+from .test_sale import create_sale
+
+TODAY = datetime.date(2024, 3, 26)
+YESTERDAY = TODAY - datetime.timedelta(days=1)
+
+
+class ArticleSalesSummaryTests(TestCase):
+    """Test ArticleSalesSummary is kept up to date with the sales."""
+
+    def setUp(self):
+        """Set up."""
+        self.basic_user = User.objects.create_user(email='test1@email.fr')
+        self.anewcategory = create_category('anewcategory')
+        self.anewarticle1 = create_article('anewarticle1', self.anewcategory)
+        self.anewarticle2 = create_article('anewarticle2', self.anewcategory)
+
+    def assertSummariesMatchSales(self):
+        """Check the summaries and buckets are the ones computed from scratch."""
+        for rollup in get_sales_rollups(derived=True):
+            self.assertEqual(rollup.objects.get_mismatches(), set(), rollup)
+
+    def test_create(self):
+        """Test creating sales one by one increments the summary."""
+        create_sale(self.basic_user, YESTERDAY, self.anewarticle1)
+        create_sale(self.basic_user, TODAY, self.anewarticle1)
+        summary = ArticleSalesSummary.objects.get(article=self.anewarticle1)
+        self.assertEqual(summary.sales_total_revenue, Decimal('22000'))
+        self.assertEqual(summary.sales_total_cost, Decimal('19999.80'))
+        self.assertEqual(summary.sales_total_quantity, 20)
+        self.assertEqual(summary.sales_count, 2)
+        self.assertEqual(summary.last_sale_date, TODAY)
+        self.assertFalse(ArticleSalesSummary.objects.filter(article=self.anewarticle2).exists())
+        self.assertSummariesMatchSales()
+
+    def test_bulk_create(self):
+        """Test bulk creating sales of several articles."""
+        Sale.objects.bulk_create([
+            Sale(date=TODAY - datetime.timedelta(days=i), author=self.basic_user,
+                 article_id=(self.anewarticle1.pk, self.anewarticle2.pk)[i % 2],
+                 quantity=i + 1, unit_selling_price=Decimal('10.50'))
+            for i in range(5)
+        ])
+        self.assertEqual(ArticleSalesSummary.objects.get(article=self.anewarticle2).sales_total_quantity, 6)
+        self.assertEqual(ArticleSalesSummary.objects.get(article=self.anewarticle2).last_sale_date, YESTERDAY)
+        self.assertSummariesMatchSales()
+
+    def test_update(self):
+        """Test updating a sale, including moving it to another article."""
+        anewsale = create_sale(self.basic_user, TODAY, self.anewarticle1)
+        create_sale(self.basic_user, YESTERDAY, self.anewarticle1)
+        anewsale = Sale.objects.get(pk=anewsale.pk)
+        anewsale.article = self.anewarticle2
+        anewsale.quantity = 1
+        anewsale.save()
+        self.assertEqual(ArticleSalesSummary.objects.get(article=self.anewarticle1).last_sale_date, YESTERDAY)
+        self.assertEqual(ArticleSalesSummary.objects.get(article=self.anewarticle2).sales_total_quantity, 1)
+        self.assertSummariesMatchSales()
+
+    def test_queryset_update(self):
+        """Test updating sales in bulk."""
+        create_sale(self.basic_user, TODAY, self.anewarticle1)
+        create_sale(self.basic_user, YESTERDAY, self.anewarticle2)
+        Sale.objects.filter(date=TODAY).update(article=self.anewarticle2, quantity=2)
+        self.assertFalse(ArticleSalesSummary.objects.filter(article=self.anewarticle1).exists())
+        self.assertEqual(ArticleSalesSummary.objects.get(article=self.anewarticle2).sales_count, 2)
+        self.assertSummariesMatchSales()
+
+    def test_bulk_update(self):
+        """Test bulk updating sales."""
+        anewsale = create_sale(self.basic_user, TODAY, self.anewarticle1)
+        anewsale.unit_selling_price = Decimal('1.25')
+        Sale.objects.bulk_update([anewsale], ['unit_selling_price'])
+        self.assertEqual(ArticleSalesSummary.objects.get(article=self.anewarticle1).sales_total_revenue,
+                         Decimal('12.50'))
+        self.assertSummariesMatchSales()
+
+    def test_delete(self):
+        """Test deleting sales one by one and in bulk."""
+        anewsale = create_sale(self.basic_user, TODAY, self.anewarticle1)
+        create_sale(self.basic_user, YESTERDAY, self.anewarticle1)
+        create_sale(self.basic_user, YESTERDAY, self.anewarticle2)
+        anewsale.delete()
+        self.assertEqual(ArticleSalesSummary.objects.get(article=self.anewarticle1).last_sale_date, YESTERDAY)
+        self.assertSummariesMatchSales()
+        Sale.objects.filter(article=self.anewarticle1).delete()
+        self.assertFalse(ArticleSalesSummary.objects.filter(article=self.anewarticle1).exists())
+        self.assertSummariesMatchSales()
+
+    def test_margin(self):
+        """Test the margin of the summaries and its percentage are computed by the database."""
+        create_sale(self.basic_user, TODAY, self.anewarticle1)
+        summary = ArticleSalesSummary.objects.get(article=self.anewarticle1)
+        self.assertEqual(summary.margin, Decimal('1000.10'))
+        self.assertAlmostEqual(summary.margin_percentage, 9.0918, places=4)
+        Sale.objects.update(unit_selling_price=0)
+        summary = ArticleSalesSummary.objects.get(article=self.anewarticle1)
+        self.assertEqual(summary.margin, Decimal('-9999.90'))
+        self.assertIsNone(summary.margin_percentage)
+
+    def test_article_cost_update(self):
+        """Test updating the manufacturing cost of an article updates the cost of its sales."""
+        create_sale(self.basic_user, TODAY, self.anewarticle1)
+        self.anewarticle1.manufacturing_cost = Decimal('100.10')
+        self.anewarticle1.save()
+        self.assertEqual(ArticleSalesSummary.objects.get(article=self.anewarticle1).sales_total_cost,
+                         Decimal('1001'))
+        self.assertSummariesMatchSales()
+
+    def test_article_name_update(self):
+        """Test saving an article whose cost and category did not change leaves its sales and
+        their rollups untouched, only reading the stored ones when it was not loaded."""
+        create_sale(self.basic_user, TODAY, self.anewarticle1)
+        article = Article.objects.get(pk=self.anewarticle1.pk)
+        article.name = 'renamed'
+        with self.assertNumQueries(1):
+            article.save()
+        with self.assertNumQueries(2):
+            Article(pk=article.pk, code=article.code, name='renamed again', category=self.anewcategory,
+                    manufacturing_cost=article.manufacturing_cost).save()
+        self.assertSummariesMatchSales()
+
+    def test_rebuild_command(self):
+        """Test the command rebuilding and verifying the summaries."""
+        create_sale(self.basic_user, TODAY, self.anewarticle1)
+        create_sale(self.basic_user, TODAY, self.anewarticle2)
+        ArticleSalesSummary.objects.filter(article=self.anewarticle1).update(sales_count=10)
+        ArticleSalesSummary.objects.filter(article=self.anewarticle2).delete()
+        with self.assertRaisesMessage(CommandError, '2 Article Sales Summaries do not match'):
+            call_command('rebuild_sales_summaries', '--check', stdout=StringIO())
+        call_command('rebuild_sales_summaries', stdout=StringIO())
+        self.assertEqual(ArticleSalesSummary.objects.count(), 2)
+        self.assertSummariesMatchSales()
+
+
+class AggregatedSaleQueryTests(TestCase):
+    """Test the filters and orderings of AggregatedSaleViewSet."""
+
+    def setUp(self):
+        """Set up."""
+        cache.clear()
+        self.url = reverse_lazy('saleaggregated-list')
+        self.basic_user = User.objects.create_user(email='test1@email.fr')
+        self.anewcategory1 = create_category('anewcategory1')
+        self.anewcategory2 = create_category('anewcategory2')
+        self.articles = [
+            create_article('anewarticle1', self.anewcategory1),
+            create_article('anewarticle2', self.anewcategory1),
+            create_article('anewarticle3', self.anewcategory2),
+        ]
+        Sale.objects.bulk_create([
+            Sale(date=TODAY - datetime.timedelta(days=i), author=self.basic_user, article=self.articles[i % 3],
+                 quantity=i + 1, unit_selling_price=Decimal('900') + 50 * i)
+            for i in range(9)
+        ])
+        self.client.force_login(user=self.basic_user)
+
+    def get_results(self, **params):
+        """Return the aggregated sales with the given parameters, by pk of their article."""
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(int(row['article'].rstrip('/').rsplit('/', 1)[1]), row) for row in response.data['results']]
+
+    def get_articles(self, **params):
+        """Return the pks of the articles of the aggregated sales with the given parameters."""
+        return [pk for pk, _ in self.get_results(**params)]
+
+    def test_date_range(self):
+        """Test the sales of a date range are aggregated from their daily buckets."""
+        start, end = TODAY - datetime.timedelta(days=5), TODAY - datetime.timedelta(days=1)
+        sales = Sale.objects.filter(date__range=(start, end)).values('article').annotate(
+            revenue=Sum('total_selling_price'), count=Count('pk'), last_sale_date=Max('date')).order_by('-revenue')
+        self.assertEqual(
+            [(pk, row['sales_total_revenue'], row['sales_count'], row['last_sale_date'])
+             for pk, row in self.get_results(start=start, end=end)],
+            [(row['article'], row['revenue'], row['count'], row['last_sale_date']) for row in sales],
+        )
+
+    def test_filters(self):
+        """Test the aggregated sales filtered by category and minimum revenue."""
+        self.assertEqual(sorted(self.get_articles(category=self.anewcategory1.pk)),
+                         [self.articles[0].pk, self.articles[1].pk])
+        revenues = dict(ArticleSalesSummary.objects.values_list('article', 'sales_total_revenue'))
+        min_revenue = sorted(revenues.values())[1]
+        self.assertEqual(sorted(self.get_articles(min_revenue=min_revenue)),
+                         sorted(pk for pk, revenue in revenues.items() if revenue >= min_revenue))
+        self.assertEqual(self.get_articles(min_revenue=min_revenue, start=TODAY, end=TODAY), [])
+
+    def test_ordering(self):
+        """Test the aggregated sales ordered by each of their measures, then by article."""
+        for ordering in ('margin', '-margin_percentage', 'sales_total_quantity', '-sales_count', 'last_sale_date'):
+            with self.subTest(ordering=ordering):
+                expected = list(ArticleSalesSummary.objects.order_by(ordering, 'article').values_list(
+                    'article', flat=True))
+                self.assertEqual(self.get_articles(ordering=ordering), expected)
+                self.assertEqual(self.get_articles(ordering=ordering, start=TODAY - datetime.timedelta(days=30)),
+                                 expected)
+
+    def test_fields_date_range(self):
+        """Test the sparse fields of the sales of a date range, grouped by article even when not rendered."""
+        start, end = TODAY - datetime.timedelta(days=5), TODAY - datetime.timedelta(days=1)
+        expected = [row['sales_total_revenue'] for _, row in self.get_results(start=start, end=end)]
+        for params in ({}, {'fast': 'true'}, {'ordering': '-sales_total_revenue', 'category': self.anewcategory1.pk}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, {'fields': 'sales_total_revenue', 'start': start, 'end': end,
+                                                      **params})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                results = response.json()['results']
+                self.assertTrue(all(list(row) == ['sales_total_revenue'] for row in results))
+                if 'category' not in params:
+                    self.assertEqual([Decimal(str(row['sales_total_revenue'])) for row in results], expected)
+        response = self.client.get(self.url, {'fields': 'category,sales_count', 'ordering': 'margin', 'start': start})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data['results'][0]), ['category', 'sales_count'])
+
+    def test_invalid(self):
+        """Test invalid parameters are rejected."""
+        for params in ({'ordering': 'author'}, {'min_revenue': 'abc'}, {'category': 0},
+                       {'start': TODAY, 'end': YESTERDAY}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST)
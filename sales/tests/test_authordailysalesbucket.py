@@ -0,0 +1,155 @@
+"""Test author daily sales buckets and the top sales."""
+import datetime
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse, reverse_lazy
+from rest_framework import status
+from users.models import User
+from sales.models import Article, AuthorDailySalesBucket, Sale
+from .test_article import create_article
+from .test_articlecategory import create_category
+from .test_sale import create_sale
+
+TODAY = datetime.date(2024, 3, 26)
+YESTERDAY = TODAY - datetime.timedelta(days=1)
+
+
+class AuthorDailySalesBucketTests(TestCase):
+    """Test AuthorDailySalesBucket is kept up to date with the sales and the articles."""
+
+    def setUp(self):
+        """Set up."""
+        self.basic_user1 = User.objects.create_user(email='test1@email.fr')
+        self.basic_user2 = User.objects.create_user(email='test2@email.fr')
+        self.anewcategory = create_category('anewcategory')
+        self.anewarticle1 = create_article('anewarticle1', self.anewcategory)
+        self.anewarticle2 = create_article('anewarticle2', self.anewcategory)
+
+    def test_buckets(self):
+        """Test a bucket per author and day, moved with the sales changing of author."""
+        anewsale = create_sale(self.basic_user1, TODAY, self.anewarticle1)
+        create_sale(self.basic_user1, TODAY, self.anewarticle2)
+        create_sale(self.basic_user1, YESTERDAY, self.anewarticle1)
+        self.assertEqual(
+            list(AuthorDailySalesBucket.objects.order_by('date').values_list('date', 'author', 'sales_count')),
+            [(YESTERDAY, self.basic_user1.pk, 1), (TODAY, self.basic_user1.pk, 2)],
+        )
+        anewsale.author = self.basic_user2
+        anewsale.save()
+        Sale.objects.filter(date=YESTERDAY).delete()
+        self.assertEqual(
+            list(AuthorDailySalesBucket.objects.order_by('author').values_list('date', 'author', 'sales_count')),
+            [(TODAY, self.basic_user1.pk, 1), (TODAY, self.basic_user2.pk, 1)],
+        )
+        self.assertEqual(AuthorDailySalesBucket.objects.get_mismatches(), set())
+
+    def test_article(self):
+        """Test changing the cost of an article or deleting it updates the buckets of its sales."""
+        create_sale(self.basic_user1, TODAY, self.anewarticle1)
+        create_sale(self.basic_user1, TODAY, self.anewarticle2)
+        article = Article.objects.get(pk=self.anewarticle1.pk)
+        article.manufacturing_cost = Decimal('100.10')
+        article.save()
+        self.assertEqual(AuthorDailySalesBucket.objects.get().sales_total_cost, Decimal('11000.90'))
+        self.assertEqual(AuthorDailySalesBucket.objects.get_mismatches(), set())
+        article.delete()
+        self.assertEqual(AuthorDailySalesBucket.objects.get().sales_count, 1)
+        self.assertEqual(AuthorDailySalesBucket.objects.get_mismatches(), set())
+
+    def test_articles_delete(self):
+        """Test deleting articles in bulk, as the admin does, updates the buckets of their sales."""
+        create_sale(self.basic_user1, TODAY, self.anewarticle1)
+        create_sale(self.basic_user1, TODAY, self.anewarticle2)
+        create_sale(self.basic_user2, YESTERDAY, self.anewarticle1)
+        Article.objects.filter(pk=self.anewarticle1.pk).delete()
+        self.assertEqual(list(AuthorDailySalesBucket.objects.values_list('date', 'author', 'sales_count')),
+                         [(TODAY, self.basic_user1.pk, 1)])
+        self.assertEqual(AuthorDailySalesBucket.objects.get_mismatches(), set())
+
+
+class SaleRankingTests(TestCase):
+    """Test SaleRankingViewSet."""
+
+    def setUp(self):
+        """Set up."""
+        cache.clear()
+        self.url = reverse_lazy('saletop-list')
+        self.request = RequestFactory().get(self.url)
+        self.users = [User.objects.create_user(email=f'test{i}@email.fr') for i in range(4)]
+        self.categories = [create_category(f'anewcategory{i}') for i in range(3)]
+        self.articles = [create_article(f'ART00{i}', self.categories[i % 3]) for i in range(7)]
+        Sale.objects.bulk_create([
+            Sale(date=TODAY - datetime.timedelta(days=i % 10), author=self.users[i % 4], article=self.articles[i % 7],
+                 quantity=i % 5 + 1, unit_selling_price=Decimal('950') + 10 * i)
+            for i in range(60)
+        ])
+        self.client.force_login(user=self.users[0])
+
+    def get_results(self, **params):
+        """Return the results of the top sales with the given parameters."""
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def absolute_uri(self, view_name, pk):
+        """Return the absolute uri of an object."""
+        return self.request.build_absolute_uri(reverse(view_name, args=[pk]))
+
+    def get_expected(self, key, view_name, measure, limit, start, end):
+        """Return the links of the top rows computed from the sales, sorted."""
+        totals = {}
+        for sale in Sale.objects.filter(date__gte=start, date__lte=end).select_related('article'):
+            value = {
+                'sales_total_revenue': sale.total_selling_price,
+                'margin': sale.margin,
+                'sales_total_quantity': sale.quantity,
+                'sales_count': 1,
+            }[measure]
+            pk = {'article': sale.article_id, 'category': sale.article.category_id, 'author': sale.author_id}[key]
+            totals[pk] = totals.get(pk, 0) + value
+        ranking = sorted(totals, key=lambda pk: (-totals[pk], pk))[:limit]
+        return [self.absolute_uri(view_name, pk) for pk in ranking]
+
+    def test_dimensions(self):
+        """Test the top rows of each dimension and measure are the ones of a full sort."""
+        start = TODAY - datetime.timedelta(days=6)
+        for dimension, view_name in (('article', 'article-detail'), ('category', 'articlecategory-detail'),
+                                     ('author', 'user-detail')):
+            for measure in ('sales_total_revenue', 'margin', 'sales_total_quantity', 'sales_count'):
+                with self.subTest(dimension=dimension, measure=measure):
+                    results = self.get_results(dimension=dimension, measure=measure, limit=3, start=start,
+                                               end=TODAY)
+                    self.assertEqual([row[dimension] for row in results],
+                                     self.get_expected(dimension, view_name, measure, 3, start, TODAY))
+
+    def test_measures(self):
+        """Test the measures of a row are the totals of its sales."""
+        row = self.get_results(dimension='author', limit=1, start=YESTERDAY, end=TODAY)[0]
+        sales = Sale.objects.filter(date__gte=YESTERDAY, author_id=row['author'].rstrip('/').rsplit('/', 1)[-1])
+        self.assertEqual(row['sales_total_revenue'], sum(sale.total_selling_price for sale in sales))
+        self.assertEqual(row['margin'], sum(sale.margin for sale in sales))
+        self.assertEqual(row['sales_total_quantity'], sum(sale.quantity for sale in sales))
+        self.assertEqual(row['sales_count'], len(sales))
+
+    def test_default_range(self):
+        """Test the date range is the last week by default."""
+        with mock.patch('django.utils.timezone.localdate', return_value=TODAY):
+            results = self.get_results(limit=100)
+        self.assertEqual([row['article'] for row in results], self.get_expected(
+            'article', 'article-detail', 'sales_total_revenue', 100, TODAY - datetime.timedelta(days=6), TODAY))
+
+    def test_invalid(self):
+        """Test invalid parameters are rejected."""
+        for params in ({'dimension': 'date'}, {'measure': 'margin_percentage'}, {'limit': 0}, {'limit': 101},
+                       {'start': TODAY, 'end': YESTERDAY}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_queries(self):
+        """Test the top rows are read by a single query besides the session and user, and cached."""
+        with self.assertNumQueries(3):
+            self.get_results(dimension='category', start=YESTERDAY, end=TODAY)
+        with self.assertNumQueries(2):
+            self.get_results(dimension='category', start=YESTERDAY, end=TODAY)
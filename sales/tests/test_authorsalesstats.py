@@ -0,0 +1,95 @@
+"""Test the sales statistics by author."""
+import datetime
+from decimal import Decimal
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse, reverse_lazy
+from rest_framework import status
+from users.models import User
+from sales.models import Sale
+from .test_article import create_article
+from .test_articlecategory import create_category
+
+TODAY = datetime.date(2024, 3, 26)
+YESTERDAY = TODAY - datetime.timedelta(days=1)
+
+
+class AuthorSalesStatsTests(TestCase):
+    """Test AuthorSalesStatsViewSet."""
+
+    def setUp(self):
+        """Set up."""
+        cache.clear()
+        self.url = reverse_lazy('saleauthorstats-list')
+        self.request = RequestFactory().get(self.url)
+        self.users = [User.objects.create_user(email=f'test{i}@email.fr') for i in range(4)]
+        self.articles = [create_article(f'ART00{i}', create_category(f'anewcategory{i}')) for i in range(3)]
+        # The last user has no sale
+        Sale.objects.bulk_create([
+            Sale(date=TODAY - datetime.timedelta(days=i % 5), author=self.users[i % 3], article=self.articles[i % 3],
+                 quantity=i % 4 + 1, unit_selling_price=Decimal('950') + 10 * i)
+            for i in range(30)
+        ])
+        self.client.force_login(user=self.users[0])
+
+    def get_results(self, **params):
+        """Return the results of the statistics with the given parameters."""
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results']
+
+    def absolute_uri(self, pk):
+        """Return the absolute uri of a user."""
+        return self.request.build_absolute_uri(reverse('user-detail', args=[pk]))
+
+    def test_stats(self):
+        """Test the statistics of the authors of the date range are the totals of their sales."""
+        for params in ({}, {'start': YESTERDAY, 'end': TODAY}):
+            with self.subTest(params=params):
+                results = self.get_results(**params)
+                sales = Sale.objects.filter(date__gte=params.get('start', TODAY - datetime.timedelta(days=4)))
+                self.assertEqual(len(results), 3)
+                for row in results:
+                    author_sales = [sale for sale in sales if self.absolute_uri(sale.author_id) == row['author']]
+                    self.assertEqual(row['sales_count'], len(author_sales))
+                    self.assertEqual(row['sales_total_revenue'],
+                                     sum(sale.total_selling_price for sale in author_sales))
+                    self.assertEqual(row['margin'], sum(sale.margin for sale in author_sales))
+                    self.assertEqual(row['sales_total_quantity'], sum(sale.quantity for sale in author_sales))
+                    self.assertEqual(row['last_sale_date'], max(sale.date for sale in author_sales))
+                revenues = [row['sales_total_revenue'] for row in results]
+                self.assertEqual(revenues, sorted(revenues, reverse=True))
+
+    def test_filters(self):
+        """Test the statistics of an author, ordered by another measure."""
+        results = self.get_results(author=self.users[1].pk)
+        self.assertEqual([row['author'] for row in results], [self.absolute_uri(self.users[1].pk)])
+        results = self.get_results(ordering='author')
+        self.assertEqual([row['author'] for row in results], [self.absolute_uri(user.pk) for user in self.users[:3]])
+
+    def test_invalid(self):
+        """Test invalid parameters are rejected."""
+        for params in ({'ordering': 'article'}, {'author': 0}, {'start': TODAY, 'end': YESTERDAY}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_user_stats(self):
+        """Test the users are annotated with the statistics of their sales when requested."""
+        url = reverse('user-list')
+        response = self.client.get(url)
+        self.assertNotIn('sales_stats', response.data['results'][0])
+        response = self.client.get(url, {'sales_stats': 'true', 'start': YESTERDAY, 'end': TODAY})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = {row['email']: row['sales_stats'] for row in response.data['results']}
+        for user in self.users:
+            sales = Sale.objects.filter(author=user, date__gte=YESTERDAY)
+            self.assertEqual(stats[user.email], {
+                'sales_count': len(sales),
+                'sales_total_revenue': sum((sale.total_selling_price for sale in sales), Decimal(0)),
+                'margin': sum((sale.margin for sale in sales), Decimal(0)),
+            })
+        response = self.client.get(reverse('user-detail', args=[self.users[3].pk]), {'sales_stats': 'true'})
+        self.assertEqual(response.data['sales_stats'],
+                         {'sales_count': 0, 'sales_total_revenue': Decimal(0), 'margin': Decimal(0)})
+        response = self.client.get(url, {'sales_stats': 'true', 'start': TODAY, 'end': YESTERDAY})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,49 @@
+"""Test the benchmark of the API."""
+import datetime
+from django.core.cache import cache
+from django.test import Client, TestCase
+from users.models import User
+from sales.benchmarks import get_endpoints, get_percentile, run_benchmarks
+from .test_article import create_article
+from .test_articlecategory import create_category
+from .test_sale import create_sale
+
+
+class BenchmarkTests(TestCase):
+    """Test the benchmark of the endpoints."""
+
+    def setUp(self):
+        """Set up."""
+        cache.clear()
+        self.superuser = User.objects.create_superuser(email='admin@email.fr')
+        anewarticle = create_article('ART001', create_category('anewcategory'))
+        for i in range(3):
+            create_sale(self.superuser, datetime.date(2024, 1, 1 + i), anewarticle)
+        self.client = Client()
+        self.client.force_login(self.superuser)
+
+    def test_run_benchmarks(self):
+        """Test every endpoint is measured and answers successfully."""
+        results = run_benchmarks(self.client, iterations=3)
+        self.assertEqual(set(results), {name for name, *_ in get_endpoints()})
+        for name, result in results.items():
+            self.assertLess(result['status'], 400, name)
+            self.assertGreater(result['queries'], 0, name)
+            self.assertGreater(result['peak_memory_kib'], 0, name)
+            latency = result['latency_ms']
+            self.assertLessEqual(latency['min'], latency['p50'])
+            self.assertLessEqual(latency['p50'], latency['p99'])
+            self.assertLessEqual(latency['p99'], latency['max'])
+
+    def test_cached_endpoints(self):
+        """Test the cached pages are computed by the measured requests, not read from the cache
+        filled by the warm-up ones, with the session and user queries alone."""
+        names = ['saleaggregated-list', 'salecategoryaggregated-list', 'saletop-list']
+        for name, result in run_benchmarks(self.client, iterations=1, names=names).items():
+            self.assertGreater(result['queries'], 2, name)
+
+    def test_percentile(self):
+        """Test the percentiles are interpolated between the closest durations."""
+        self.assertEqual(get_percentile([1, 2, 3, 4, 5], 50), 3)
+        self.assertEqual(get_percentile([1, 2], 50), 1.5)
+        self.assertEqual(get_percentile([7], 99), 7)
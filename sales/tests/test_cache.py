@@ -0,0 +1,77 @@
+"""Test the cache of the aggregated sales."""
+import datetime
+import threading
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse_lazy
+from users.models import User
+from sales.cache import get_or_compute, get_sales_generation
+from sales.models import Sale
+from .test_article import create_article
+from .test_articlecategory import create_category
+from .test_sale import create_sale
+
+DAY = datetime.date(2024, 1, 1)
+
+
+class AggregatedSaleCacheTests(TestCase):
+    """Test the cached pages of AggregatedSaleViewSet."""
+
+    def setUp(self):
+        """Set up."""
+        cache.clear()
+        self.url = reverse_lazy('saleaggregated-list')
+        self.basic_user = User.objects.create_user(email='test1@email.fr')
+        self.anewarticle = create_article('ART001', create_category('anewcategory'))
+        self.anewsale = create_sale(self.basic_user, DAY, self.anewarticle)
+        self.client.force_login(user=self.basic_user)
+
+    def test_cached(self):
+        """Test a page is computed once then read from the cache, keyed by its query."""
+        response = self.client.get(self.url)
+        # Session and user only
+        with self.assertNumQueries(2):
+            cached_response = self.client.get(self.url)
+        self.assertEqual(cached_response.data, response.data)
+        with self.assertNumQueries(4):
+            self.client.get(self.url, {'page': 1})
+
+    def test_invalidated(self):
+        """Test the pages are recomputed after the sales or the articles change."""
+        changes = [
+            lambda: create_sale(self.basic_user, DAY, self.anewarticle),
+            lambda: Sale.objects.filter(pk=self.anewsale.pk).update(quantity=1),
+            lambda: Sale.objects.bulk_create([Sale(date=DAY, author=self.basic_user, article=self.anewarticle,
+                                                   quantity=1, unit_selling_price=1)]),
+            lambda: Sale.objects.filter(quantity=1).delete(),
+            lambda: self.anewarticle.save(),
+            lambda: self.anewarticle.delete(),
+        ]
+        for change in changes:
+            self.client.get(self.url)
+            generation = get_sales_generation()
+            change()
+            self.assertGreater(get_sales_generation(), generation)
+            with self.assertNumQueries(4 if Sale.objects.exists() else 3):
+                response = self.client.get(self.url)
+        self.assertEqual(response.data['results'], [])
+
+    def test_stampede(self):
+        """Test a single worker computes a missing value while the others wait for it."""
+        started = threading.Event()
+        compute = mock.Mock(side_effect=lambda: started.wait(5) and 'value')
+        thread = threading.Thread(target=get_or_compute, args=('key', compute, 60))
+        thread.start()
+        # Wait for the thread to hold the lock
+        while not compute.called:
+            pass
+        waiting_compute = mock.Mock(return_value='other value')
+        waiting_thread = threading.Thread(target=lambda: self.assertEqual(
+            get_or_compute('key', waiting_compute, 60), 'value'))
+        waiting_thread.start()
+        started.set()
+        thread.join()
+        waiting_thread.join()
+        waiting_compute.assert_not_called()
+        self.assertEqual(cache.get('key'), 'value')
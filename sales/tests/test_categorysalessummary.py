@@ -0,0 +1,190 @@
+"""Test category sales summary and the sales aggregated by category."""
+import datetime
+from decimal import Decimal
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse, reverse_lazy
+from rest_framework import status
+from users.models import User
+from sales.models import Article, CategorySalesSummary, Sale, get_sales_rollups
+from .test_article import create_article
+from .test_articlecategory import create_category
+from .test_sale import create_sale
+
+TODAY = datetime.date(2024, 3, 26)
+YESTERDAY = TODAY - datetime.timedelta(days=1)
+
+
+class CategorySalesSummaryTests(TestCase):
+    """Test CategorySalesSummary is kept up to date with the sales and the articles."""
+
+    def setUp(self):
+        """Set up."""
+        self.basic_user = User.objects.create_user(email='test1@email.fr')
+        self.anewcategory1 = create_category('anewcategory1')
+        self.anewcategory2 = create_category('anewcategory2')
+        self.anewarticle1 = create_article('anewarticle1', self.anewcategory1)
+        self.anewarticle2 = create_article('anewarticle2', self.anewcategory1)
+        self.anewarticle3 = create_article('anewarticle3', self.anewcategory2)
+
+    def assertSummariesMatchSales(self):
+        """Check the summaries are the ones computed from the summaries of the articles."""
+        self.assertEqual(CategorySalesSummary.objects.get_mismatches(), set())
+
+    def test_sales(self):
+        """Test creating, updating and deleting sales refreshes the summaries of their categories."""
+        create_sale(self.basic_user, YESTERDAY, self.anewarticle1)
+        create_sale(self.basic_user, TODAY, self.anewarticle2)
+        anewsale = create_sale(self.basic_user, TODAY, self.anewarticle3)
+        summary = CategorySalesSummary.objects.get(category=self.anewcategory1)
+        self.assertEqual(summary.sales_total_revenue, Decimal('22000'))
+        self.assertEqual(summary.margin, Decimal('2000.20'))
+        self.assertAlmostEqual(summary.margin_percentage, 9.0918, places=4)
+        self.assertEqual((summary.sales_total_quantity, summary.sales_count), (20, 2))
+        self.assertEqual((summary.last_sale_date, summary.article_count), (TODAY, 2))
+        anewsale.article = self.anewarticle1
+        anewsale.save()
+        self.assertEqual(CategorySalesSummary.objects.get(category=self.anewcategory1).article_count, 2)
+        self.assertFalse(CategorySalesSummary.objects.filter(category=self.anewcategory2).exists())
+        self.assertSummariesMatchSales()
+        Sale.objects.filter(article=self.anewarticle2).delete()
+        self.assertEqual(CategorySalesSummary.objects.get(category=self.anewcategory1).last_sale_date, TODAY)
+        self.assertEqual(CategorySalesSummary.objects.get(category=self.anewcategory1).article_count, 1)
+        self.assertSummariesMatchSales()
+
+    def test_bulk(self):
+        """Test bulk creating and updating sales."""
+        sales = Sale.objects.bulk_create([
+            Sale(date=TODAY, author=self.basic_user, article=article, quantity=1, unit_selling_price=Decimal('10'))
+            for article in (self.anewarticle1, self.anewarticle2, self.anewarticle3)
+        ])
+        self.assertEqual(CategorySalesSummary.objects.get(category=self.anewcategory1).sales_count, 2)
+        self.assertSummariesMatchSales()
+        Sale.objects.filter(pk=sales[2].pk).update(article=self.anewarticle2)
+        self.assertEqual(CategorySalesSummary.objects.get(category=self.anewcategory1).sales_count, 3)
+        self.assertSummariesMatchSales()
+
+    def test_article(self):
+        """Test changing the cost or the category of an article, or deleting it."""
+        create_sale(self.basic_user, TODAY, self.anewarticle1)
+        create_sale(self.basic_user, TODAY, self.anewarticle3)
+        self.anewarticle1.manufacturing_cost = Decimal('100.10')
+        self.anewarticle1.save()
+        self.assertEqual(CategorySalesSummary.objects.get(category=self.anewcategory1).sales_total_cost,
+                         Decimal('1001'))
+        # Moved without being loaded from the database
+        article = Article.objects.get(pk=self.anewarticle1.pk)
+        Article(pk=article.pk, code=article.code, name=article.name, category=self.anewcategory2,
+                manufacturing_cost=article.manufacturing_cost).save()
+        self.assertFalse(CategorySalesSummary.objects.filter(category=self.anewcategory1).exists())
+        self.assertEqual(CategorySalesSummary.objects.get(category=self.anewcategory2).article_count, 2)
+        self.assertSummariesMatchSales()
+        article = Article.objects.get(pk=self.anewarticle1.pk)
+        article.category = self.anewcategory1
+        article.save()
+        self.assertEqual(CategorySalesSummary.objects.get(category=self.anewcategory2).article_count, 1)
+        self.assertSummariesMatchSales()
+        self.anewarticle3.delete()
+        self.assertFalse(CategorySalesSummary.objects.filter(category=self.anewcategory2).exists())
+        self.assertSummariesMatchSales()
+
+    def test_articles(self):
+        """Test moving articles to another category, changing their cost or deleting them in bulk."""
+        create_sale(self.basic_user, TODAY, self.anewarticle1)
+        create_sale(self.basic_user, TODAY, self.anewarticle2)
+        create_sale(self.basic_user, TODAY, self.anewarticle3)
+        Article.objects.filter(pk=self.anewarticle1.pk).update(category=self.anewcategory2)
+        self.assertEqual(CategorySalesSummary.objects.get(category=self.anewcategory1).article_count, 1)
+        self.assertEqual(CategorySalesSummary.objects.get(category=self.anewcategory2).article_count, 2)
+        self.assertSummariesMatchSales()
+        Article.objects.filter(category=self.anewcategory2).update(manufacturing_cost=Decimal('100.10'))
+        self.assertEqual(CategorySalesSummary.objects.get(category=self.anewcategory2).sales_total_cost,
+                         Decimal('2002'))
+        self.assertSummariesMatchSales()
+        for rollup in get_sales_rollups():
+            self.assertEqual(rollup.objects.get_mismatches(), set())
+        Article.objects.filter(pk__in=[self.anewarticle1.pk, self.anewarticle2.pk]).delete()
+        self.assertFalse(CategorySalesSummary.objects.filter(category=self.anewcategory1).exists())
+        self.assertEqual(CategorySalesSummary.objects.get(category=self.anewcategory2).article_count, 1)
+        self.assertSummariesMatchSales()
+
+
+class CategoryAggregatedSaleTests(TestCase):
+    """Test CategoryAggregatedSaleViewSet."""
+
+    def setUp(self):
+        """Set up."""
+        cache.clear()
+        self.url = reverse_lazy('salecategoryaggregated-list')
+        self.basic_user = User.objects.create_user(email='test1@email.fr')
+        self.categories = [create_category(f'anewcategory{i}') for i in range(3)]
+        self.articles = [create_article(f'ART00{i}', self.categories[i % 3]) for i in range(7)]
+        Sale.objects.bulk_create([
+            Sale(date=TODAY - datetime.timedelta(days=i % 4), author=self.basic_user, article=self.articles[i % 7],
+                 quantity=i + 1, unit_selling_price=Decimal('950') + 10 * i)
+            for i in range(20)
+        ])
+        self.client.force_login(user=self.basic_user)
+
+    def get_results(self, url=None, **params):
+        """Return the results of the aggregated sales with the given parameters."""
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results']
+
+    def test_categories(self):
+        """Test the categories are ordered by revenue, with the totals of their articles."""
+        results = self.get_results()
+        summaries = CategorySalesSummary.objects.order_by('-sales_total_revenue')
+        self.assertEqual([row['category'] for row in results], [
+            f'http://testserver{reverse("articlecategory-detail", args=[summary.category_id])}'
+            for summary in summaries
+        ])
+        self.assertEqual(results[0]['sales_total_revenue'], summaries[0].sales_total_revenue)
+        self.assertEqual(results[0]['margin'], summaries[0].margin)
+        self.assertEqual(results[0]['margin_percentage'], round(summaries[0].margin_percentage, 2))
+        self.assertEqual(results[0]['article_count'], summaries[0].article_count)
+
+    def test_drill_down(self):
+        """Test the categories link to the aggregated sales of their articles, over the same dates."""
+        for params in ({}, {'start': YESTERDAY, 'end': TODAY}):
+            with self.subTest(params=params):
+                for category in self.get_results(**params):
+                    articles = self.get_results(category['articles'])
+                    self.assertEqual(len(articles), category['article_count'])
+                    self.assertEqual(sum(row['sales_total_revenue'] for row in articles),
+                                     category['sales_total_revenue'])
+                    self.assertEqual(sum(row['sales_count'] for row in articles), category['sales_count'])
+                    self.assertEqual(max(row['last_sale_date'] for row in articles), category['last_sale_date'])
+
+    def test_date_range(self):
+        """Test the sales of a date range are aggregated from the daily buckets of the articles."""
+        results = self.get_results(start=YESTERDAY, end=TODAY)
+        sales = Sale.objects.filter(date__gte=YESTERDAY)
+        self.assertEqual(sum(row['sales_count'] for row in results), sales.count())
+        self.assertEqual(sum(row['article_count'] for row in results),
+                         sales.values('article').distinct().count())
+
+    def test_ordering(self):
+        """Test the categories ordered by each of their measures, and filtered by revenue."""
+        for ordering in ('category', '-margin_percentage', 'sales_count', '-article_count'):
+            with self.subTest(ordering=ordering):
+                expected = [
+                    f'http://testserver{reverse("articlecategory-detail", args=[pk])}'
+                    for pk in CategorySalesSummary.objects.order_by(ordering, 'category').values_list(
+                        'category', flat=True)
+                ]
+                self.assertEqual([row['category'] for row in self.get_results(ordering=ordering)], expected)
+        min_revenue = CategorySalesSummary.objects.order_by('sales_total_revenue')[1].sales_total_revenue
+        self.assertEqual(len(self.get_results(min_revenue=min_revenue)), 2)
+
+    def test_invalid(self):
+        """Test invalid parameters are rejected."""
+        for params in ({'ordering': 'article'}, {'start': TODAY, 'end': YESTERDAY}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_queries(self):
+        """Test the categories are read by a single query besides the session, user and count."""
+        with self.assertNumQueries(4):
+            self.get_results()
@@ -0,0 +1,85 @@
+"""Test the conditional requests of the lists."""
+import datetime
+from django.test import TestCase
+from django.urls import reverse_lazy
+from django.utils import timezone
+from django.utils.http import http_date
+from users.models import User
+from sales.models import Sale
+from .test_article import create_article
+from .test_articlecategory import create_category
+from .test_sale import create_sale
+
+DAY = datetime.date(2024, 1, 1)
+
+
+class ConditionalListTests(TestCase):
+    """Test the lists answer 304 Not Modified until they change."""
+
+    def setUp(self):
+        """Set up."""
+        self.url = reverse_lazy('sale-list')
+        self.basic_user = User.objects.create_user(email='test1@email.fr')
+        self.anewcategory = create_category('anewcategory')
+        self.anewarticle = create_article('ART001', self.anewcategory)
+        self.anewsale = create_sale(self.basic_user, DAY, self.anewarticle)
+        self.client.force_login(user=self.basic_user)
+
+    def get_etag(self, url=None, **params):
+        """Return the ETag of a page."""
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_not_modified(self):
+        """Test a page is not fetched again while it did not change."""
+        etag = self.get_etag()
+        # Session, user and validators only
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_modified(self):
+        """Test the ETag changes when the rows, their related rows or the query change."""
+        etags = {self.get_etag()}
+        changes = [
+            lambda: Sale.objects.filter(pk=self.anewsale.pk).update(quantity=5),
+            lambda: create_sale(self.basic_user, DAY, self.anewarticle),
+            lambda: Sale.objects.filter(pk=self.anewsale.pk).delete(),
+            lambda: self.anewarticle.save(),
+            lambda: self.anewcategory.save(),
+        ]
+        for change in changes:
+            change()
+            etags.add(self.get_etag())
+        etags.add(self.get_etag(page_size=1))
+        self.assertEqual(len(etags), len(changes) + 2)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.get_etag())
+        self.assertEqual(response.status_code, 304)
+
+    def test_modified_since(self):
+        """Test a page is fetched again after a deletion when only its modification date is
+        given, which deletions do not move forward."""
+        since = http_date(timezone.now().timestamp() + 60)
+        response = self.client.get(self.url)
+        self.assertNotIn('Last-Modified', response)
+        create_sale(self.basic_user, DAY, self.anewarticle).delete()
+        for url in (self.url, reverse_lazy('articlecategory-list')):
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+            self.assertEqual(response.status_code, 200)
+
+    def test_articles_and_categories(self):
+        """Test the articles and categories lists are conditional too."""
+        for url in (reverse_lazy('article-list'), reverse_lazy('articlecategory-list')):
+            etag = self.get_etag(url)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_cursor(self):
+        """Test the pages of the cursor pagination are not validated, which would count the sales."""
+        response = self.client.get(self.url, {'pagination': 'cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
@@ -0,0 +1,116 @@
+"""Test daily sales buckets and the sales time series."""
+import datetime
+from decimal import Decimal
+from unittest import mock
+from django.test import RequestFactory, TestCase
+from django.urls import reverse, reverse_lazy
+from rest_framework import status
+from users.models import User
+from sales.models import DailySalesBucket, Sale
+from .test_article import create_article
+from .test_articlecategory import create_category
+from .test_sale import create_sale
+
+# A monday
+MONDAY = datetime.date(2024, 1, 29)
+
+
+class DailySalesBucketTests(TestCase):
+    """Test DailySalesBucket is kept up to date with the sales."""
+
+    def setUp(self):
+        """Set up."""
+        self.basic_user = User.objects.create_user(email='test1@email.fr')
+        self.anewarticle = create_article('anewarticle', create_category('anewcategory'))
+
+    def test_buckets(self):
+        """Test a bucket per article and day, removed with the last sale of the day."""
+        anewsale = create_sale(self.basic_user, MONDAY, self.anewarticle)
+        create_sale(self.basic_user, MONDAY, self.anewarticle)
+        create_sale(self.basic_user, MONDAY + datetime.timedelta(days=1), self.anewarticle)
+        self.assertEqual(list(DailySalesBucket.objects.order_by('date').values_list('date', 'sales_count')),
+                         [(MONDAY, 2), (MONDAY + datetime.timedelta(days=1), 1)])
+        anewsale.date = MONDAY + datetime.timedelta(days=1)
+        anewsale.save()
+        Sale.objects.filter(date=MONDAY).delete()
+        self.assertEqual(list(DailySalesBucket.objects.values_list('date', 'sales_count')),
+                         [(MONDAY + datetime.timedelta(days=1), 2)])
+        self.assertEqual(DailySalesBucket.objects.get_mismatches(), set())
+
+    def test_add_sales_order(self):
+        """Test the buckets of sales added in bulk are upserted sorted by key, whatever the order
+        of the sales, so that concurrent additions lock them in the same order."""
+        otherarticle = create_article('otherarticle', create_category('othercategory'))
+        sales = [
+            Sale(date=MONDAY + datetime.timedelta(days=day), author=self.basic_user, article=article,
+                 quantity=1, unit_selling_price=Decimal('10'), unit_cost=Decimal('1'))
+            for day in (2, 0, 1) for article in (otherarticle, self.anewarticle)
+        ]
+        upsert_increments = 'sales.models.SalesRollupQuerySet._upsert_increments'
+        with mock.patch(upsert_increments, autospec=True) as upsert:
+            DailySalesBucket.objects.add_sales(sales)
+        keys = [(row.date, row.article_id) for row in upsert.call_args.args[1]]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(keys), 6)
+
+
+class SaleTimeSeriesTests(TestCase):
+    """Test SaleTimeSeriesViewSet."""
+
+    def setUp(self):
+        """Set up."""
+        self.url = reverse_lazy('saletimeseries-list')
+        self.request = RequestFactory().get(self.url)
+        self.basic_user = User.objects.create_user(email='test1@email.fr')
+        self.anewcategory = create_category('anewcategory')
+        self.anewarticle1 = create_article('anewarticle1', self.anewcategory)
+        self.anewarticle2 = create_article('anewarticle2', self.anewcategory)
+        # Two sales of the first article on monday and sunday, one of the second on the next monday
+        create_sale(self.basic_user, MONDAY, self.anewarticle1)
+        create_sale(self.basic_user, MONDAY + datetime.timedelta(days=6), self.anewarticle1)
+        create_sale(self.basic_user, MONDAY + datetime.timedelta(days=7), self.anewarticle2)
+        self.client.force_login(user=self.basic_user)
+
+    def get_results(self, **params):
+        """Return the results of the time series with the given parameters."""
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results']
+
+    def absolute_uri(self, view_name, pk):
+        """Return the absolute uri of an object."""
+        return self.request.build_absolute_uri(reverse(view_name, args=[pk]))
+
+    def test_daily(self):
+        """Test the daily time series by article."""
+        results = self.get_results()
+        self.assertEqual([(row['period'], row['article']) for row in results],
+                         [(MONDAY, self.absolute_uri('article-detail', self.anewarticle1.pk)),
+                          (MONDAY + datetime.timedelta(days=6), self.absolute_uri('article-detail', self.anewarticle1.pk)),
+                          (MONDAY + datetime.timedelta(days=7), self.absolute_uri('article-detail', self.anewarticle2.pk))])
+        self.assertEqual(results[0], {'period': MONDAY,
+                                      'article': self.absolute_uri('article-detail', self.anewarticle1.pk),
+                                      'sales_total_revenue': Decimal('11000'),
+                                      'margin': Decimal('1000.10'),
+                                      'sales_total_quantity': 10,
+                                      'sales_count': 1})
+
+    def test_weekly_by_category(self):
+        """Test the weekly time series by category."""
+        results = self.get_results(granularity='week', group_by='category')
+        category_uri = self.absolute_uri('articlecategory-detail', self.anewcategory.pk)
+        self.assertEqual([(row['period'], row['category'], row['sales_count']) for row in results],
+                         [(MONDAY, category_uri, 2), (MONDAY + datetime.timedelta(days=7), category_uri, 1)])
+
+    def test_monthly_with_filters(self):
+        """Test the monthly time series of a date range and an article."""
+        results = self.get_results(granularity='month', start='2024-01-30', end='2024-02-29',
+                                   article=self.anewarticle1.pk)
+        self.assertEqual([(row['period'], row['sales_count']) for row in results],
+                         [(datetime.date(2024, 2, 1), 1)])
+
+    def test_invalid_parameters(self):
+        """Test invalid parameters are rejected."""
+        for params in ({'granularity': 'year'}, {'start': '2024-02-01', 'end': '2024-01-01'}, {'category': 0}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
@@ -0,0 +1,83 @@
+"""Test sales export."""
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.urls import reverse_lazy
+from rest_framework import status
+from users.models import User
+from sales.exports import EXPORT_COLUMNS, filter_sales, iter_csv, iter_sale_chunks
+from .test_article import create_article
+from .test_articlecategory import create_category
+from .test_sale import create_sale
+
+DAY = datetime.date(2024, 3, 1)
+
+
+class SaleExportTests(TestCase):
+    """Test the export of the sales."""
+
+    def setUp(self):
+        """Set up."""
+        self.url = reverse_lazy('sale-export')
+        self.basic_user = User.objects.create_user(email='test1@email.fr')
+        self.anewcategory1 = create_category('anewcategory1')
+        self.anewcategory2 = create_category('anewcategory2')
+        self.anewarticle1 = create_article('ART001', self.anewcategory1)
+        self.anewarticle2 = create_article('ART002', self.anewcategory2)
+        self.sales = [
+            create_sale(self.basic_user, DAY + datetime.timedelta(days=i), (self.anewarticle1, self.anewarticle2)[i % 2])
+            for i in range(5)
+        ]
+        self.client.force_login(user=self.basic_user)
+
+    def test_csv(self):
+        """Test the CSV export is streamed with the sales fields."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], EXPORT_COLUMNS)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1], [str(self.sales[0].pk), '2024-03-01', 'test1@email.fr', 'anewcategory1',
+                                   'ART001', 'anewarticle', '10', '1100.00', '11000.00'])
+
+    def test_ndjson_filters(self):
+        """Test the JSON lines export of a date range and a category."""
+        response = self.client.get(self.url, {'export_format': 'ndjson', 'start': '2024-03-02',
+                                              'end': '2024-03-04', 'category': self.anewcategory2.pk})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([line['id'] for line in lines], [self.sales[1].pk, self.sales[3].pk])
+        self.assertEqual(lines[0]['total_selling_price'], '11000.00')
+
+    def test_invalid_parameters(self):
+        """Test invalid parameters are rejected."""
+        response = self.client.get(self.url, {'export_format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_chunks(self):
+        """Test the sales are fetched by chunks of ids, a query per chunk."""
+        with self.assertNumQueries(3):
+            chunks = list(iter_sale_chunks(filter_sales(), chunk_size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual([row[0] for chunk in chunks for row in chunk], [sale.pk for sale in self.sales])
+        self.assertEqual(len(list(iter_csv(iter(chunks)))), 4)
+
+    def test_command(self):
+        """Test the export command to a file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sales.csv')
+            call_command('export_sales', '--output', path, '--chunk-size', '2', '--start', '2024-03-04')
+            with open(path, newline='') as output:
+                rows = list(csv.reader(output))
+        self.assertEqual([row[0] for row in rows], ['id', str(self.sales[3].pk), str(self.sales[4].pk)])
+        stdout = io.StringIO()
+        call_command('export_sales', '--format', 'ndjson', stdout=stdout)
+        self.assertEqual(len(stdout.getvalue().splitlines()), 5)
@@ -0,0 +1,104 @@
+"""Test the fast path of the lists."""
+import datetime
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse_lazy
+from rest_framework.renderers import JSONRenderer
+from users.models import User
+from sales.fast import FastJSONRenderer, compile_row_renderer
+from sales.models import Article, Sale
+from sales.serializers import AggregatedSaleSerializer
+from .test_articlecategory import create_category
+
+DAY = datetime.date(2024, 1, 1)
+
+
+class FastListTests(TestCase):
+    """Test the fast lists render the same bytes as the serializers."""
+
+    def setUp(self):
+        """Set up."""
+        cache.clear()
+        self.basic_user = User.objects.create_user(email='test1@email.fr')
+        categories = [create_category('Catégorie '), create_category('other')]
+        articles = [
+            Article.objects.create(code=f'ART00{i}', category=categories[i % 2], name=f'Artícle "{i}"',
+                                   manufacturing_cost=Decimal('1.10') * i)
+            for i in range(1, 4)
+        ]
+        for i in range(40):
+            Sale.objects.create(date=DAY - datetime.timedelta(days=i % 7), author=self.basic_user,
+                                article=articles[i % 3], quantity=i + 1,
+                                unit_selling_price=Decimal('0.01') + Decimal('3.33') * i)
+        self.client.force_login(user=self.basic_user)
+
+    def assertSameContent(self, url, params=None):
+        """Assert the fast page of the URL has the content of the page."""
+        response = self.client.get(url, {**(params or {}), 'fast': 'false'})
+        fast_response = self.client.get(url, {**(params or {}), 'fast': 'true'})
+        self.assertEqual(fast_response.status_code, 200)
+        # The links to the other pages keep the query
+        self.assertEqual(fast_response.content.replace(b'fast=true', b'fast=false'), response.content)
+        return fast_response
+
+    def test_sales(self):
+        """Test the sales, by page number and by cursor."""
+        url = reverse_lazy('sale-list')
+        self.assertSameContent(url)
+        self.assertSameContent(url, {'page': 2})
+        response = self.assertSameContent(url, {'pagination': 'cursor'})
+        self.assertSameContent(response.data['next'].replace('fast=true', 'fast=false'))
+
+    def test_articles(self):
+        """Test the articles."""
+        self.assertSameContent(reverse_lazy('article-list'))
+
+    def test_aggregated_sales(self):
+        """Test the sales aggregated by article."""
+        self.assertSameContent(reverse_lazy('saleaggregated-list'))
+
+    def test_queries(self):
+        """Test the fast list makes the same queries, fetching the values of the rows."""
+        url = reverse_lazy('sale-list')
+        # Session, user, validators, count and page
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {'fast': 'true'})
+        self.assertEqual(len(queries), 5)
+        # The rows are counted without joining their articles
+        self.assertNotIn('JOIN', queries[3]['sql'])
+        self.assertIn('JOIN', queries[4]['sql'])
+
+    def test_browsable_api(self):
+        """Test the pages of the other formats are rendered by the serializer."""
+        response = self.client.get(reverse_lazy('sale-list'), {'fast': 'true'}, HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIsInstance(response.accepted_renderer, FastJSONRenderer)
+
+    def test_unsupported_field(self):
+        """Test a serializer whose fields cannot be read from columns is not compiled."""
+        request = RequestFactory().get('/')
+        with self.assertRaises(ImproperlyConfigured):
+            compile_row_renderer(AggregatedSaleSerializer(), request)
+
+
+class FastJSONRendererTests(TestCase):
+    """Test FastJSONRenderer."""
+
+    def test_same_bytes(self):
+        """Test the data is rendered as JSONRenderer does, including the values orjson writes differently."""
+        data = {
+            'text': 'line separator é',
+            'decimals': [Decimal('1.10'), Decimal('0'), Decimal('1E+20'), Decimal('0.00001')],
+            'date': DAY,
+            'datetime': datetime.datetime(2024, 1, 1, 10, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            'values': [1, None, True, 'x'],
+        }
+        for value in (data, None, [], {'decimal': Decimal('1E+20')}):
+            self.assertEqual(FastJSONRenderer().render(value, 'application/json'),
+                             JSONRenderer().render(value, 'application/json'))
+        self.assertEqual(FastJSONRenderer().render(data, 'application/json; indent=4'),
+                         JSONRenderer().render(data, 'application/json; indent=4'))
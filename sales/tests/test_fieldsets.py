@@ -0,0 +1,97 @@
+"""Test the sparse fieldsets and expansions."""
+import datetime
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, reverse_lazy
+from users.models import User
+from .test_article import create_article
+from .test_articlecategory import create_category
+from .test_sale import create_sale
+
+DAY = datetime.date(2024, 1, 1)
+
+
+class SparseFieldsTests(TestCase):
+    """Test ?fields= and ?expand= on the sales, articles and aggregated sales."""
+
+    def setUp(self):
+        """Set up."""
+        cache.clear()
+        self.basic_user = User.objects.create_user(email='test1@email.fr')
+        self.anewarticle = create_article('ART001', create_category('anewcategory'))
+        for i in range(30):
+            create_sale(self.basic_user, DAY - datetime.timedelta(days=i), self.anewarticle)
+        self.client.force_login(user=self.basic_user)
+
+    def get(self, url, params):
+        """Return the data of a page and the SQL of the query fetching it."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data, queries[-1]['sql']
+
+    def test_sale_fields(self):
+        """Test the sales are rendered with their fields only, without joining their articles."""
+        data, sql = self.get(reverse_lazy('sale-list'), {'fields': 'date,total_selling_price'})
+        self.assertEqual(data['results'][0], {'date': '2024-01-01', 'total_selling_price': 11000.0})
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"author_id"', sql)
+        # Only the article code is joined
+        data, sql = self.get(reverse_lazy('sale-list'), {'fields': 'article_code'})
+        self.assertEqual(data['results'][0], {'article_code': 'ART001'})
+        self.assertIn('"sales_article"."code"', sql)
+        self.assertNotIn('sales_articlecategory', sql)
+
+    def test_cursor(self):
+        """Test the cursor pagination of the sparse sales, reading their ordering fields."""
+        page, _ = self.get(reverse_lazy('sale-list'), {'fields': 'quantity', 'pagination': 'cursor'})
+        with self.assertNumQueries(3):
+            next_page = self.client.get(page['next']).data
+        self.assertEqual(len(page['results']) + len(next_page['results']), 30)
+
+    def test_expand(self):
+        """Test the article of the sales is rendered in place of its hyperlink."""
+        data, sql = self.get(reverse_lazy('sale-list'), {'fields': 'date,article', 'expand': 'article'})
+        article = self.client.get(reverse('article-detail', args=[self.anewarticle.pk])).data
+        self.assertEqual(data['results'][0], {'date': '2024-01-01', 'article': article})
+        self.assertNotIn('sales_articlecategory', sql)
+        data, _ = self.get(reverse_lazy('article-list'), {'expand': 'category'})
+        self.assertEqual(data['results'][0]['category']['display_name'], 'anewcategory')
+
+    def test_fast(self):
+        """Test the fast lists render the same sparse and expanded rows."""
+        for params in ({'fields': 'url,total_selling_price'}, {'expand': 'article'}):
+            response = self.client.get(reverse_lazy('sale-list'), params)
+            fast_response = self.client.get(reverse_lazy('sale-list'), {**params, 'fast': 'true'})
+            self.assertEqual(fast_response.json()['results'], response.json()['results'])
+
+    def test_fast_cursor(self):
+        """Test the cursor pagination of the fast sparse sales, whose ordering fields are fetched
+        without being rendered."""
+        params = {'fields': 'quantity', 'pagination': 'cursor'}
+        response = self.client.get(reverse_lazy('sale-list'), params)
+        fast_response = self.client.get(reverse_lazy('sale-list'), {**params, 'fast': 'true'})
+        self.assertEqual(fast_response.status_code, 200)
+        self.assertEqual(fast_response.json()['results'], response.json()['results'])
+        self.assertEqual(list(fast_response.json()['results'][0]), ['quantity'])
+        next_page = self.client.get(fast_response.json()['next']).json()
+        self.assertEqual(len(fast_response.json()['results']) + len(next_page['results']), 30)
+
+    def test_aggregated_fields(self):
+        """Test the aggregated sales are rendered with their fields only, without joining their articles."""
+        for fast in ('false', 'true'):
+            data, sql = self.get(reverse_lazy('saleaggregated-list'), {'fields': 'article,margin', 'fast': fast})
+            self.assertEqual(list(data['results'][0]), ['article', 'margin'])
+            self.assertNotIn('JOIN', sql)
+
+    def test_unknown_fields(self):
+        """Test unknown fields and expansions are rejected."""
+        for url, params in [
+            (reverse_lazy('sale-list'), {'fields': 'date,unknown'}),
+            (reverse_lazy('sale-list'), {'expand': 'author'}),
+            (reverse_lazy('saleaggregated-list'), {'fields': 'quantity'}),
+        ]:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400)
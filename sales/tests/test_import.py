@@ -0,0 +1,147 @@
+"""Test sales import."""
+import io
+import os
+import tempfile
+from decimal import Decimal
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from users.models import User
+from sales.imports import read_csv, read_csv_range, split_csv
+from sales.models import (Article, ArticleCategory, ArticleSalesSummary, CategorySalesSummary, Sale,
+                          get_sales_rollups)
+from .test_article import create_article
+from .test_articlecategory import create_category
+from .test_sale import create_sale
+
+
+class ImportSalesTests(TestCase):
+    """Test the import_sales command."""
+
+    def setUp(self):
+        """Set up."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.basic_user = User.objects.create_user(email='test1@email.fr')
+        self.anewcategory = create_category('anewcategory')
+        self.anewarticle = create_article('ART001', self.anewcategory)
+
+    def tearDown(self):
+        """Tear down."""
+        self.directory.cleanup()
+
+    def write_csv(self, name, lines):
+        """Write a CSV file in the temporary directory and return its path."""
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+        return path
+
+    def call_command(self, **options):
+        """Call the command and return its output."""
+        stdout = io.StringIO()
+        call_command('import_sales', stdout=stdout, stderr=io.StringIO(), **options)
+        return stdout.getvalue()
+
+    def test_import(self):
+        """Test importing categories, articles and sales, matched to the existing rows."""
+        create_sale(self.basic_user, '2024-01-01', self.anewarticle)
+        categories = self.write_csv('categories.csv', ['display_name', 'anewcategory', 'othercategory'])
+        articles = self.write_csv('articles.csv', [
+            'code,name,category,manufacturing_cost',
+            'ART001,renamed,anewcategory,50.00',
+            'ART002,other,thirdcategory,20.00',
+        ])
+        sales = self.write_csv('sales.csv', [
+            'date,author,article_code,quantity,unit_selling_price',
+            '2024-01-02,TEST1@email.fr,ART001,2,60.00',
+            '2024-01-02,test2@email.fr,ART002,3,30.00',
+            '2024-01-03,test2@email.fr,UNKNOWN,3,30.00',
+            'notadate,test2@email.fr,ART002,3,30.00',
+        ])
+        output = self.call_command(categories=categories, articles=articles, sales=sales)
+        self.assertIn('Imported 1 categories', output)
+        self.assertIn('Imported 2 articles', output)
+        self.assertIn('Imported 2 sales (2 skipped)', output)
+        self.assertEqual(ArticleCategory.objects.count(), 3)
+        self.anewarticle.refresh_from_db()
+        self.assertEqual((self.anewarticle.name, self.anewarticle.manufacturing_cost), ('renamed', Decimal('50.00')))
+        self.assertEqual(Article.objects.get(code='ART002').category.display_name, 'thirdcategory')
+        self.assertEqual(Sale.objects.filter(author=self.basic_user).count(), 2)
+        self.assertFalse(User.objects.get(email='test2@email.fr').has_usable_password())
+        # The cost of the existing sales follows the article
+        summary = ArticleSalesSummary.objects.get(article=self.anewarticle)
+        self.assertEqual(summary.sales_total_cost, Decimal('600.00'))
+        for rollup in get_sales_rollups(derived=True):
+            self.assertEqual(rollup.objects.get_mismatches(), set())
+
+    def test_reimport(self):
+        """Test reimporting articles touches the sales of the articles whose cost changed only, and
+        the summaries of the categories they moved from or to."""
+        otherarticle = create_article('ART002', self.anewcategory)
+        create_sale(self.basic_user, '2024-01-01', self.anewarticle)
+        create_sale(self.basic_user, '2024-01-01', otherarticle)
+        articles = self.write_csv('articles.csv', [
+            'code,name,category,manufacturing_cost',
+            f'ART001,renamed,anewcategory,{self.anewarticle.manufacturing_cost}',
+            f'ART002,other,othercategory,{otherarticle.manufacturing_cost}',
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            self.call_command(articles=articles)
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE "sales_sale"')])
+        self.assertEqual(CategorySalesSummary.objects.get(category=self.anewcategory).article_count, 1)
+        self.assertEqual(CategorySalesSummary.objects.get(category__display_name='othercategory').article_count, 1)
+        articles = self.write_csv('articles.csv', [
+            'code,name,category,manufacturing_cost',
+            'ART002,other,othercategory,20.00',
+        ])
+        self.call_command(articles=articles)
+        self.assertEqual(Sale.objects.get(article=otherarticle).unit_cost, Decimal('20.00'))
+        self.assertEqual(Sale.objects.get(article=self.anewarticle).unit_cost, Decimal('999.99'))
+        for rollup in get_sales_rollups(derived=True):
+            self.assertEqual(rollup.objects.get_mismatches(), set())
+
+    def test_article_queries(self):
+        """Test the articles of the imported sales are read once, with their category."""
+        otherarticle = create_article('ART002', self.anewcategory)
+        sales = self.write_csv('sales.csv', ['date,author,article_code,quantity,unit_selling_price'] + [
+            f'2024-01-{day:02},test1@email.fr,{article.code},{day},10.00'
+            for day in range(1, 11) for article in (self.anewarticle, otherarticle)
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            self.call_command(sales=sales)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('SELECT')
+                              and 'FROM "sales_article"' in query['sql']]), 1)
+        for rollup in get_sales_rollups(derived=True):
+            self.assertEqual(rollup.objects.get_mismatches(), set())
+
+    def test_rebuild_rollups(self):
+        """Test the rollups are rebuilt at the end instead of updated along."""
+        sales = self.write_csv('sales.csv', [
+            'date,author,article_code,quantity,unit_selling_price',
+            '2024-01-02,test1@email.fr,ART001,2,60.00',
+            '2024-01-03,test1@email.fr,ART001,3,60.00',
+        ])
+        output = self.call_command(sales=sales, rebuild_rollups=True)
+        self.assertIn('Rebuilt the sales summaries and buckets', output)
+        self.assertEqual(ArticleSalesSummary.objects.get(article=self.anewarticle).sales_count, 2)
+        for rollup in get_sales_rollups(derived=True):
+            self.assertEqual(rollup.objects.get_mismatches(), set())
+
+    def test_missing_columns(self):
+        """Test a file without the expected columns is rejected."""
+        sales = self.write_csv('sales.csv', ['date,author', '2024-01-02,test1@email.fr'])
+        with self.assertRaisesMessage(CommandError, 'article_code'):
+            self.call_command(sales=sales)
+
+    def test_split(self):
+        """Test the byte ranges of a file hold each row once."""
+        path = self.write_csv('sales.csv', ['date,author,article_code,quantity,unit_selling_price'] + [
+            f'2024-01-{day:02},test1@email.fr,ART001,{day},10.00' for day in range(1, 29)
+        ])
+        rows = [row for _, row in read_csv(path)]
+        for parts in (1, 3, 7, 100):
+            ranges = split_csv(path, parts)
+            self.assertLessEqual(len(ranges), parts)
+            self.assertEqual([row for start, end in ranges for _, row in read_csv_range(path, start, end)], rows)
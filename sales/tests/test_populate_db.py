@@ -0,0 +1,35 @@
+"""Test dummy data generation."""
+import io
+from django.core.management import call_command
+from django.test import TestCase
+from users.models import User
+from sales.models import Article, ArticleCategory, Sale, get_sales_rollups
+
+
+class PopulateDbTests(TestCase):
+    """Test the populate_db command."""
+
+    def populate(self, **options):
+        """Call the command and return the generated sales."""
+        call_command('populate_db', stdout=io.StringIO(), **options)
+        return list(Sale.objects.order_by('pk').values_list(
+            'date', 'author__email', 'article__code', 'quantity', 'unit_selling_price'))
+
+    def test_populate(self):
+        """Test the requested numbers of rows are created along with their rollups."""
+        sales = self.populate(users=5, categories=3, articles=20, sales=500, batch_size=64)
+        self.assertEqual(len(sales), 500)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(ArticleCategory.objects.count(), 3)
+        self.assertEqual(Article.objects.count(), 20)
+        self.assertFalse(User.objects.first().has_usable_password())
+        for rollup in get_sales_rollups(derived=True):
+            self.assertTrue(rollup.objects.exists())
+            self.assertEqual(rollup.objects.get_mismatches(), set())
+
+    def test_seed(self):
+        """Test the same seed generates the same data."""
+        sales = self.populate(users=5, articles=20, sales=200, seed=42)
+        for model in (Sale, Article, ArticleCategory, User):
+            model.objects.all().delete()
+        self.assertEqual(self.populate(users=5, articles=20, sales=200, seed=42), sales)
@@ -0,0 +1,49 @@
+"""Test the check of the query plans."""
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from users.models import User
+from sales.queryplans import check_query_plans, get_full_scans
+
+
+class QueryPlansTests(TestCase):
+    """Test check_query_plans."""
+
+    def setUp(self):
+        """Set up."""
+        call_command('populate_db', users=3, categories=20, articles=30, sales=300, stdout=StringIO())
+        self.client.force_login(user=User.objects.create_superuser(email='test1@email.fr'))
+        if connection.vendor == 'postgresql':
+            # PostgreSQL scans the small tables of the test even when they have an index,
+            # until the end of the transaction of the test
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def test_get_full_scans(self):
+        """Test the full scans are read from the plans of each database, besides the subqueries."""
+        tables = {'sales_sale', 'sales_article'}
+        self.assertEqual(get_full_scans([
+            'SCAN sales_sale',
+            'SCAN sales_sale USING COVERING INDEX sales_sale_updated_at_9167aafc',
+            'SEARCH sales_article USING INTEGER PRIMARY KEY (rowid=?)',
+            'SCAN subquery',
+        ], 'sqlite', tables), ['sales_sale'])
+        self.assertEqual(get_full_scans([
+            'Limit  (cost=0.29..1.10 rows=25 width=48)',
+            '  ->  Seq Scan on sales_article  (cost=0.00..20.00 rows=1000 width=48)',
+            '  ->  Index Scan using sales_sale_date_id_idx on sales_sale  (cost=0.29..8.31 rows=1 width=48)',
+        ], 'postgresql', tables), ['sales_article'])
+
+    def test_indexed(self):
+        """Test no query of the endpoints scans a table without index, whatever its size."""
+        self.assertEqual(check_query_plans(self.client, min_rows=0), [])
+
+    def test_full_scan(self):
+        """Test the queries scanning a table without index are reported, unless it is small."""
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX sales_category_name_idx')
+        full_scans = check_query_plans(self.client, ['articlecategory-list'], min_rows=0)
+        self.assertEqual({(name, table) for name, table, _, _ in full_scans},
+                         {('articlecategory-list', 'sales_articlecategory')})
+        self.assertEqual(check_query_plans(self.client, ['articlecategory-list'], min_rows=21), [])
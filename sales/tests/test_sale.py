@@ -1,6 +1,7 @@
 """Test sale."""
 import datetime
 from decimal import Decimal
+from django.core.cache import cache
 from django.utils import timezone
 from django.test import RequestFactory, TestCase
 from django.urls import reverse, reverse_lazy
@@ -35,12 +36,45 @@ class SaleMethodTests(TestCase):
         """Test total selling price."""
         self.assertEqual(self.anewsale.get_total_selling_price(), TEST_SALE_QUANTITY*TEST_SALE_UNIT_SELLING_PRICE)
 
+    def test_margin(self):
+        """Test the cost of the article is copied on the sale and its margin stored."""
+        self.assertEqual(self.anewsale.unit_cost, Decimal('999.99'))
+        self.assertEqual(self.anewsale.margin, Decimal('1000.10'))
+        self.assertEqual(Sale.objects.filter(margin__gt=1000, total_selling_price=11000).count(), 1)
+
+    def test_save(self):
+        """Test the totals of a saved sale are the ones stored."""
+        self.anewsale.quantity = 3
+        self.anewsale.save()
+        sale = Sale.objects.get(pk=self.anewsale.pk)
+        self.assertEqual((self.anewsale.total_selling_price, self.anewsale.margin),
+                         (sale.total_selling_price, sale.margin))
+        self.assertEqual(sale.total_selling_price, Decimal('3300'))
+
+    def test_article_cost(self):
+        """Test the cost of the sales follows the cost and the changes of their article."""
+        self.anewarticle.manufacturing_cost = Decimal('100.00')
+        self.anewarticle.save()
+        self.anewsale.refresh_from_db()
+        self.assertEqual((self.anewsale.unit_cost, self.anewsale.margin), (Decimal('100.00'), Decimal('10000.00')))
+
+        article2 = create_article('anewarticle2', self.anewcategory)
+        Sale.objects.filter(pk=self.anewsale.pk).update(article=article2)
+        self.anewsale.refresh_from_db()
+        self.assertEqual(self.anewsale.unit_cost, Decimal('999.99'))
+
+        self.anewsale.article = self.anewarticle
+        Sale.objects.bulk_update([self.anewsale], ['article'])
+        self.anewsale.refresh_from_db()
+        self.assertEqual(self.anewsale.unit_cost, Decimal('100.00'))
+
 
 class SaleTests(TestCase):
     """Test SaleViewSet."""
 
     def setUp(self):
         """Set up."""
+        cache.clear()
         self.url = reverse_lazy('sale-list')
         self.request = RequestFactory().get(self.url)
         self.basic_user1 = User.objects.create_user(email='test1@email.fr')
@@ -83,7 +117,7 @@ class SaleTests(TestCase):
         for i in range(3):
             create_sale(self.basic_user2, timezone.now().date() + datetime.timedelta(days=i), self.anewarticle)
         # Make sure we get the sales sorted by date
-        serialized_sales_list = SaleSerializer(Sale.objects.all().order_by('date').reverse(),
+        serialized_sales_list = SaleSerializer(Sale.objects.all().order_by('-date', '-id'),
                                                context={'request': self.request},
                                                many=True)
         response = SaleViewSet.as_view({'get': 'list'})(self.request)
@@ -180,9 +214,126 @@ class SaleTests(TestCase):
                                                              'category': cat1_uri,
                                                              'sales_total_revenue': Decimal('33000'),
                                                              'margin': Decimal('3000.30'),
+                                                             'margin_percentage': 9.09,
+                                                             'sales_total_quantity': 30,
+                                                             'sales_count': 3,
                                                              'last_sale_date': yesterday},
                                                             {'article': art2_uri,
                                                              'category': cat2_uri,
                                                              'sales_total_revenue': Decimal('22000.00'),
                                                              'margin': Decimal('2000.20'),
+                                                             'margin_percentage': 9.09,
+                                                             'sales_total_quantity': 20,
+                                                             'sales_count': 2,
                                                              'last_sale_date': today}])
+
+
+class SaleQueryCountTests(TestCase):
+    """Test the number of queries of SaleViewSet does not depend on the number of sales."""
+
+    def setUp(self):
+        """Set up."""
+        self.url = reverse_lazy('sale-list')
+        self.basic_user1 = User.objects.create_user(email='test1@email.fr')
+        self.basic_user2 = User.objects.create_user(email='test2@email.fr')
+        self.anewcategory = create_category('anewcategory1')
+        self.anewarticle = create_article('anewarticle1', self.anewcategory)
+        self.anewcategory2 = create_category('anewcategory2')
+        self.anewarticle2 = create_article('anewarticle2', self.anewcategory2)
+        self.sale_data = {
+            'date': '2024-01-01',
+            'author': reverse('user-detail', kwargs={'pk': self.basic_user1.id}),
+            'article': reverse('article-detail', kwargs={'pk': self.anewarticle.id}),
+            'quantity': 4,
+            'unit_selling_price': 15.0
+        }
+        self.client.force_login(user=self.basic_user1)
+
+    def test_list_queries(self):
+        """Test list: session, user, validators, count and page, whatever the page size."""
+        create_sale(self.basic_user1, timezone.now().date(), self.anewarticle)
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']), 1)
+        # A full page of sales of different authors, articles and categories
+        for i in range(30):
+            create_sale((self.basic_user1, self.basic_user2)[i % 2],
+                        timezone.now().date() - datetime.timedelta(days=i),
+                        (self.anewarticle, self.anewarticle2)[i % 2])
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']), 25)
+
+    def test_retrieve_queries(self):
+        """Test retrieve: session, user and sale with its article and category."""
+        anewsale = create_sale(self.basic_user1, timezone.now().date(), self.anewarticle)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('sale-detail', kwargs={'pk': anewsale.pk}))
+        self.assertEqual(response.data['article_category'], self.anewcategory.display_name)
+
+    def test_create_queries(self):
+        """Test create: session, user, author and article lookups, insert, rollups increments
+        and category summary refresh."""
+        with self.assertNumQueries(10):
+            response = self.client.post(self.url, data=self.sale_data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['article_category'], self.anewcategory.display_name)
+
+    def test_update_queries(self):
+        """Test update: session, user, sale, author and article lookups, update and rollups refresh,
+        including the summaries of the categories the sale is moved between."""
+        anewsale = create_sale(self.basic_user1, timezone.now().date(), self.anewarticle2)
+        with self.assertNumQueries(19):
+            response = self.client.put(reverse('sale-detail', kwargs={'pk': anewsale.pk}),
+                                       data=self.sale_data,
+                                       content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['article_category'], self.anewcategory.display_name)
+
+
+class SaleCursorPaginationTests(TestCase):
+    """Test the cursor pagination of SaleViewSet."""
+
+    def setUp(self):
+        """Set up."""
+        self.url = reverse_lazy('sale-list')
+        self.basic_user1 = User.objects.create_user(email='test1@email.fr')
+        self.anewarticle = create_article('anewarticle1', create_category('anewcategory1'))
+        # Several sales share the same date
+        self.today = timezone.now().date()
+        for i in range(60):
+            create_sale(self.basic_user1, self.today - datetime.timedelta(days=i // 20), self.anewarticle)
+        self.client.force_login(user=self.basic_user1)
+
+    def test_walk_pages(self):
+        """Test walking the pages forward and backward."""
+        expected_urls = [self.request_url(sale) for sale in Sale.objects.order_by('-date', '-id')]
+        response = self.client.get(self.url, {'pagination': 'cursor'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        pages = [response.data]
+        while pages[-1]['next']:
+            pages.append(self.client.get(pages[-1]['next']).data)
+        self.assertEqual([len(page['results']) for page in pages], [25, 25, 10])
+        self.assertEqual([sale['url'] for page in pages for sale in page['results']], expected_urls)
+        # Going back from the last page gives the same pages
+        previous_page = self.client.get(pages[-1]['previous']).data
+        self.assertEqual(previous_page['results'], pages[1]['results'])
+
+    def test_constant_queries(self):
+        """Test a deep page costs the same number of queries as the first one, without counting."""
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'pagination': 'cursor'})
+        deep_page_url = self.client.get(response.data['next']).data['next']
+        with self.assertNumQueries(3):
+            self.client.get(deep_page_url)
+
+    def test_invalid_cursor(self):
+        """Test an invalid cursor is not found."""
+        response = self.client.get(self.url, {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def request_url(self, sale):
+        """Return the absolute url of a sale as rendered by the test client."""
+        return 'http://testserver' + reverse('sale-detail', kwargs={'pk': sale.pk})
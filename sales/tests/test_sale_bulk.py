@@ -0,0 +1,74 @@
+"""Test bulk creation of sales."""
+from decimal import Decimal
+from django.test import TestCase
+from django.urls import reverse_lazy
+from rest_framework import status
+from users.models import User
+from sales.models import ArticleSalesSummary, Sale, get_sales_rollups
+from .test_article import create_article
+from .test_articlecategory import create_category
+
+
+def sale_item(article_code, quantity=2):
+    """Return a sale of a bulk creation."""
+    return {'date': '2024-01-01', 'article_code': article_code, 'quantity': quantity, 'unit_selling_price': '15.50'}
+
+
+class SaleBulkTests(TestCase):
+    """Test the bulk creation of SaleViewSet."""
+
+    def setUp(self):
+        """Set up."""
+        self.url = reverse_lazy('sale-bulk')
+        self.basic_user = User.objects.create_user(email='test1@email.fr')
+        anewcategory = create_category('anewcategory')
+        self.anewarticle1 = create_article('ART001', anewcategory)
+        self.anewarticle2 = create_article('ART002', anewcategory)
+        self.client.force_login(user=self.basic_user)
+
+    def post(self, items, **params):
+        """Post the sales to the bulk creation."""
+        url = self.url + ('?atomic=true' if params.get('atomic') else '')
+        return self.client.post(url, data=items, content_type='application/json')
+
+    def test_create(self):
+        """Test creating sales of several articles, authored by the user."""
+        response = self.post([sale_item('ART001'), sale_item('ART002', 3), sale_item('ART001', 1)])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'created': 3, 'errors': []})
+        self.assertEqual(Sale.objects.filter(author=self.basic_user).count(), 3)
+        summary = ArticleSalesSummary.objects.get(article=self.anewarticle1)
+        self.assertEqual((summary.sales_count, summary.sales_total_revenue), (2, Decimal('46.50')))
+        for rollup in get_sales_rollups(derived=True):
+            self.assertEqual(rollup.objects.get_mismatches(), set())
+
+    def test_constant_queries(self):
+        """Test the number of queries does not depend on the number of sales."""
+        with self.assertNumQueries(11):
+            self.post([sale_item('ART001')])
+        # Within a single insert of the 999 parameters of SQLite
+        with self.assertNumQueries(11):
+            self.post([sale_item(('ART001', 'ART002')[i % 2]) for i in range(140)])
+        self.assertEqual(Sale.objects.count(), 141)
+
+    def test_errors(self):
+        """Test the invalid sales are reported and the valid ones created."""
+        response = self.post([sale_item('ART001'), sale_item('UNKNOWN'), sale_item('ART002', -1), 'invalid'])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3])
+        self.assertIn('article_code', response.data['errors'][0]['errors'])
+        self.assertIn('quantity', response.data['errors'][1]['errors'])
+        self.assertEqual(Sale.objects.count(), 1)
+
+    def test_atomic(self):
+        """Test nothing is created with atomic when a sale is invalid."""
+        response = self.post([sale_item('ART001'), sale_item('UNKNOWN')], atomic=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(Sale.objects.count(), 0)
+
+    def test_invalid_body(self):
+        """Test a body which is not a list of sales is rejected."""
+        response = self.post({'sales': []})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
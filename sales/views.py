@@ -1,12 +1,35 @@
-from django.db.models import F, Sum, Max
-from rest_framework import permissions
-from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
-from .models import Article, ArticleCategory, Sale
-from .serializers import ArticleSerializer, ArticleCategorySerializer, SaleSerializer, AggregatedSaleSerializer
+import heapq
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.http import StreamingHttpResponse
+from rest_framework import permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.mixins import ListModelMixin
+from rest_framework.viewsets import GenericViewSet, ModelViewSet, ReadOnlyModelViewSet
+from main.routers import ReplicaReadMixin
+from . import analytics
+from .models import (Article, ArticleCategory, ArticleSalesSummary, AuthorDailySalesBucket, CategorySalesSummary,
+                     DailySalesBucket, Sale, get_margin_percentage)
+from .serializers import (ArticleSerializer, ArticleCategorySerializer, SaleSerializer, AggregatedSaleSerializer,
+                          AggregatedSaleQuerySerializer, AuthorSalesStatsQuerySerializer, AuthorSalesStatsSerializer,
+                          CategoryAggregatedSaleSerializer, CategoryAggregatedSaleQuerySerializer,
+                          SaleBulkItemSerializer, SaleExportQuerySerializer,
+                          SalesRankingQuerySerializer, SalesRankingSerializer, SalesTimeSeriesQuerySerializer,
+                          SalesTimeSeriesSerializer)
+from .cache import CachedListMixin, ConditionalListMixin
+from .exports import EXPORT_FORMATS, filter_sales, iter_sale_chunks
+from .fast import FastListMixin
+from .fieldsets import SparseFieldsMixin
+from .pagination import SalePagination
 from .permissions import ReadOnly, CreateOrReadOnly, IsOwnerOrReadOnly
 
 
-class ArticleCategoryViewSet(ModelViewSet):
+class ArticleCategoryViewSet(ConditionalListMixin, ModelViewSet):
     """Article Category ViewSet."""
 
     queryset = ArticleCategory.objects.all().order_by('display_name')
@@ -14,35 +37,362 @@ class ArticleCategoryViewSet(ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, ReadOnly]
 
 
-class ArticleViewSet(ModelViewSet):
+class ArticleViewSet(FastListMixin, SparseFieldsMixin, ConditionalListMixin, ModelViewSet):
     """Article ViewSet."""
 
     queryset = Article.objects.all().order_by('code')
     serializer_class = ArticleSerializer
     permission_classes = [permissions.IsAuthenticated, CreateOrReadOnly]
+    expandable_fields = {'category': ArticleCategorySerializer}
 
 
-class SaleViewSet(ModelViewSet):
+class SaleViewSet(ReplicaReadMixin, FastListMixin, SparseFieldsMixin, ConditionalListMixin, ModelViewSet):
     """Sale Category ViewSet."""
 
-    # Order view by most recent sales
-    queryset = Sale.objects.order_by('date').reverse()
+    # Order view by most recent sales, the id making the ordering stable between pages,
+    # joining the article and its category which are rendered on each row to avoid one query per sale
+    queryset = Sale.objects.select_related('article__category').order_by('-date', '-id')
     serializer_class = SaleSerializer
+    pagination_class = SalePagination
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
+    # The code and name of the article and the name of its category are rendered
+    conditional_related_models = [Article, ArticleCategory]
+    field_sources = {
+        'article_code': 'article__code',
+        'article_name': 'article__name',
+        'article_category': 'article__category__display_name',
+        'total_selling_price': 'total_selling_price',
+    }
+    expandable_fields = {'article': ArticleSerializer}
+    # The exports are read from a replica, the other actions may read the sales just written
+    replica_actions = ['export']
+
+    # Maximum number of sales of a bulk creation and number of sales inserted per query
+    bulk_max_sales = 10000
+    bulk_batch_size = 1000
+
+    def use_list_validators(self, request):
+        """Override use_list_validators not to validate the pages of the cursor pagination,
+        which would count the sales it avoids counting."""
+        return not self.paginator.use_cursor(request)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """Create a list of sales of the user, referencing their articles by code.
+
+        The sales are validated together, with a single query for all the articles, and
+        inserted by batches in a single transaction. The invalid sales are reported by
+        index in `errors` and the valid ones are created, unless `?atomic=true` is given
+        in which case nothing is created if any sale is invalid."""
+        if not isinstance(request.data, list):
+            raise ValidationError({'non_field_errors': ['Expected a list of sales.']})
+        if len(request.data) > self.bulk_max_sales:
+            raise ValidationError({'non_field_errors': [f'Expected at most {self.bulk_max_sales} sales.']})
+        item_serializer = SaleBulkItemSerializer()
+        items, errors = [], []
+        for index, item in enumerate(request.data):
+            try:
+                items.append((index, item_serializer.run_validation(item)))
+            except ValidationError as exc:
+                errors.append({'index': index, 'errors': exc.detail})
+
+        articles = Article.objects.in_bulk({data['article_code'] for _, data in items}, field_name='code')
+        sales = []
+        for index, data in items:
+            article = articles.get(data.pop('article_code'))
+            if article is None:
+                errors.append({'index': index, 'errors': {'article_code': ['Unknown article code.']}})
+                continue
+            sales.append(Sale(author=request.user, article=article, **data))
+        errors.sort(key=lambda error: error['index'])
 
+        if errors and (request.query_params.get('atomic') == 'true' or not sales):
+            return Response({'created': 0, 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            Sale.objects.bulk_create(sales, batch_size=self.bulk_batch_size)
+        return Response({'created': len(sales), 'errors': errors}, status=status.HTTP_201_CREATED)
 
-class AggregatedSaleViewSet(ReadOnlyModelViewSet):
-    """Aggregated Sale by Article ViewSet."""
+    @action(detail=False, url_path='export')
+    def export(self, request):
+        """Stream all the sales of a date range and category as CSV or JSON lines.
+
+        The sales are fetched and written by chunks while the response is sent."""
+        query = SaleExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        content_type, iter_format = EXPORT_FORMATS[params['export_format']]
+        sales = filter_sales(params.get('start'), params.get('end'), params.get('category'))
+        response = StreamingHttpResponse(iter_format(iter_sale_chunks(sales)), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="sales.{params["export_format"]}"'
+        return response
+
+
+class AggregatedSaleViewSet(ReplicaReadMixin, FastListMixin, SparseFieldsMixin, CachedListMixin,
+                            ReadOnlyModelViewSet):
+    """Aggregated Sale by Article ViewSet, whose pages are cached until the sales change."""
 
     serializer_class = AggregatedSaleSerializer
     permission_classes = [permissions.IsAuthenticated]
+    aggregated_fields = ['article', 'category', 'sales_total_revenue', 'margin', 'margin_percentage',
+                         'sales_total_quantity', 'sales_count', 'last_sale_date']
+
+    def get_sparse_field_names(self):
+        """Override get_sparse_field_names to give the fields rendered by AggregatedSaleSerializer."""
+        return self.aggregated_fields
+
+    def use_analytics(self):
+        """Check if the sales are aggregated in memory rather than read from their summaries."""
+        return settings.SALES_ANALYTICS and analytics.np is not None and self.action == 'list'
+
+    def get_queryset(self):
+        """Override get_queryset to read the sales aggregated by article from their summaries,
+        or from their daily buckets within a date range, or from the sales columns held in memory.
+
+        The measures are computed, filtered and ordered by the database."""
+        query = AggregatedSaleQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        fields = self.get_sparse_fields() or self.aggregated_fields
+        # The rows are grouped by article, whose column is kept whatever the fields rendered
+        if 'article' not in fields:
+            fields = ['article', *fields]
+        if self.use_analytics():
+            return analytics.get_sales_columns(router.db_for_read(Sale)).get_article_rows(
+                fields, start=params.get('start'), end=params.get('end'),
+                category=params['category'].pk if 'category' in params else None,
+                min_revenue=params.get('min_revenue'), ordering=params['ordering'],
+            )
+        if 'start' in params or 'end' in params:
+            rows = self.get_bucket_rows(params)
+        else:
+            # The summaries are kept up to date when the sales change, and indexed on every ordering
+            rows = ArticleSalesSummary.objects.all()
+            if 'category' in params:
+                rows = rows.filter(article__category=params['category'])
+            if 'min_revenue' in params:
+                rows = rows.filter(sales_total_revenue__gte=params['min_revenue'])
+        # Joining the articles only for their category
+        if 'category' in fields:
+            rows = rows.annotate(category=F('article__category'))
+        return rows.values(*fields).order_by(params['ordering'], 'article')
+
+    def get_bucket_rows(self, params):
+        """Return the sales of a date range aggregated by article from their daily buckets,
+        read by a range scan of the index on their date."""
+        buckets = DailySalesBucket.objects.all()
+        if 'start' in params:
+            buckets = buckets.filter(date__gte=params['start'])
+        if 'end' in params:
+            buckets = buckets.filter(date__lte=params['end'])
+        if 'category' in params:
+            buckets = buckets.filter(article__category=params['category'])
+        rows = buckets.values('article').annotate(
+            # Before the sums of the measures which would shadow their fields
+            margin=Sum('sales_total_revenue') - Sum('sales_total_cost'),
+            margin_percentage=get_margin_percentage(Sum('sales_total_revenue'), Sum('sales_total_cost')),
+            sales_total_revenue=Sum('sales_total_revenue'),
+            sales_total_quantity=Sum('sales_total_quantity'),
+            sales_count=Sum('sales_count'),
+            last_sale_date=Max('date'),
+        )
+        if 'min_revenue' in params:
+            rows = rows.filter(sales_total_revenue__gte=params['min_revenue'])
+        return rows
+
+    def get_serializer_context(self):
+        """Override get_serializer_context to give the fields to render, the rows holding the
+        article along."""
+        context = super().get_serializer_context()
+        context['fields'] = self.get_sparse_fields() or self.aggregated_fields
+        return context
+
+    def get_row_renderer(self):
+        """Override get_row_renderer to render the rows of the summaries with the serializer."""
+        return self.get_sparse_fields() or self.aggregated_fields, self.get_serializer().to_representation
+
+    def get_fast_rows(self, queryset):
+        """Override get_fast_rows to render the values of the summaries, or the rows of the
+        sales columns, as they are."""
+        return queryset
+
+
+class CategoryAggregatedSaleViewSet(ReplicaReadMixin, CachedListMixin, ListModelMixin, GenericViewSet):
+    """Aggregated Sale by Article Category ViewSet, whose pages are cached until the sales change.
+
+    Each category links to its aggregated sales by article, over the same date range."""
+
+    serializer_class = CategoryAggregatedSaleSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    category_fields = ['category', 'sales_total_revenue', 'margin', 'margin_percentage', 'sales_total_quantity',
+                       'sales_count', 'last_sale_date', 'article_count']
+
+    def get_queryset(self):
+        """Override get_queryset to read the sales aggregated by category from their summaries,
+        or from the daily buckets of their articles within a date range."""
+        query = CategoryAggregatedSaleQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        if 'start' in params or 'end' in params:
+            rows = self.get_bucket_rows(params)
+        else:
+            # The summaries are kept up to date when the sales or the articles change
+            rows = CategorySalesSummary.objects.values(*self.category_fields)
+        if 'min_revenue' in params:
+            rows = rows.filter(sales_total_revenue__gte=params['min_revenue'])
+        return rows.order_by(params['ordering'], 'category')
+
+    def get_bucket_rows(self, params):
+        """Return the sales of a date range aggregated by category from the daily buckets
+        of their articles, in a single grouped query."""
+        buckets = DailySalesBucket.objects.all()
+        if 'start' in params:
+            buckets = buckets.filter(date__gte=params['start'])
+        if 'end' in params:
+            buckets = buckets.filter(date__lte=params['end'])
+        return buckets.values(category=F('article__category')).annotate(
+            # Before the sums of the measures which would shadow their fields
+            margin=Sum('sales_total_revenue') - Sum('sales_total_cost'),
+            margin_percentage=get_margin_percentage(Sum('sales_total_revenue'), Sum('sales_total_cost')),
+            sales_total_revenue=Sum('sales_total_revenue'),
+            sales_total_quantity=Sum('sales_total_quantity'),
+            sales_count=Sum('sales_count'),
+            last_sale_date=Max('date'),
+            article_count=Count('article', distinct=True),
+        )
+
+    def get_serializer_context(self):
+        """Override get_serializer_context to give the date range of the aggregated sales
+        by article the categories link to."""
+        context = super().get_serializer_context()
+        context['drill_down_params'] = {
+            name: self.request.query_params[name] for name in ('start', 'end') if name in self.request.query_params
+        }
+        return context
+
+
+class SaleRankingViewSet(ReplicaReadMixin, CachedListMixin, ListModelMixin, GenericViewSet):
+    """Top Sale by Article, Article Category or Author over a date range ViewSet, whose lists are
+    cached until the sales change."""
+
+    serializer_class = SalesRankingSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    # The list is the top of the ranking, not paginated
+    pagination_class = None
+    # Daily buckets and field of the key of the rows of each dimension
+    dimensions = {
+        'article': (DailySalesBucket, 'article'),
+        'category': (DailySalesBucket, 'article__category'),
+        'author': (AuthorDailySalesBucket, 'author'),
+    }
+
+    def get_query_params(self):
+        """Return the validated query parameters, the date range defaulting to the last week."""
+        if not hasattr(self, '_query_params'):
+            query = SalesRankingQuerySerializer(data=self.request.query_params)
+            query.is_valid(raise_exception=True)
+            self._query_params = query.validated_data
+        return self._query_params
+
+    def get_list_cache_key(self, request):
+        """Override get_list_cache_key to key the lists by their date range, which may be the
+        default one rather than given in their URL."""
+        params = self.get_query_params()
+        return f"{super().get_list_cache_key(request)}:{params['start']}:{params['end']}"
+
+    def get_queryset(self):
+        """Override get_queryset to return the top rows of the daily buckets of the date range
+        summed by the database, the largest measures being selected with a bounded heap of
+        `limit` rows rather than by sorting all the rows.
+
+        The cost depends on the length of the date range, not on the whole history of sales."""
+        params = self.get_query_params()
+        model, key = self.dimensions[params['dimension']]
+        buckets = model.objects.filter(date__gte=params['start'], date__lte=params['end'])
+        if key == params['dimension']:
+            buckets = buckets.values(key)
+        else:
+            buckets = buckets.values(**{params['dimension']: F(key)})
+        rows = buckets.annotate(
+            # Before the sums of the measures which would shadow their fields
+            margin=Sum('sales_total_revenue') - Sum('sales_total_cost'),
+            margin_percentage=get_margin_percentage(Sum('sales_total_revenue'), Sum('sales_total_cost')),
+            sales_total_revenue=Sum('sales_total_revenue'),
+            sales_total_quantity=Sum('sales_total_quantity'),
+            sales_count=Sum('sales_count'),
+        ).order_by()
+        measure, dimension = params['measure'], params['dimension']
+        # The ties are ranked by key, the rows being streamed from the database in any order
+        return heapq.nlargest(params['limit'], rows.iterator(), key=lambda row: (row[measure], -row[dimension]))
+
+    def get_serializer_context(self):
+        """Override get_serializer_context to give the dimension the rows are keyed by."""
+        context = super().get_serializer_context()
+        context['dimension'] = self.get_query_params()['dimension']
+        return context
+
+
+class AuthorSalesStatsViewSet(ReplicaReadMixin, CachedListMixin, ListModelMixin, GenericViewSet):
+    """Sale statistics by Author ViewSet, whose pages are cached until the sales change."""
+
+    serializer_class = AuthorSalesStatsSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        """Override get_queryset to sum the daily buckets of the authors within the date range,
+        the authors without sale in it being left out."""
+        query = AuthorSalesStatsQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        buckets = AuthorDailySalesBucket.objects.all()
+        if 'start' in params:
+            buckets = buckets.filter(date__gte=params['start'])
+        if 'end' in params:
+            buckets = buckets.filter(date__lte=params['end'])
+        if 'author' in params:
+            buckets = buckets.filter(author=params['author'])
+        return buckets.values('author').annotate(
+            # Before the sums of the measures which would shadow their fields
+            margin=Sum('sales_total_revenue') - Sum('sales_total_cost'),
+            margin_percentage=get_margin_percentage(Sum('sales_total_revenue'), Sum('sales_total_cost')),
+            sales_total_revenue=Sum('sales_total_revenue'),
+            sales_total_quantity=Sum('sales_total_quantity'),
+            sales_count=Sum('sales_count'),
+            last_sale_date=Max('date'),
+        ).order_by(params['ordering'], 'author')
+
+
+class SaleTimeSeriesViewSet(ReplicaReadMixin, ListModelMixin, GenericViewSet):
+    """Aggregated Sale by period and Article or Article Category ViewSet."""
+
+    serializer_class = SalesTimeSeriesSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    periods = {
+        'day': F('date'),
+        'week': TruncWeek('date'),
+        'month': TruncMonth('date'),
+    }
 
     def get_queryset(self):
-        """Override get_queryset to aggregate sales by article."""
-        # Use prefetch_related to avoid a db call for each sale's article and article category
-        return Sale.objects.prefetch_related("article", "article__category").values("article").annotate(
-                                            category=F('article__category'),
-                                            sales_total_revenue=Sum(F('quantity') * F('unit_selling_price')),
-                                            margin=Sum((F('unit_selling_price') - F('article__manufacturing_cost')) * F('quantity')),
-                                            last_sale_date=Max('date')
-                                            ).order_by("sales_total_revenue").reverse()
+        """Override get_queryset to roll the daily buckets up to the requested period."""
+        query = SalesTimeSeriesQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        buckets = DailySalesBucket.objects.all()
+        if 'start' in params:
+            buckets = buckets.filter(date__gte=params['start'])
+        if 'end' in params:
+            buckets = buckets.filter(date__lte=params['end'])
+        if 'article' in params:
+            buckets = buckets.filter(article=params['article'])
+        if 'category' in params:
+            buckets = buckets.filter(article__category=params['category'])
+        buckets = buckets.annotate(period=self.periods[params['granularity']])
+        if params['group_by'] == 'category':
+            buckets = buckets.annotate(category=F('article__category'))
+        return buckets.values('period', params['group_by']).annotate(
+            # Before the sum of the revenue which would shadow its field
+            margin=Sum('sales_total_revenue') - Sum('sales_total_cost'),
+            sales_total_revenue=Sum('sales_total_revenue'),
+            sales_total_quantity=Sum('sales_total_quantity'),
+            sales_count=Sum('sales_count'),
+        ).order_by('period', params['group_by'])
@@ -1,8 +1,29 @@
 from rest_framework import serializers
+from main.hyperlinks import CachedHyperlinkedModelSerializer
+from sales.serializers import DateRangeQuerySerializer
 from .models import User
 
 # Serializers define the API representation.
-class UserSerializer(serializers.HyperlinkedModelSerializer):
+class UserSerializer(CachedHyperlinkedModelSerializer):
     class Meta:
         model = User
         fields = '__all__'
+
+
+class UserQuerySerializer(DateRangeQuerySerializer):
+    """Serialize of the query parameters of the users, the date range being the one of their
+    sales statistics."""
+    sales_stats = serializers.BooleanField(default=False)
+
+
+class UserSalesStatsSerializer(UserSerializer):
+    """Serialize of User model with the statistics of its sales, annotated by get_author_sales_stats."""
+    sales_stats = serializers.SerializerMethodField()
+
+    def get_sales_stats(self, obj):
+        return {
+            "sales_count": obj.sales_count,
+            # round to 2 decimals as it's most of the time the currency decimal place
+            "sales_total_revenue": round(obj.sales_total_revenue, 2),
+            "margin": round(obj.margin, 2),
+        }
@@ -1,10 +1,36 @@
 from django.shortcuts import render
 from users.models import User
-from users.serializers import UserSerializer
+from users.serializers import UserQuerySerializer, UserSalesStatsSerializer, UserSerializer
 from rest_framework import permissions
 from rest_framework.viewsets import ModelViewSet
+from sales.models import get_author_sales_stats
 
 class UserViewSet(ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+
+    def get_query_params(self):
+        """Return the validated query parameters."""
+        if not hasattr(self, '_query_params'):
+            query = UserQuerySerializer(data=self.request.query_params)
+            query.is_valid(raise_exception=True)
+            self._query_params = query.validated_data
+        return self._query_params
+
+    def with_sales_stats(self):
+        """Check if the statistics of the sales of the users are rendered, with `?sales_stats=true`."""
+        return self.action in ('list', 'retrieve') and self.get_query_params()['sales_stats']
+
+    def get_queryset(self):
+        """Override get_queryset to annotate the users with the statistics of their sales over
+        the date range, read from their daily buckets, when requested."""
+        queryset = super().get_queryset()
+        if self.with_sales_stats():
+            params = self.get_query_params()
+            queryset = queryset.annotate(**get_author_sales_stats(params.get('start'), params.get('end')))
+        return queryset
+
+    def get_serializer_class(self):
+        """Override get_serializer_class to render the statistics of the sales when requested."""
+        return UserSalesStatsSerializer if self.with_sales_stats() else super().get_serializer_class()